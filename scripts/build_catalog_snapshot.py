@@ -0,0 +1,31 @@
+from pathlib import Path
+
+from vlmrun.hub.constants import (
+    VLMRUN_HUB_CATALOG_PATH,
+    VLMRUN_HUB_CATALOG_SNAPSHOT_PATH,
+    VLMRUN_HUB_CONTRIB_CATALOG_PATH,
+)
+from vlmrun.hub.registry import SchemaCatalogSnapshot
+
+
+def build_catalog_snapshot(output_path: Path = VLMRUN_HUB_CATALOG_SNAPSHOT_PATH) -> SchemaCatalogSnapshot:
+    """
+    Compile the default and contrib catalogs into a snapshot that the registry loads at startup.
+
+    Args:
+        output_path: Path to write the snapshot to
+
+    Returns:
+        The compiled snapshot
+    """
+    snapshot = SchemaCatalogSnapshot.build([VLMRUN_HUB_CATALOG_PATH, VLMRUN_HUB_CONTRIB_CATALOG_PATH])
+    snapshot.save(output_path)
+    return snapshot
+
+
+if __name__ == "__main__":
+    import sys
+
+    output_path = Path(sys.argv[1]) if len(sys.argv) > 1 else VLMRUN_HUB_CATALOG_SNAPSHOT_PATH
+    snapshot = build_catalog_snapshot(output_path)
+    print(f"{output_path} [schemas={len(snapshot.schemas)}, source_hash={snapshot.source_hash[:8]}]")
@@ -1,5 +1,9 @@
+import hashlib
+import threading
+import time
 from collections import namedtuple
 from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 
 import pytest
@@ -30,6 +34,78 @@ def model_arg(request):
     return request.config.getoption("--model")
 
 
+class ArtifactServer:
+    """A local HTTP server serving in-memory files with ETag revalidation, counting full downloads."""
+
+    def __init__(self, delay: float = 0.0):
+        self.files = {}
+        self.downloads = {}
+        self.revalidations = {}
+        self.delay = delay
+        self.inflight = 0
+        self.max_inflight = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, so clients can reuse pooled connections
+
+            def do_GET(self):
+                with server._lock:
+                    server.inflight += 1
+                    server.max_inflight = max(server.max_inflight, server.inflight)
+                try:
+                    time.sleep(server.delay)
+                    self._get()
+                finally:
+                    with server._lock:
+                        server.inflight -= 1
+
+            def _get(self):
+                if self.path not in server.files:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                content = server.files[self.path]
+                etag = '"%s"' % hashlib.md5(content).hexdigest()
+                if self.headers.get("If-None-Match") == etag:
+                    with server._lock:
+                        server.revalidations[self.path] = server.revalidations.get(self.path, 0) + 1
+                    self.send_response(304)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                with server._lock:
+                    server.downloads[self.path] = server.downloads.get(self.path, 0) + 1
+                self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        if self.thread.is_alive():
+            self.httpd.shutdown()
+            self.httpd.server_close()
+
+
+@pytest.fixture
+def artifact_server():
+    """A local HTTP server for artifact fixture files"""
+    server = ArtifactServer()
+    yield server
+    server.close()
+
+
 BenchmarkResult = namedtuple("BenchmarkResult", ["domain", "sample", "response_model", "response_json"])
 
 
@@ -0,0 +1,98 @@
+import hashlib
+import os
+import time
+from io import BytesIO
+
+import pytest
+
+from vlmrun.hub.artifacts import ArtifactCache, ArtifactNotCachedError
+
+
+def test_artifact_cache_download_and_revalidate(artifact_server, tmp_path):
+    artifact_server.files["/invoice.pdf"] = b"%PDF-1.4 invoice"
+    url = f"{artifact_server.url}/invoice.pdf"
+
+    cache = ArtifactCache(tmp_path)
+    path = cache.fetch(url)
+    assert path.read_bytes() == b"%PDF-1.4 invoice"
+    assert path.name == hashlib.sha256(b"%PDF-1.4 invoice").hexdigest() + ".pdf"
+    # Validated once per process: no further requests
+    assert cache.fetch(url) == path
+    assert artifact_server.downloads["/invoice.pdf"] == 1 and not artifact_server.revalidations
+
+    # A new process revalidates with the stored ETag, and is not sent the content again
+    assert ArtifactCache(tmp_path).fetch(url) == path
+    assert artifact_server.downloads["/invoice.pdf"] == 1 and artifact_server.revalidations["/invoice.pdf"] == 1
+
+    # Changed content is downloaded and stored under its new hash
+    artifact_server.files["/invoice.pdf"] = b"%PDF-1.4 invoice v2"
+    new_path = ArtifactCache(tmp_path).fetch(url)
+    assert new_path != path and new_path.read_bytes() == b"%PDF-1.4 invoice v2"
+
+
+def test_artifact_cache_offline(artifact_server, tmp_path):
+    artifact_server.files["/a.png"] = b"png"
+    ArtifactCache(tmp_path).fetch(f"{artifact_server.url}/a.png")
+    artifact_server.close()
+
+    offline = ArtifactCache(tmp_path, offline=True)
+    assert offline.fetch(f"{artifact_server.url}/a.png").read_bytes() == b"png"
+    with pytest.raises(ArtifactNotCachedError):
+        offline.fetch(f"{artifact_server.url}/b.png")
+
+
+def test_artifact_cache_lru_eviction(artifact_server, tmp_path):
+    for name in ("a", "b", "c"):
+        artifact_server.files[f"/{name}.jpg"] = name.encode() * 100
+    cache = ArtifactCache(tmp_path, max_bytes=250)
+
+    cache.fetch(f"{artifact_server.url}/a.jpg")
+    cache.fetch(f"{artifact_server.url}/b.jpg")
+    # Make "b" the least recently used
+    b_path = cache.get(f"{artifact_server.url}/b.jpg")
+    os.utime(b_path, (time.time() - 60, time.time() - 60))
+    cache.fetch(f"{artifact_server.url}/c.jpg")
+
+    assert cache.get(f"{artifact_server.url}/b.jpg") is None
+    assert cache.get(f"{artifact_server.url}/a.jpg") is not None
+    assert cache.get(f"{artifact_server.url}/c.jpg") is not None
+    assert ArtifactCache(tmp_path).get(f"{artifact_server.url}/b.jpg") is None
+
+
+def test_artifact_cache_shared_index(artifact_server, tmp_path):
+    """Test that caches in different processes (here, instances) merge their index updates"""
+    for name in ("a", "b"):
+        artifact_server.files[f"/{name}.png"] = name.encode()
+    first, second = ArtifactCache(tmp_path), ArtifactCache(tmp_path)
+    assert first.get(f"{artifact_server.url}/b.png") is None
+
+    first.fetch(f"{artifact_server.url}/a.png")
+    second.fetch(f"{artifact_server.url}/b.png")
+    # The second update is merged into the index the first one saved, rather than overwriting it
+    for cache in (first, second, ArtifactCache(tmp_path)):
+        assert cache.get(f"{artifact_server.url}/a.png").read_bytes() == b"a"
+        assert cache.get(f"{artifact_server.url}/b.png").read_bytes() == b"b"
+
+    offline = ArtifactCache(tmp_path, offline=True)
+    assert offline.fetch(f"{artifact_server.url}/b.png").read_bytes() == b"b"
+    assert artifact_server.downloads == {"/a.png": 1, "/b.png": 1}
+
+
+def test_hub_sample_images_memoized(artifact_server, tmp_path, monkeypatch):
+    from PIL import Image
+    from pydantic import BaseModel
+
+    from vlmrun.hub import dataset
+
+    buffer = BytesIO()
+    Image.new("RGB", (8, 8), "red").save(buffer, format="PNG")
+    artifact_server.files["/sample.png"] = buffer.getvalue()
+    monkeypatch.setattr(dataset, "ARTIFACT_CACHE", ArtifactCache(tmp_path))
+
+    sample = dataset.HubSample(
+        domain="test", response_model=BaseModel, prompt="", data=f"{artifact_server.url}/sample.png"
+    )
+    images = sample.images
+    assert images[0].size == (8, 8)
+    assert sample.images is images
+    assert artifact_server.downloads["/sample.png"] == 1
@@ -0,0 +1,74 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from vlmrun.hub.bundle import bundle_json_schemas, unbundle_json_schemas
+
+
+class Address(BaseModel):
+    street: str
+    city: str
+
+
+class Customer(BaseModel):
+    name: str
+    address: Address
+
+
+class Invoice(BaseModel):
+    customer: Customer
+    billing_address: Address
+
+
+class Shipment(BaseModel):
+    customer: Customer
+    destination: Address
+
+
+class Node(BaseModel):
+    value: int
+    children: List["Node"] = Field(default_factory=list)
+    address: Optional[Address] = None
+
+
+class Tree(BaseModel):
+    root: Node
+
+
+def _address(description: str):
+    return type("Address", (BaseModel,), {"__annotations__": {"street": str}, "street": Field(description=description)})
+
+
+def test_bundle_shared_defs():
+    json_schemas = {
+        "invoice": Invoice.model_json_schema(),
+        "shipment": Shipment.model_json_schema(),
+        "tree": Tree.model_json_schema(),
+    }
+    bundle = bundle_json_schemas(json_schemas)
+    assert sorted(bundle["$defs"]) == ["Address", "Customer", "Node"]
+    assert "$defs" not in bundle["schemas"]["invoice"]
+    assert bundle["schemas"]["invoice"]["properties"]["billing_address"] == {"$ref": "#/$defs/Address"}
+    # Standalone schemas carry only the definitions they reference, and round-trip exactly
+    assert unbundle_json_schemas(bundle) == json_schemas
+
+
+def test_bundle_conflicting_defs():
+    """Different definitions sharing a name are kept apart, including the ones that only differ by a reference."""
+
+    def customer(address_model):
+        return type("Customer", (BaseModel,), {"__annotations__": {"address": address_model}})
+
+    home, work = _address("Home street"), _address("Work street")
+    json_schemas = {
+        "a": type("A", (BaseModel,), {"__annotations__": {"customer": customer(home)}}).model_json_schema(),
+        "b": type("B", (BaseModel,), {"__annotations__": {"customer": customer(work)}}).model_json_schema(),
+        "c": type("C", (BaseModel,), {"__annotations__": {"customer": customer(home)}}).model_json_schema(),
+    }
+    bundle = bundle_json_schemas(json_schemas)
+    assert len(bundle["$defs"]) == 4
+    assert all(name.startswith(("Address_", "Customer_")) for name in bundle["$defs"])
+    properties = {name: json_schema["properties"] for name, json_schema in bundle["schemas"].items()}
+    assert properties["a"] == properties["c"] != properties["b"]
+
+    assert unbundle_json_schemas(bundle) == json_schemas
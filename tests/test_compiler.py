@@ -0,0 +1,148 @@
+import json
+import time
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+import pytest
+from loguru import logger
+from pydantic import BaseModel, ValidationError
+
+from vlmrun.hub.compiler import UnsupportedJsonSchemaError, compile_json_schema
+from vlmrun.hub.registry import registry
+from vlmrun.hub.utils import codegen_jsonschemastr_to_model, jsonschemastr_to_model
+
+
+def _normalize(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop the differences where the compiler is more faithful to the source schema than code generation.
+
+    datamodel-code-generator drops model docstrings and the length constraints of `uri` strings.
+    """
+    schema = json.loads(json.dumps(schema))
+    for node in [schema, *schema.get("$defs", {}).values()]:
+        node.pop("description", None)
+
+    stack = [schema]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if node.get("format") == "uri":
+                node.pop("minLength", None)
+                node.pop("maxLength", None)
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return schema
+
+
+@pytest.mark.parametrize("domain", registry.list_schemas())
+def test_compile_json_schema_parity(domain):
+    """Test that compiled models match the models generated by datamodel-code-generator"""
+    json_schema = registry.json_schema(domain)
+    class_name = json_schema["title"]
+    compiled = compile_json_schema(json_schema, class_name)
+    generated = codegen_jsonschemastr_to_model(json.dumps(json_schema), class_name)
+
+    assert compiled.__name__ == class_name
+    assert _normalize(compiled.model_json_schema()) == _normalize(generated.model_json_schema())
+
+
+def test_compile_json_schema_validation():
+    class Address(BaseModel):
+        city: str
+
+    class Person(BaseModel):
+        name: str
+        birth_date: date
+        address: Address
+        tags: List[str] = []
+        score: Optional[float] = None
+
+    Compiled = compile_json_schema(Person.model_json_schema(), "Person")
+    person = Compiled.model_validate(
+        {"name": "Ada", "birth_date": "1815-12-10", "address": {"city": "London"}, "score": None}
+    )
+    assert person.birth_date == date(1815, 12, 10)
+    assert person.address.city == "London"
+    with pytest.raises(ValidationError):
+        Compiled.model_validate({"name": "Ada", "birth_date": "not-a-date", "address": {"city": "London"}})
+    with pytest.raises(ValidationError):
+        Compiled.model_validate({"name": "Ada", "birth_date": "1815-12-10"})
+
+
+@pytest.mark.parametrize(
+    "schema",
+    [
+        {"type": "string"},
+        {"type": "object", "properties": {"a": {"oneOf": [{"type": "string"}, {"type": "integer"}]}}},
+        {
+            "type": "object",
+            "properties": {"a": {"allOf": [{"$ref": "#/$defs/A"}]}},
+            "$defs": {"A": {"type": "string"}},
+        },
+        {"type": "object", "properties": {"a": {"type": ["string", "null"]}}},
+        {"type": "object", "properties": {"a": {"type": "string", "format": "email"}}},
+        {"type": "object", "properties": {"a": {"$ref": "https://example.com/schema.json"}}},
+        {"type": "object", "properties": {"1a": {"type": "string"}}},
+        {
+            "type": "object",
+            "properties": {"a": {"$ref": "#/$defs/Node"}},
+            "$defs": {"Node": {"type": "object", "properties": {"child": {"$ref": "#/$defs/Node"}}}},
+        },
+        # Draft-4 boolean exclusive bounds
+        {"type": "object", "properties": {"a": {"type": "integer", "minimum": 0, "exclusiveMinimum": True}}},
+        {"type": "object", "properties": {"a": {"type": "number", "maximum": 10, "exclusiveMaximum": False}}},
+        {"type": "object", "properties": {"a": {"type": "string", "maxLength": "10"}}},
+        # Tuple validation
+        {"type": "object", "properties": {"a": {"type": "array", "items": [{"type": "string"}, {"type": "integer"}]}}},
+        {"type": "object", "properties": {"a": {"type": "array", "items": False}}},
+        {"type": "object", "properties": {"a": {"type": "object", "additionalProperties": False}}},
+    ],
+)
+def test_compile_json_schema_unsupported(schema):
+    with pytest.raises(UnsupportedJsonSchemaError):
+        compile_json_schema(schema, "Model")
+
+
+def test_jsonschemastr_to_model_codegen_fallback():
+    schema = {
+        "title": "Fallback",
+        "type": "object",
+        "properties": {"value": {"oneOf": [{"type": "string"}, {"type": "integer"}]}},
+    }
+    model = jsonschemastr_to_model(json.dumps(schema), "Fallback")
+    assert model.model_validate({"value": 1}).value == 1
+    assert model.model_validate({"value": "a"}).value == "a"
+
+
+def test_jsonschemastr_to_model_draft4_exclusive_minimum():
+    schema = {
+        "title": "Draft4",
+        "type": "object",
+        "properties": {"count": {"type": "integer", "minimum": 0, "exclusiveMinimum": True}},
+    }
+    model = jsonschemastr_to_model(json.dumps(schema), "Draft4")
+    assert model.model_validate({"count": 1}).count == 1
+    with pytest.raises(ValidationError):
+        model.model_validate({"count": 0})
+
+
+@pytest.mark.benchmark
+def test_compile_json_schema_benchmark():
+    """Benchmark the in-memory compiler against code generation on every catalog schema"""
+    schemas = [registry.json_schema(domain) for domain in registry.list_schemas()]
+
+    start = time.perf_counter()
+    for schema in schemas:
+        codegen_jsonschemastr_to_model(json.dumps(schema), schema["title"])
+    codegen_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for schema in schemas:
+        compile_json_schema(schema, schema["title"])
+    compiler_s = time.perf_counter() - start
+
+    logger.info(
+        f"Compiled {len(schemas)} schemas: codegen={codegen_s * 1e3:.0f} ms, compiler={compiler_s * 1e3:.0f} ms "
+        f"({codegen_s / compiler_s:.1f}x faster)"
+    )
+    assert codegen_s / compiler_s >= 10
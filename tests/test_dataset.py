@@ -1,3 +1,6 @@
+import pytest
+
+
 def test_dataset_samples():
     from vlmrun.hub.dataset import VLMRUN_HUB_DATASET
 
@@ -6,3 +9,149 @@ def test_dataset_samples():
         assert sample.prompt is not None, "Sample prompt must be present"
         assert sample.data is not None, "Sample data must be present"
         assert sample.response_model is not None, "Sample response model must be present"
+
+
+def test_dataset_lazy_import():
+    """Test that picking a single domain only imports that domain's schema module, and no image libraries"""
+    import subprocess
+    import sys
+
+    code = """
+import sys
+from vlmrun.hub.dataset import VLMRUN_HUB_DATASET
+assert "document.receipt" in VLMRUN_HUB_DATASET
+assert len(VLMRUN_HUB_DATASET) > 2
+sample = VLMRUN_HUB_DATASET["document.invoice"]
+assert sample.response_model.__name__ == "Invoice"
+assert VLMRUN_HUB_DATASET["document.invoice"] is sample
+loaded = sorted(
+    name for name, module in list(sys.modules.items())
+    if (name.startswith("vlmrun.hub.schemas.") and getattr(module, "__file__", None))
+    or name in ("PIL", "vlmrun.common.pdf", "vlmrun.common.utils")
+)
+print(",".join(loaded))
+"""
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip().splitlines()[-1] == "vlmrun.hub.schemas.document.invoice"
+
+
+def test_dataset_uses_registry_catalog():
+    from vlmrun.hub.dataset import VLMRUN_HUB_DATASET
+    from vlmrun.hub.registry import registry
+
+    assert list(VLMRUN_HUB_DATASET) == [name for name, item in registry.catalog_items().items() if item.sample_data]
+    sample = VLMRUN_HUB_DATASET["document.invoice"]
+    assert sample.response_model is registry["document.invoice"]
+    assert sample.prompt == registry.catalog_item("document.invoice").prompt
+    assert "missing.domain" not in VLMRUN_HUB_DATASET
+
+
+def test_dataset_keeps_overridden_domains(monkeypatch):
+    """Test that a catalog domain overridden with `register()` keeps its samples, with the new response model"""
+    from pydantic import BaseModel
+
+    from vlmrun.hub.dataset import VLMRUN_HUB_DATASET
+    from vlmrun.hub.registry import registry
+
+    class CustomInvoice(BaseModel):
+        total: float
+
+    item = registry.catalog_item("document.invoice")
+    monkeypatch.setattr(registry, "_state", registry.state)
+    registry.register("document.invoice", CustomInvoice)
+    assert registry.catalog_item("document.invoice") is item
+    assert "document.invoice" in VLMRUN_HUB_DATASET and "document.invoice" in list(VLMRUN_HUB_DATASET)
+    sample = VLMRUN_HUB_DATASET["document.invoice"]
+    assert sample.response_model is CustomInvoice and sample.prompt == item.prompt
+
+
+def test_dataset_multiple_samples_and_shards(monkeypatch):
+    from vlmrun.hub.dataset import HubDataset
+    from vlmrun.hub.registry import (
+        RegistryState,
+        SchemaCatalogItem,
+        SchemaEntry,
+        registry,
+    )
+
+    entries = {}
+    for name, sample_data in [
+        ("a", "a.png"),
+        ("b", ["b-0.png", "b-1.pdf", "b-2.jpg", "b-0.png"]),
+        ("c", ["c-0.png", "c-1.png"]),
+        ("empty", None),
+    ]:
+        item = SchemaCatalogItem(
+            domain=f"test.{name}",
+            schema="vlmrun.hub.schemas.document.invoice.Invoice",
+            prompt="",
+            sample_data=sample_data,
+        )
+        entries[item.domain] = SchemaEntry(item=item)
+    monkeypatch.setattr(registry, "_initialized", True)
+    monkeypatch.setattr(registry, "_state", RegistryState().update(entries))
+
+    dataset = HubDataset()
+    assert list(dataset) == ["test.a", "test.b", "test.c"] and "test.empty" not in dataset
+    samples = dataset.samples()
+    assert [sample.data for sample in samples] == ["a.png", "b-0.png", "b-1.pdf", "b-2.jpg", "c-0.png", "c-1.png"]
+    assert dataset["test.b"] is samples[1] and dataset.samples(["test.b"]) == samples[1:4]
+    assert dataset.samples() == samples and dataset.samples()[2] is samples[2]
+
+    # Ids are stable: they only depend on the domain and the sample URL
+    ids = [sample.id for sample in samples]
+    assert len(set(ids)) == len(ids) and all(id.startswith(sample.domain + "/") for id, sample in zip(ids, samples))
+    assert ids == [sample.id for sample in HubDataset().samples()]
+
+    shards = [dataset.shard(index, 4) for index in range(4)]
+    assert sorted(sample.id for shard in shards for sample in shard) == sorted(ids)
+    assert [len(shard) for shard in shards] == [2, 2, 1, 1]
+    assert [sample.id for sample in HubDataset().shard(1, 4)] == [sample.id for sample in shards[1]]
+    with pytest.raises(ValueError):
+        dataset.shard(4, 4)
+
+
+def test_prefetch(artifact_server, tmp_path, monkeypatch):
+    from io import BytesIO
+
+    from PIL import Image
+    from pydantic import BaseModel
+
+    from vlmrun.hub import dataset
+    from vlmrun.hub.artifacts import ArtifactCache
+
+    image = Image.new("RGB", (16, 16), "blue")
+    for index in range(6):
+        buffer = BytesIO()
+        image.save(buffer, format="PNG")
+        artifact_server.files[f"/sample-{index}.png"] = buffer.getvalue()
+    buffer = BytesIO()
+    image.save(buffer, format="PDF", save_all=True, append_images=[image])
+    artifact_server.files["/sample.pdf"] = buffer.getvalue()
+    artifact_server.delay = 0.05
+
+    urls = {f"test.image-{index}": f"{artifact_server.url}/sample-{index}.png" for index in range(6)}
+    urls["test.pdf"] = f"{artifact_server.url}/sample.pdf"
+    urls["test.missing"] = f"{artifact_server.url}/missing.png"
+    samples = {
+        domain: dataset.HubSample(domain=domain, response_model=BaseModel, prompt="", data=url)
+        for domain, url in urls.items()
+    }
+    monkeypatch.setattr(dataset, "ARTIFACT_CACHE", ArtifactCache(tmp_path))
+
+    results = {
+        result.domain: result for result in dataset.prefetch(max_workers=8, max_per_host=3, samples=samples.values())
+    }
+
+    assert results["test.pdf"].num_images == 2 and results["test.pdf"].error is None
+    assert all(results[f"test.image-{index}"].num_images == 1 for index in range(6))
+    assert results["test.missing"].error is not None
+    assert all(result.download_s > 0 for result in results.values() if result.error is None)
+    # Bounded per host, but concurrent
+    assert artifact_server.max_inflight == 3
+
+    # Decoded images are memoized on the samples, nothing is downloaded twice
+    images = samples["test.pdf"].images
+    assert dataset.prefetch(samples=[samples["test.pdf"]])[0].num_images == 2
+    assert samples["test.pdf"].images is images
+    assert set(artifact_server.downloads.values()) == {1}
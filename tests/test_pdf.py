@@ -0,0 +1,88 @@
+import subprocess
+import sys
+
+import pytest
+from loguru import logger
+from pydantic import BaseModel
+
+from vlmrun.hub.dataset import HubSample
+from vlmrun.hub.pdf import iter_pdf_pages, pdf_page_count
+
+
+def make_pdf(path, n_pages: int, width: int = 612, height: int = 792, distinct: bool = True):
+    """Write a synthetic PDF; with `distinct`, page i is `width + i` points wide so pages can be told apart."""
+    import pypdfium2 as pdfium
+
+    doc = pdfium.PdfDocument.new()
+    for index in range(n_pages):
+        doc.new_page(width + (index if distinct else 0), height)
+    doc.save(str(path))
+    doc.close()
+    return path
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    return make_pdf(tmp_path / "sample.pdf", 6, width=100, height=50)
+
+
+def test_iter_pdf_pages(pdf_path):
+    assert pdf_page_count(pdf_path) == 6
+    assert [image.size for image in iter_pdf_pages(pdf_path)] == [(100 + i, 50) for i in range(6)]
+    assert [image.width for image in iter_pdf_pages(pdf_path, pages=range(2, 4))] == [102, 103]
+    assert [image.width for image in iter_pdf_pages(pdf_path, pages=[-1, 0])] == [105, 100]
+    assert [image.size for image in iter_pdf_pages(pdf_path, pages=[0], dpi=144)] == [(200, 100)]
+    with pytest.raises(IndexError):
+        list(iter_pdf_pages(pdf_path, pages=[6]))
+
+
+def test_hub_sample_page_batches(pdf_path):
+    sample = HubSample(domain="test", response_model=BaseModel, prompt="", data=str(pdf_path))
+    assert [len(batch) for batch in sample.iter_image_batches(4)] == [4, 2]
+    assert [[image.width for image in batch] for batch in sample.iter_image_batches(2, pages=range(1, 4))] == [
+        [101, 102],
+        [103],
+    ]
+    assert [image.width for image in sample.images] == [100 + i for i in range(6)]
+
+
+MEMORY_BENCHMARK = """
+import sys
+from vlmrun.hub.pdf import iter_pdf_pages
+
+def peak_rss_mb():
+    # `VmHWM` is this process's own peak: `ru_maxrss` would include the peak of the (forked) pytest parent
+    with open("/proc/self/status") as status:
+        return next(int(line.split()[1]) for line in status if line.startswith("VmHWM")) / 1024
+
+path, mode = sys.argv[1], sys.argv[2]
+pages = iter_pdf_pages(path, dpi=72)
+if mode == "list":
+    pages = list(pages)
+checkpoints = []
+for index, image in enumerate(pages):
+    image.getpixel((0, 0))
+    if index in (49, 499):
+        checkpoints.append(peak_rss_mb())
+print(*checkpoints)
+"""
+
+
+@pytest.mark.benchmark
+def test_pdf_streaming_memory_benchmark(tmp_path):
+    """Peak RSS when rendering a 500-page PDF: streaming stays flat, materializing grows with the page count."""
+    path = make_pdf(tmp_path / "large.pdf", 500, distinct=False)
+
+    peaks = {}
+    for mode in ("stream", "list"):
+        result = subprocess.run(
+            [sys.executable, "-c", MEMORY_BENCHMARK, str(path), mode], capture_output=True, text=True, check=True
+        )
+        peaks[mode] = [float(value) for value in result.stdout.split()]
+        logger.info(
+            f"Rendering a 500-page PDF [{mode}]: peak RSS after 50 pages={peaks[mode][0]:.0f}MB, "
+            f"after 500 pages={peaks[mode][1]:.0f}MB"
+        )
+    stream_after_50, stream_after_500 = peaks["stream"]
+    assert stream_after_500 < stream_after_50 * 1.1
+    assert stream_after_500 < peaks["list"][1] / 4
@@ -4,7 +4,12 @@ import pytest
 from pydantic import BaseModel
 from ruamel.yaml.parser import ParserError
 
-from vlmrun.hub.registry import Registry, SchemaCatalogItem, SchemaCatalogYaml
+from vlmrun.hub.registry import (
+    Registry,
+    SchemaCatalogItem,
+    SchemaCatalogSnapshot,
+    SchemaCatalogYaml,
+)
 
 
 @pytest.fixture
@@ -52,7 +57,7 @@ def test_registry_repr(registry):
 def test_registry_list_schemas(registry):
     """Test listing available schemas"""
     schemas = registry.list_schemas()
-    assert isinstance(schemas, list)
+    assert isinstance(schemas, tuple)
     assert len(schemas) > 0
     assert "document.receipt" in schemas
     assert "document.resume" in schemas
@@ -142,3 +147,300 @@ def test_registry_detailed_key_error(registry):
     assert "Available schemas:" in error_msg
     assert "document.receipt" in error_msg
     assert "document.resume" in error_msg
+
+
+def _run_python(code: str) -> str:
+    import subprocess
+    import sys
+
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return result.stdout.strip().splitlines()[-1]
+
+
+def test_registry_lazy_schema_import():
+    """Test that accessing a single domain only imports that domain's schema module"""
+    code = """
+import sys
+from vlmrun.hub.registry import registry
+assert "document.receipt" in registry
+assert registry.get_domain_info("document.receipt")["tags"]
+assert len(registry.list_schemas()) > 2
+repr(registry)
+_ = registry["document.invoice"]
+loaded = sorted(
+    name for name, module in list(sys.modules.items())
+    if name.startswith("vlmrun.hub.schemas.") and getattr(module, "__file__", None)
+)
+print(",".join(loaded))
+"""
+    loaded = _run_python(code).split(",")
+    assert loaded == ["vlmrun.hub.schemas.document.invoice"]
+
+
+def test_registry_lazy_schemas_mapping(registry):
+    """Test that the lazy schemas mapping resolves to schema classes"""
+    schemas = registry.schemas
+    assert len(schemas) == len(registry.list_schemas())
+    assert set(schemas) == set(registry.list_schemas())
+    assert all(issubclass(schema, BaseModel) for schema in schemas.values())
+
+
+def test_registry_register_overrides_lazy_entry(registry):
+    """Test that an explicitly registered schema takes precedence over a lazy catalog entry"""
+
+    class CustomReceipt(BaseModel):
+        total: float
+
+    original = registry["document.receipt"]
+    try:
+        registry.register("document.receipt", CustomReceipt)
+        assert registry["document.receipt"] is CustomReceipt
+    finally:
+        registry.register("document.receipt", original)
+
+
+@pytest.mark.benchmark
+def test_registry_cold_start_benchmark():
+    """Benchmark cold-start time and peak RSS of a single-domain lookup vs. importing every schema"""
+    from loguru import logger
+
+    template = """
+import time
+t0 = time.perf_counter()
+from vlmrun.hub.registry import registry
+{body}
+elapsed = time.perf_counter() - t0
+# `VmHWM` is this process's own peak: `ru_maxrss` would include the peak of the (forked) pytest parent
+with open("/proc/self/status") as status:
+    peak_rss = next(int(line.split()[1]) for line in status if line.startswith("VmHWM"))
+print(f"{{elapsed * 1e3:.1f}},{{peak_rss / 1024:.1f}}")
+"""
+    lazy = _run_python(template.format(body='registry["document.invoice"]'))
+    eager = _run_python(template.format(body="list(registry.schemas.values())"))
+    lazy_ms, lazy_rss = map(float, lazy.split(","))
+    eager_ms, eager_rss = map(float, eager.split(","))
+    logger.info(f"Single domain: {lazy_ms:.1f} ms, peak RSS {lazy_rss:.1f} MB")
+    logger.info(f"All domains:   {eager_ms:.1f} ms, peak RSS {eager_rss:.1f} MB")
+
+
+def test_registry_json_schema_cache(registry):
+    """Test that JSON schemas and hashes are computed once per domain with canonical serialization"""
+    import hashlib
+    import json
+
+    json_schema = registry.json_schema("document.invoice")
+    assert json_schema == registry["document.invoice"].model_json_schema()
+    assert registry.json_schema("document.invoice") is json_schema
+    assert registry.json_schema_bytes("document.invoice") == json.dumps(json_schema, sort_keys=True).encode()
+    expected_hash = hashlib.sha256(json.dumps(json_schema, sort_keys=True).encode()).hexdigest()[:8]
+    assert registry.schema_hash("document.invoice") == expected_hash
+
+    catalog = SchemaCatalogYaml.from_yaml(Path(__file__).parent.parent / "vlmrun" / "hub" / "catalog.yaml")
+    item = next(schema for schema in catalog.schemas if schema.domain == "document.invoice")
+    assert item.schema_hash == expected_hash
+
+    with pytest.raises(KeyError, match="Available schemas:"):
+        registry.schema_hash("non.existent.schema")
+
+
+def test_registry_register_invalidates_json_schema(registry):
+    """Test that re-registering a domain invalidates its cached JSON schema and hash"""
+
+    class CustomReceipt(BaseModel):
+        total: float
+
+    original = registry["document.receipt"]
+    original_hash = registry.schema_hash("document.receipt")
+    try:
+        registry.register("document.receipt", CustomReceipt)
+        assert registry.json_schema("document.receipt") == CustomReceipt.model_json_schema()
+        assert registry.schema_hash("document.receipt") != original_hash
+    finally:
+        registry.register("document.receipt", original)
+    assert registry.schema_hash("document.receipt") == original_hash
+
+
+def test_registry_find(registry):
+    """Test querying domains by tags, supported inputs and category"""
+
+    def scan(tags=(), supported_inputs=(), category=None):
+        matches = []
+        for domain in registry.list_schemas():
+            info = registry.get_domain_info(domain)
+            if not set(tags) <= set(info.get("tags") or []):
+                continue
+            if not set(supported_inputs) <= set(info.get("supported_inputs") or []):
+                continue
+            if category is not None and not domain.startswith(f"{category}."):
+                continue
+            matches.append(domain)
+        return matches
+
+    assert "document.invoice" in registry.find(tags="finance")
+    assert registry.find(tags="finance") == scan(tags=["finance"])
+    assert registry.find(tags=["finance", "work"]) == scan(tags=["finance", "work"])
+    assert registry.find(supported_inputs="video") == scan(supported_inputs=["video"])
+    assert registry.find(category="document") == scan(category="document")
+    assert registry.find(tags=["finance"], supported_inputs=["document"], category="document") == scan(
+        tags=["finance"], supported_inputs=["document"], category="document"
+    )
+    assert registry.find(category="doc") == []
+    assert registry.find(tags="non-existent-tag") == []
+    assert registry.find() == list(registry.list_schemas())
+
+
+def test_registry_find_updated_by_register(cold_registry):
+    """Test that the indexes and sorted names are maintained incrementally by register()"""
+    registry = cold_registry
+
+    class CustomModel(BaseModel):
+        total: float
+
+    names = registry.list_schemas()
+    assert registry.list_schemas() is names, "Sorted names must be cached between calls"
+    assert isinstance(names, tuple), "Shared names must be immutable"
+
+    metadata = {"tags": ["finance", "custom-tag"], "supported_inputs": ["image"]}
+    registry.register("zz-test.custom", CustomModel, metadata)
+    assert registry.find(tags="custom-tag") == ["zz-test.custom"]
+    assert "zz-test.custom" in registry.find(tags="finance", supported_inputs="image")
+    assert registry.find(category="zz-test") == ["zz-test.custom"]
+    assert registry.list_schemas() == tuple(sorted([*names, "zz-test.custom"]))
+    assert "zz-test.custom" not in names, "Earlier results must not change on register()"
+
+    registry.register("zz-test.custom", CustomModel, {"tags": ["other-tag"]})
+    assert registry.find(tags="custom-tag") == []
+    assert registry.find(tags="other-tag") == ["zz-test.custom"]
+
+
+@pytest.fixture
+def cold_registry(monkeypatch):
+    """Create a registry instance that has not loaded any catalogs yet"""
+    monkeypatch.setattr(Registry, "_instance", None)
+    return Registry()
+
+
+def test_registry_get_domain_info_cold(cold_registry):
+    """Test that the catalog metadata of a domain is available on a cold registry"""
+    info = cold_registry.get_domain_info("document.invoice")
+    assert info["description"] and "finance" in info["tags"]
+    assert cold_registry.get_domain_info("missing.domain") == {}
+
+
+def test_registry_concurrent_cold_start(cold_registry, monkeypatch):
+    """Test that concurrent readers during a cold start wait on a single load and never see a partial registry"""
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    loads = []
+    load_catalog = Registry._load_catalog
+
+    def slow_load_catalog(self, path):
+        loads.append(path)
+        time.sleep(0.05)
+        load_catalog(self, path)
+
+    monkeypatch.setattr(Registry, "_load_catalog", slow_load_catalog)
+    monkeypatch.setattr(Registry, "_load_snapshot", lambda self, path: False)
+
+    domains = ["document.invoice", "document.receipt", "document.resume", "document.bank-check"]
+    n_threads = 32
+    barrier = threading.Barrier(n_threads)
+
+    def worker(index: int):
+        barrier.wait()
+        results = []
+        for step in range(50):
+            domain = domains[(index + step) % len(domains)]
+            results.append((domain, cold_registry[domain], len(cold_registry.list_schemas())))
+        return results
+
+    with ThreadPoolExecutor(max_workers=n_threads) as executor:
+        results = [r for rs in executor.map(worker, range(n_threads)) for r in rs]
+
+    assert len(loads) == len(set(loads)) == 2, "Default and contrib catalogs must be loaded exactly once"
+    n_schemas = len(cold_registry.list_schemas())
+    for domain, schema, count in results:
+        assert schema is cold_registry[domain]
+        assert count == n_schemas
+
+
+@pytest.fixture(scope="module")
+def catalog_snapshot(tmp_path_factory):
+    from vlmrun.hub.constants import (
+        VLMRUN_HUB_CATALOG_PATH,
+        VLMRUN_HUB_CONTRIB_CATALOG_PATH,
+    )
+
+    snapshot = SchemaCatalogSnapshot.build([VLMRUN_HUB_CATALOG_PATH, VLMRUN_HUB_CONTRIB_CATALOG_PATH])
+    path = tmp_path_factory.mktemp("snapshot") / "catalog.snapshot.json"
+    snapshot.save(path)
+    return path
+
+
+def test_catalog_snapshot_roundtrip(catalog_snapshot, registry):
+    """Test that a freshly built snapshot loads back with the full catalog"""
+    snapshot = SchemaCatalogSnapshot.load(catalog_snapshot)
+    assert snapshot is not None
+    domains = [schema.domain for schema in snapshot.schemas]
+    assert set(domains) <= set(registry.list_schemas())
+    assert "document.invoice" in domains
+    assert snapshot.json_schemas["document.invoice"] == registry["document.invoice"].model_json_schema()
+    assert len(snapshot.schema_hashes["document.invoice"]) == 8
+
+
+def test_catalog_snapshot_stale(tmp_path):
+    """Test that a snapshot is ignored once its source catalog changes"""
+    from vlmrun.hub.constants import VLMRUN_HUB_CATALOG_PATH
+
+    catalog_path = tmp_path / "catalog.yaml"
+    catalog_path.write_text(VLMRUN_HUB_CATALOG_PATH.read_text())
+    snapshot_path = tmp_path / "catalog.snapshot.json"
+    SchemaCatalogSnapshot.build([catalog_path], root=tmp_path).save(snapshot_path)
+    assert SchemaCatalogSnapshot.load(snapshot_path, root=tmp_path) is not None
+
+    catalog_path.write_text(catalog_path.read_text() + "\n# modified\n")
+    assert SchemaCatalogSnapshot.load(snapshot_path, root=tmp_path) is None
+    assert SchemaCatalogSnapshot.load(tmp_path / "missing.json", root=tmp_path) is None
+
+
+def test_registry_loads_fresh_snapshot(catalog_snapshot):
+    """Test that the registry loads a fresh snapshot without parsing any YAML"""
+    code = f"""
+import sys
+from pathlib import Path
+import vlmrun.hub.constants as constants
+constants.VLMRUN_HUB_CATALOG_SNAPSHOT_PATH = Path({str(catalog_snapshot)!r})
+from vlmrun.hub.registry import registry
+assert registry["document.invoice"].__name__ == "Invoice"
+schema_hash = registry.schema_hash("document.receipt")
+hash_computed = registry._entry("document.receipt")._json_schema_bytes is not None
+print(len(registry.list_schemas()), "ruamel.yaml" in sys.modules, "vlmrun.hub.schemas.document.receipt" in sys.modules, schema_hash, hash_computed)
+"""
+    n_schemas, yaml_loaded, receipt_loaded, schema_hash, hash_computed = _run_python(code).split()
+    assert int(n_schemas) == len(Registry().list_schemas())
+    assert yaml_loaded == "False"
+    assert receipt_loaded == "False", "JSON schemas from the snapshot must not require importing the schema module"
+    assert schema_hash == Registry().schema_hash("document.receipt")
+    assert hash_computed == "False", "Schema hashes from the snapshot must not be recomputed"
+
+
+@pytest.mark.benchmark
+def test_catalog_snapshot_benchmark(catalog_snapshot):
+    """Benchmark registry startup from YAML vs. from a precompiled snapshot"""
+    from loguru import logger
+
+    template = """
+import time
+from pathlib import Path
+t0 = time.perf_counter()
+import vlmrun.hub.constants as constants
+constants.VLMRUN_HUB_CATALOG_SNAPSHOT_PATH = Path({path!r})
+from vlmrun.hub.registry import registry
+registry.list_schemas()
+print(f"{{(time.perf_counter() - t0) * 1e3:.1f}}")
+"""
+    yaml_ms = float(_run_python(template.format(path="/nonexistent.json")))
+    snapshot_ms = float(_run_python(template.format(path=str(catalog_snapshot))))
+    logger.info(f"Registry startup from YAML: {yaml_ms:.1f} ms, from snapshot: {snapshot_ms:.1f} ms")
@@ -0,0 +1,137 @@
+import gc
+import time
+
+import pytest
+from loguru import logger
+
+from vlmrun.hub.registry import registry
+from vlmrun.hub.search import SearchIndex, json_schema_text, tokenize
+
+
+def test_tokenize():
+    assert tokenize("SWIFT/BIC code (swift_bic)") == ["swift", "bic", "code", "swift", "bic"]
+
+
+def test_json_schema_text():
+    texts = json_schema_text(registry.json_schema("document.invoice"))
+    assert "International Bank Account Number (IBAN)" in texts
+    assert "swift_bic" in texts
+
+
+def test_search_index_ranking():
+    index = SearchIndex(
+        {
+            "a": "invoice with iban and swift bank details",
+            "b": "receipt with totals",
+            "c": "bank statement with iban",
+        }
+    )
+    results = index.search("iban swift")
+    assert [doc_id for doc_id, _ in results] == ["a", "c"]
+    assert results[0][1] > results[1][1] > 0
+    assert index.search("unknown words") == []
+    assert len(index.search("with", k=2)) == 2
+
+
+def _exhaustive_search(index, query, k=10):
+    """Score every document of every query term (the search without pruning), as a reference."""
+    scores = {}
+    for term in dict.fromkeys(tokenize(query)):
+        for doc_id, weight in index.postings.get(term, {}).items():
+            scores[doc_id] = scores.get(doc_id, 0.0) + weight
+    return sorted(scores.values(), reverse=True)[:k]
+
+
+SEARCH_QUERIES = [
+    "iban swift",
+    "patient diagnosis",
+    "lease tenant",
+    "calories protein",
+    "passport nationality",
+    "total amount due date",
+    "name of the document",
+    "date of birth and address of the person",
+    "the total tax amount of the invoice",
+]
+"""Rare-term and realistic multi-term queries (the common terms of the latter cover most schemas)"""
+
+
+def test_search_index_pruning_exact():
+    documents = []
+    for name in registry.list_schemas():
+        documents.append((name, [name, registry.get_domain_info(name).get("description") or ""]))
+        documents[-1][1].extend(json_schema_text(registry.json_schema(name)))
+    index = SearchIndex.from_texts(documents)
+    for exhaustive_postings in (SearchIndex.EXHAUSTIVE_POSTINGS, 0):
+        # The catalog is small enough for every query to be scored exhaustively, unless pruning is forced
+        index.EXHAUSTIVE_POSTINGS = exhaustive_postings
+        for query in SEARCH_QUERIES:
+            for k in (1, 3, 10, 100):
+                results = index.search(query, k=k)
+                assert [score for _, score in results] == pytest.approx(_exhaustive_search(index, query, k)), query
+                assert results == sorted(results, key=lambda item: item[1], reverse=True)
+
+
+def test_registry_search():
+    assert registry.search("iban swift")[0] == "document.invoice"
+    assert registry.search("nutrition calories", k=1) == ["food.nutrition-facts-label"]
+    assert registry.search("lease tenant landlord")[0] == "real-estate.lease-agreement"
+    assert registry.search("") == []
+
+
+def test_registry_search_index_reused():
+    registry.search("invoice")
+    index = registry._get_search_index()
+    registry.search("receipt")
+    assert registry._get_search_index() is index
+
+
+@pytest.mark.benchmark
+def test_search_index_benchmark():
+    """Benchmark query latency with the catalog replicated to 10k synthetic domains"""
+    documents = []
+    for name in registry.list_schemas():
+        entry_texts = [name, registry.get_domain_info(name).get("description") or ""]
+        entry_texts.extend(json_schema_text(registry.json_schema(name)))
+        documents.append((name, entry_texts))
+
+    n_domains = 10_000
+    synthetic = [(f"{name}-{i}", texts) for i in range(n_domains // len(documents) + 1) for name, texts in documents]
+    synthetic = synthetic[:n_domains]
+
+    start = time.perf_counter()
+    index = SearchIndex.from_texts(synthetic)
+    build_ms = (time.perf_counter() - start) * 1e3
+
+    for query in SEARCH_QUERIES:
+        assert [score for _, score in index.search(query)] == pytest.approx(_exhaustive_search(index, query))
+
+    # The index is long-lived: keep the garbage collector from scanning its 10k postings on every collection
+    gc.collect()
+    gc.freeze()
+    try:
+        latencies = {query: [] for query in SEARCH_QUERIES}
+        for _ in range(100):
+            for query in SEARCH_QUERIES:
+                start = time.perf_counter()
+                index.search(query, k=10)
+                latencies[query].append((time.perf_counter() - start) * 1e3)
+        start = time.perf_counter()
+        for _ in range(10):
+            for query in SEARCH_QUERIES:
+                _exhaustive_search(index, query)
+        exhaustive_ms = (time.perf_counter() - start) * 1e3 / 10 / len(SEARCH_QUERIES)
+    finally:
+        gc.unfreeze()
+    all_latencies = sorted(latency for query_latencies in latencies.values() for latency in query_latencies)
+    p50, p99 = all_latencies[len(all_latencies) // 2], all_latencies[int(len(all_latencies) * 0.99)]
+    mean_ms = sum(all_latencies) / len(all_latencies)
+    slowest = max(SEARCH_QUERIES, key=lambda query: sorted(latencies[query])[50])
+    logger.info(
+        f"Search index [n_domains={n_domains}, n_terms={len(index.postings)}, build={build_ms:.0f} ms]: "
+        f"p50={p50:.3f} ms, p99={p99:.3f} ms, mean={mean_ms:.3f} ms (without pruning: {exhaustive_ms:.3f} ms), "
+        f"slowest query={slowest!r} (p50={sorted(latencies[slowest])[50]:.3f} ms)"
+    )
+    # Long questions with several common terms (e.g. "date of birth and address of the person") take a few ms
+    assert p50 < 1.0 and p99 < 10.0
+    assert mean_ms < exhaustive_ms / 2
@@ -1,3 +1,7 @@
+import subprocess
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
 import pytest
 from fastapi.testclient import TestClient
 
@@ -45,6 +49,615 @@ def test_get_schema_valid_domain(client):
     assert "schema_hash" in data
 
 
+def test_get_schema_matches_registry(client):
+    import hashlib
+    import json
+
+    from vlmrun.hub.registry import registry
+
+    response = client.post("/schema", json={"domain": "document.invoice"})
+    assert response.status_code == 200
+    data = response.json()
+    json_schema = registry["document.invoice"].model_json_schema()
+    assert data["json_schema"] == json_schema
+    assert data["schema_version"] == __version__
+    assert data["schema_hash"] == hashlib.sha256(json.dumps(json_schema, sort_keys=True).encode()).hexdigest()[:8]
+
+
 def test_get_schema_invalid_domain(client):
     response = client.post("/schema", json={"domain": "invalid.domain"})
     assert response.status_code == 404
+
+
+def test_get_schema_conditional(client):
+    from vlmrun.hub.registry import registry
+
+    schema_hash = registry.schema_hash("document.invoice")
+    identity = {"Accept-Encoding": "identity"}
+    response = client.get("/schema/document.invoice", headers=identity)
+    assert response.status_code == 200
+    assert response.json() == registry["document.invoice"].model_json_schema()
+    assert response.headers["etag"] == f'"{schema_hash}"'
+    assert response.headers["cache-control"] == "public, no-cache"
+    assert response.headers["content-location"] == f"/schema/by-hash/{schema_hash}"
+
+    # Each content coding has its own (strong) ETag
+    response = client.get("/schema/document.invoice", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip" and response.headers["etag"] == f'"{schema_hash}-gz"'
+
+    for if_none_match in (
+        f'"{schema_hash}"',
+        f'W/"{schema_hash}"',
+        f'"deadbeef", "{schema_hash}"',
+        f'"{schema_hash}-gz"',
+        f'"{schema_hash}-br"',
+        "*",
+    ):
+        response = client.get("/schema/document.invoice", headers={**identity, "If-None-Match": if_none_match})
+        assert response.status_code == 304 and response.content == b""
+        assert response.headers["etag"] == f'"{schema_hash}"'
+    response = client.get(
+        "/schema/document.invoice", headers={"Accept-Encoding": "gzip", "If-None-Match": f'"{schema_hash}"'}
+    )
+    assert response.status_code == 304 and response.headers["etag"] == f'"{schema_hash}-gz"'
+    assert client.get("/schema/document.invoice", headers={"If-None-Match": '"deadbeef"'}).status_code == 200
+    assert client.get("/schema/invalid.domain").status_code == 404
+
+
+def test_get_schema_by_hash(client):
+    from vlmrun.hub.registry import registry
+
+    schema_hash = registry.schema_hash("document.receipt")
+    response = client.get(f"/schema/by-hash/{schema_hash}", headers={"Accept-Encoding": "identity"})
+    assert response.status_code == 200
+    assert response.content == registry.json_schema_bytes("document.receipt")
+    assert response.headers["etag"] == f'"{schema_hash}"'
+    assert "immutable" in response.headers["cache-control"]
+    response = client.get(f"/schema/by-hash/{schema_hash}", headers={"If-None-Match": f'"{schema_hash}"'})
+    assert response.status_code == 304
+    assert client.get("/schema/by-hash/00000000").status_code == 404
+
+
+def test_list_domains_hashes_and_etag(client):
+    from vlmrun.hub.registry import registry
+
+    response = client.get("/domains")
+    hashes = {info["domain"]: info["schema_hash"] for info in response.json()}
+    assert hashes["document.invoice"] == registry.schema_hash("document.invoice")
+    assert all(hashes.values())
+    etag = response.headers["etag"]
+    assert client.get("/domains", headers={"If-None-Match": etag}).status_code == 304
+
+
+@pytest.mark.benchmark
+def test_schema_polling_benchmark(client):
+    """Compare the bytes and latency of clients polling every schema: `POST /schema` vs. conditional `GET /schema`."""
+    from concurrent.futures import ThreadPoolExecutor
+    from time import perf_counter
+
+    from loguru import logger
+
+    domains = [info["domain"] for info in client.get("/domains").json()]
+    etags = {domain: client.get(f"/schema/{domain}").headers["etag"] for domain in domains}
+    n_polls = 5
+
+    def poll(mode: str):
+        latencies, n_bytes = [], 0
+        for _ in range(n_polls):
+            for domain in domains:
+                start = perf_counter()
+                if mode == "POST":
+                    response = client.post("/schema", json={"domain": domain})
+                else:
+                    response = client.get(f"/schema/{domain}", headers={"If-None-Match": etags[domain]})
+                latencies.append(perf_counter() - start)
+                n_bytes += len(response.content)
+        return latencies, n_bytes
+
+    results = {}
+    for mode in ("POST", "GET"):
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            runs = list(executor.map(poll, [mode] * 8))
+        latencies = sorted(latency for run, _ in runs for latency in run)
+        n_bytes = sum(run_bytes for _, run_bytes in runs)
+        results[mode] = n_bytes
+        logger.info(
+            f"{mode} /schema: {len(latencies)} requests, {n_bytes / 1024:.0f}KB, "
+            f"p50={1e3 * latencies[len(latencies) // 2]:.2f}ms, p99={1e3 * latencies[int(len(latencies) * 0.99)]:.2f}ms"
+        )
+    assert results["GET"] == 0 < results["POST"]
+
+
+def test_ready_after_warmup(monkeypatch):
+    import time
+
+    from vlmrun.hub.server.responses import RESPONSES
+
+    monkeypatch.setattr(RESPONSES, "ready", False)
+    assert TestClient(app).get("/ready").status_code == 503
+
+    with TestClient(app) as client:  # Runs the startup warmup
+        deadline = time.time() + 60
+        while client.get("/ready").status_code != 200 and time.time() < deadline:
+            time.sleep(0.05)
+        assert client.get("/ready").json() == {"ready": True}
+    assert RESPONSES.peek("domains") is not None
+    assert RESPONSES.peek(("schema", "document.invoice")) is not None
+    assert RESPONSES.peek(("schema-post", "document.invoice")) is not None
+
+
+def test_cold_registry_loaded_off_event_loop(client, monkeypatch):
+    """On a cold registry (e.g. while the startup warmup loads it), no route loads it on the event loop"""
+    import asyncio
+
+    from vlmrun.hub.registry import Registry, RegistryState, registry
+
+    loads_on_event_loop = []
+    load_schemas = Registry.load_schemas
+
+    def checked_load_schemas(self, *args, **kwargs):
+        try:
+            loads_on_event_loop.append(asyncio.get_running_loop())
+        except RuntimeError:
+            pass
+        return load_schemas(self, *args, **kwargs)
+
+    monkeypatch.setattr(Registry, "load_schemas", checked_load_schemas)
+    requests = [
+        ("GET", "/domains", None),
+        ("GET", "/schema/document.invoice", None),
+        ("POST", "/schema", {"domain": "document.invoice"}),
+        ("POST", "/schemas", {}),
+        ("POST", "/schemas", {"domains": ["document.invoice"], "tags": ["finance"]}),
+        ("POST", "/schemas", {"domains": ["missing.domain"]}),
+    ]
+    for method, url, body in requests:
+        monkeypatch.setattr(registry, "_initialized", False)
+        monkeypatch.setattr(registry, "_state", RegistryState())
+        response = client.request(method, url, json=body)
+        assert response.status_code == (404 if body == {"domains": ["missing.domain"]} else 200), url
+        assert registry.loaded
+    assert loads_on_event_loop == []
+
+
+def test_precompressed_responses(client):
+    from vlmrun.hub.server.responses import _accepted_encodings
+
+    response = client.get("/domains", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip" and response.headers["vary"] == "Accept-Encoding"
+    assert len(response.json()) > 0
+    identity = client.get("/domains", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers and identity.json() == response.json()
+    assert response.headers["etag"] == identity.headers["etag"][:-1] + '-gz"'
+
+    response = client.post("/schema", json={"domain": "document.invoice"}, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip" and "json_schema" in response.json()
+
+    assert _accepted_encodings("br;q=1.0, gzip;q=0.5, deflate;q=0") == ("br", "gzip")
+    assert _accepted_encodings(None) == ()
+
+
+@pytest.mark.benchmark
+def test_precomputed_responses_benchmark(client, monkeypatch):
+    """Latency and throughput of `/domains` and `/schema`, building the responses per request vs. precomputed."""
+    from time import perf_counter
+
+    from loguru import logger
+
+    from vlmrun.hub.server import responses
+    from vlmrun.hub.server.responses import RESPONSES
+    from vlmrun.hub.server.routes import warmup
+
+    domains = [info["domain"] for info in client.get("/domains").json()][:20]
+    n_rounds = 10
+
+    def run(label: str):
+        latencies = []
+        start = perf_counter()
+        for _ in range(n_rounds):
+            for method, path, body in [("GET", "/domains", None)] + [
+                request
+                for domain in domains
+                for request in [("POST", "/schema", {"domain": domain}), ("GET", f"/schema/{domain}", None)]
+            ]:
+                request_start = perf_counter()
+                response = client.request(method, path, json=body, headers={"Accept-Encoding": "identity"})
+                latencies.append(perf_counter() - request_start)
+                assert response.status_code == 200
+        elapsed = perf_counter() - start
+        latencies.sort()
+        logger.info(
+            f"{label}: {len(latencies) / elapsed:.0f} req/s, p50={1e3 * latencies[len(latencies) // 2]:.2f}ms, "
+            f"p99={1e3 * latencies[int(len(latencies) * 0.99)]:.2f}ms"
+        )
+
+    with monkeypatch.context() as patch:
+        # Before: every response is built (and serialized, but not compressed) per request
+        patch.setattr(responses, "MIN_COMPRESS_BYTES", float("inf"))
+        patch.setattr(RESPONSES, "peek", lambda key: None)
+        patch.setattr(RESPONSES, "get", lambda key, build: build())
+        run("Per-request responses")
+    warmup()
+    run("Precomputed responses")
+
+
+def test_get_schemas_batch(client):
+    from vlmrun.hub.bundle import unbundle_json_schemas
+    from vlmrun.hub.registry import registry
+
+    response = client.post("/schemas", json={"domains": ["document.invoice", "document.receipt"]})
+    assert response.status_code == 200
+    bundle = response.json()
+    assert bundle["schema_version"] == __version__
+    assert bundle["schema_hashes"] == {
+        domain: registry.schema_hash(domain) for domain in ("document.invoice", "document.receipt")
+    }
+    schemas = unbundle_json_schemas(bundle)
+    assert schemas["document.invoice"] == registry.json_schema("document.invoice")
+
+    response = client.post("/schemas", json={"tags": ["finance"], "domains": ["document.resume"]})
+    assert set(response.json()["schemas"]) == set(registry.find(tags="finance")) | {"document.resume"}
+    assert set(client.post("/schemas", json={}).json()["schemas"]) == set(registry.list_schemas())
+    assert client.post("/schemas", json={"domains": ["invalid.domain"]}).status_code == 404
+
+
+@pytest.mark.benchmark
+def test_schema_bundle_size_benchmark(client):
+    """Payload size of the full catalog bundle vs. the sum of the individual `POST /schema` responses."""
+    import gzip
+
+    from loguru import logger
+
+    domains = [info["domain"] for info in client.get("/domains").json()]
+    individual = [
+        client.post("/schema", json={"domain": domain}, headers={"Accept-Encoding": "identity"}) for domain in domains
+    ]
+    individual_bytes = sum(len(response.content) for response in individual)
+    individual_gzip = sum(len(gzip.compress(response.content, 9)) for response in individual)
+    bundle = client.post("/schemas", json={}, headers={"Accept-Encoding": "identity"}).content
+    compressed = client.post("/schemas", json={}, headers={"Accept-Encoding": "br, gzip"})
+    n_compressed = int(compressed.headers.get("content-length", len(compressed.content)))
+    logger.info(
+        f"{len(domains)} schemas: individual={individual_bytes / 1024:.0f}KB ({len(domains)} requests, "
+        f"{individual_gzip / 1024:.0f}KB gzipped), bundle={len(bundle) / 1024:.0f}KB, "
+        f"bundle ({compressed.headers.get('content-encoding')})={n_compressed / 1024:.0f}KB"
+    )
+    assert len(bundle) < individual_bytes and n_compressed < individual_gzip
+
+
+VALID_INVOICE = {
+    "invoice_id": "INV-001",
+    "invoice_issue_date": "2024-01-15",
+    "issuer_name": "ACME",
+    "issuer_address": {"street": "1 Main St", "city": "Springfield"},
+    "items": [{"description": "Widget", "quantity": 2, "unit_price": 5.0, "total_price": 10.0}],
+    "total_amount": 10.0,
+}
+INVALID_INVOICE = {"invoice_issue_date": "not a date", "items": [{"quantity": "many"}]}
+
+
+def test_validate_document(client):
+    import json
+
+    response = client.post("/validate/document.invoice", content=json.dumps(VALID_INVOICE))
+    assert response.json() == {"valid": True, "errors": []}
+
+    response = client.post("/validate/document.invoice", content=json.dumps(INVALID_INVOICE))
+    result = response.json()
+    assert result["valid"] is False
+    assert [error["loc"] for error in result["errors"]] == [["invoice_issue_date"], ["items", 0, "quantity"]]
+    assert client.post("/validate/document.invoice", content=b"{not json").json()["errors"][0]["type"] == "json_invalid"
+    assert client.post("/validate/invalid.domain", content=b"{}").status_code == 404
+
+
+def test_validate_document_too_large(client, monkeypatch):
+    import json
+
+    from vlmrun.hub.server import routes
+
+    monkeypatch.setattr(routes, "MAX_DOCUMENT_BYTES", 64)
+    document = json.dumps(VALID_INVOICE).encode()
+    assert client.post("/validate/document.invoice", content=document).status_code == 413
+    # Without a Content-Length (chunked), the body is read up to the limit
+    response = client.post("/validate/document.invoice", content=iter([document[:50], document[50:]]))
+    assert response.status_code == 413
+    assert client.post("/validate/document.invoice", content=b"{}").json()["valid"] is True
+
+
+def test_validate_ndjson_stream(client, monkeypatch):
+    import json
+
+    from vlmrun.hub.server import routes
+
+    def body():
+        # Documents split across chunks at arbitrary offsets
+        stream = b"\n".join(
+            [json.dumps(VALID_INVOICE).encode(), b"", json.dumps(INVALID_INVOICE).encode(), b"[1, 2]", b"{}"]
+        )
+        for offset in range(0, len(stream), 7):
+            yield stream[offset : offset + 7]
+
+    headers = {"Content-Type": "application/x-ndjson"}
+    response = client.post("/validate/document.invoice", content=body(), headers=headers)
+    assert response.headers["content-type"] == "application/x-ndjson"
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [(result["line"], result["valid"]) for result in results] == [(1, True), (3, False), (4, False), (5, True)]
+    assert results[1]["errors"][0]["loc"] == ["invoice_issue_date"]
+    assert results[2]["errors"][0]["type"] == "model_type"
+
+    monkeypatch.setattr(routes, "MAX_DOCUMENT_BYTES", 64)
+    oversized = b"{}\n" + json.dumps(VALID_INVOICE).encode() + b"\n{}"
+    response = client.post(
+        "/validate/document.invoice", content=iter([oversized[:50], oversized[50:]]), headers=headers
+    )
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [(result["line"], result["valid"]) for result in results] == [(1, True), (2, False), (3, True)]
+    assert results[1]["errors"][0]["type"] == "too_large"
+
+
+def _stream_ndjson(port: int, path: str, chunks) -> int:
+    """POST a chunked NDJSON body over a raw socket while reading the streamed results; returns the result count."""
+    import socket
+    import threading
+
+    sock = socket.create_connection(("127.0.0.1", port))
+    sock.sendall(
+        f"POST {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/x-ndjson\r\n"
+        "Transfer-Encoding: chunked\r\n\r\n".encode()
+    )
+
+    def write():
+        for chunk in chunks:
+            sock.sendall(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+        sock.sendall(b"0\r\n\r\n")
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    n_results, tail = 0, b""
+    while not tail.endswith(b"\r\n0\r\n\r\n"):
+        data = sock.recv(1 << 16)
+        if not data:
+            break
+        # Results are JSON objects, one per line (chunk-size lines end with "\r\n")
+        n_results += (tail[-1:] + data).count(b"}\n")
+        tail = (tail + data)[-16:]
+    writer.join()
+    sock.close()
+    return n_results
+
+
+@contextmanager
+def _uvicorn(env: Optional[Dict[str, str]] = None) -> Iterator[Tuple[int, subprocess.Popen]]:
+    """Run the hub server (one uvicorn worker) in a subprocess, yielding its port and process."""
+    import os
+    import socket
+    import sys
+    import time
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "vlmrun.hub.server.app:app", "--port", str(port), "--log-level", "error"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        env={**os.environ, **(env or {})},
+    )
+    try:
+        deadline = time.time() + 60
+        while time.time() < deadline:
+            try:
+                socket.create_connection(("127.0.0.1", port)).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+        yield port, server
+    finally:
+        server.terminate()
+        server.wait()
+
+
+@pytest.mark.benchmark
+def test_validate_ndjson_benchmark():
+    """Validation throughput (documents per second, one server worker) of NDJSON streams, and the server's peak
+    memory vs. the stream length."""
+    import json
+    from time import perf_counter
+
+    from loguru import logger
+
+    lines = [json.dumps(VALID_INVOICE).encode() + b"\n", json.dumps(INVALID_INVOICE).encode() + b"\n"]
+    chunk = b"".join(lines[index % 2] for index in range(100))
+
+    peaks = {}
+    for n_documents in (20_000, 100_000):
+        with _uvicorn() as (port, server):
+            assert _stream_ndjson(port, "/validate/document.invoice", [chunk]) == 100  # Warm up
+
+            start = perf_counter()
+            n_results = _stream_ndjson(port, "/validate/document.invoice", [chunk] * (n_documents // 100))
+            elapsed = perf_counter() - start
+            with open(f"/proc/{server.pid}/status") as status:
+                peaks[n_documents] = next(int(line.split()[1]) for line in status if line.startswith("VmHWM"))
+        assert n_results == n_documents
+        logger.info(
+            f"Validated {n_documents} documents: {n_documents / elapsed:,.0f} documents/s, "
+            f"server peak RSS={peaks[n_documents] / 1024:.0f}MB"
+        )
+    assert peaks[100_000] < peaks[20_000] * 1.2
+
+
+def _dynamic_schema(name: str, codegen: bool = False) -> dict:
+    """An ad-hoc JSON schema; with `codegen`, it uses `oneOf`, which only `datamodel_code_generator` supports."""
+    value = {"oneOf": [{"type": "string"}, {"type": "integer"}]} if codegen else {"type": "integer", "minimum": 0}
+    return {
+        "title": "Receipt",
+        "type": "object",
+        "properties": {"merchant": {"type": "string"}, name: value},
+        "required": ["merchant", name],
+    }
+
+
+@pytest.fixture
+def dynamic_schemas(monkeypatch, tmp_path):
+    from vlmrun.hub import utils
+    from vlmrun.hub.server import routes
+    from vlmrun.hub.server.dynamic import DynamicSchemaStore
+
+    store = DynamicSchemaStore(maxsize=2, max_workers=1)
+    monkeypatch.setattr(routes, "DYNAMIC_SCHEMAS", store)
+    monkeypatch.setattr(utils, "MODEL_CACHE", utils.ModelCache(cache_dir=tmp_path / "models"))
+    yield store
+    store.shutdown()
+
+
+def test_dynamic_schema(client, dynamic_schemas):
+    import json
+
+    from vlmrun.hub import utils
+
+    schema = _dynamic_schema("total")
+    response = client.post("/dynamic/schema", json=schema)
+    assert response.status_code == 200
+    schema_hash = response.json()["schema_hash"]
+    assert len(schema_hash) == 64
+
+    # Canonically equal schemas have the same hash, and are not compiled again
+    reordered = json.dumps(dict(reversed(list(schema.items()))))
+    assert client.post("/dynamic/schema", content=reordered).json()["schema_hash"] == schema_hash
+    assert utils.MODEL_CACHE.stats.memory_misses == 1
+
+    response = client.post(f"/dynamic/validate/{schema_hash}", json={"merchant": "Cafe", "total": 12})
+    assert response.json() == {"valid": True, "errors": []}
+    result = client.post(f"/dynamic/validate/{schema_hash}", json={"merchant": "Cafe", "total": -1}).json()
+    assert result["valid"] is False and result["errors"][0]["loc"] == ["total"]
+
+    response = client.post(
+        f"/dynamic/validate/{schema_hash}",
+        content=b'{"merchant": "Cafe", "total": 1}\n{}\n',
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [(result["line"], result["valid"]) for result in results] == [(1, True), (2, False)]
+
+    # Evicted (or unknown) schemas have to be compiled again, and their models are released
+    for name in ("a", "b"):
+        client.post("/dynamic/schema", json=_dynamic_schema(name))
+    assert client.post(f"/dynamic/validate/{schema_hash}", json={}).status_code == 404
+    assert utils.MODEL_CACHE.get(utils.jsonschema_cache_key(schema)) is None
+
+    assert client.post("/dynamic/schema", content=b"{not json").status_code == 422
+    assert client.post("/dynamic/schema", json=[schema]).status_code == 422
+    assert client.post("/dynamic/schema", json={"type": "object", "properties": {"x": {"oneOf": 1}}}).status_code == 422
+
+
+def test_dynamic_schema_codegen_in_worker_process(client, dynamic_schemas, monkeypatch):
+    import datamodel_code_generator
+
+    def fail(*args, **kwargs):
+        raise AssertionError("Code generation must run in a worker process")
+
+    monkeypatch.setattr(datamodel_code_generator, "generate", fail)
+    response = client.post("/dynamic/schema", json=_dynamic_schema("total", codegen=True))
+    assert response.status_code == 200
+    schema_hash = response.json()["schema_hash"]
+    assert client.post(f"/dynamic/validate/{schema_hash}", json={"merchant": "Cafe", "total": "12"}).json()["valid"]
+    assert not client.post(f"/dynamic/validate/{schema_hash}", json={"merchant": "Cafe", "total": []}).json()["valid"]
+
+
+def test_dynamic_schema_limits(client, dynamic_schemas):
+    """Test the cap on the new schemas being compiled, and that a compilation timing out recycles the worker pool"""
+    from vlmrun.hub import utils
+
+    known = client.post("/dynamic/schema", json=_dynamic_schema("total")).json()["schema_hash"]
+    dynamic_schemas.max_pending = 0
+    response = client.post("/dynamic/schema", json=_dynamic_schema("other"))
+    assert response.status_code == 429 and response.headers["Retry-After"] == "1"
+    assert client.post("/dynamic/schema", json=_dynamic_schema("total")).json()["schema_hash"] == known
+
+    dynamic_schemas.max_pending, dynamic_schemas.timeout = 16, 0.001
+    schema = _dynamic_schema("total", codegen=True)
+    response = client.post("/dynamic/schema", json=schema)
+    assert response.status_code == 422 and "timed out" in response.json()["detail"]
+    assert dynamic_schemas._executor is None
+
+    dynamic_schemas.timeout = 60.0
+    assert client.post("/dynamic/schema", json=schema).status_code == 200
+    (source,) = utils.MODEL_CACHE.cache_dir.glob("*.py")
+    dynamic_schemas.clear()
+    assert not source.exists()
+
+
+@pytest.mark.benchmark
+def test_dynamic_schema_load_benchmark(tmp_path):
+    """Load test of ad-hoc schemas: concurrent clients mixing novel (code generated) and repeated schemas, each
+    compiling its schema and validating documents against it, while the server keeps answering other requests."""
+    import http.client
+    import json
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from time import perf_counter
+
+    from loguru import logger
+
+    n_requests, n_novel, n_repeated = 240, 40, 4
+    schemas = [_dynamic_schema(f"total_{index}", codegen=True) for index in range(n_repeated)]
+    workload = [
+        (_dynamic_schema(f"novel_{index // 6}", codegen=True) if index % 6 == 0 else schemas[index % n_repeated])
+        for index in range(n_requests)
+    ]
+    assert sum(index % 6 == 0 for index in range(n_requests)) == n_novel
+
+    def post(connection: http.client.HTTPConnection, path: str, body: bytes) -> dict:
+        connection.request("POST", path, body=body, headers={"Content-Type": "application/json"})
+        response = connection.getresponse()
+        assert response.status == 200, response.read()
+        return json.loads(response.read())
+
+    local = threading.local()
+
+    def compile_and_validate(schema: dict) -> Tuple[bool, float]:
+        if not hasattr(local, "connection"):
+            local.connection = http.client.HTTPConnection("127.0.0.1", port)
+        start = perf_counter()
+        schema_hash = post(local.connection, "/dynamic/schema", json.dumps(schema).encode())["schema_hash"]
+        document = json.dumps({"merchant": "Cafe", schema["required"][1]: 12}).encode()
+        valid = post(local.connection, f"/dynamic/validate/{schema_hash}", document)["valid"]
+        return valid, perf_counter() - start
+
+    def probe(stop: threading.Event, latencies: list) -> None:
+        connection = http.client.HTTPConnection("127.0.0.1", port)
+        while not stop.is_set():
+            start = perf_counter()
+            connection.request("GET", "/info")
+            connection.getresponse().read()
+            latencies.append(perf_counter() - start)
+
+    def percentile(values: list, q: float) -> float:
+        return sorted(values)[min(len(values) - 1, int(q * len(values)))]
+
+    with _uvicorn(env={"VLMRUN_HUB_CACHE_DIR": str(tmp_path)}) as (port, _):
+        for schema in schemas:  # Warm up the worker processes and the repeated schemas
+            compile_and_validate(schema)
+
+        stop, info_latencies = threading.Event(), []
+        prober = threading.Thread(target=probe, args=(stop, info_latencies))
+        prober.start()
+        start = perf_counter()
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(compile_and_validate, workload))
+        elapsed = perf_counter() - start
+        stop.set()
+        prober.join()
+
+    assert all(valid for valid, _ in results)
+    novel = [latency for index, (_, latency) in enumerate(results) if index % 6 == 0]
+    repeated = [latency for index, (_, latency) in enumerate(results) if index % 6 != 0]
+    logger.info(
+        f"{n_requests} schemas ({n_novel} novel) compiled and validated in {elapsed:.2f}s "
+        f"[{n_requests / elapsed:.1f} schemas/s, novel p50={percentile(novel, 0.5) * 1000:.0f}ms, "
+        f"repeated p50={percentile(repeated, 0.5) * 1000:.1f}ms / p99={percentile(repeated, 0.99) * 1000:.1f}ms, "
+        f"/info p99={percentile(info_latencies, 0.99) * 1000:.1f}ms over {len(info_latencies)} requests]"
+    )
+    # Code generation runs in worker processes: other requests are not held up behind it
+    assert percentile(info_latencies, 0.99) < percentile(novel, 0.5)
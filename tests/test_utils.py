@@ -1,11 +1,24 @@
+import gc
+import json
+import sys
 from datetime import date, datetime, time, timedelta
+from enum import Enum
+from time import perf_counter
+from typing import Dict, List, Optional
 
 import pytest
 from loguru import logger
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError, create_model, field_validator
 
 from vlmrun.hub.registry import registry
-from vlmrun.hub.utils import jsonschema_to_model, patch_response_format
+from vlmrun.hub.utils import (
+    ResponseFormatConverter,
+    SchemaTransform,
+    jsonschema_to_model,
+    patch_response_format,
+    sanitize_json_schema_for_pydantic_core,
+    strip_unsupported_patterns,
+)
 
 
 def test_patch_response_format():
@@ -51,6 +64,365 @@ def test_patch_response_format_models():
         assert issubclass(patched_model, BaseModel)
 
 
+def test_patch_response_format_memoized_and_shared():
+    class Address(BaseModel):
+        street: str
+        moved_in: Optional[date] = None
+
+    class Person(BaseModel):
+        name: str
+        addresses: List[Address]
+
+    class Company(BaseModel):
+        headquarters: Address
+        founded: date
+
+    class Plain(BaseModel):
+        name: str
+
+    patched_person = patch_response_format(Person)
+    patched_company = patch_response_format(Company)
+    assert patch_response_format(Person) is patched_person
+
+    # Nested models (including list items) are patched once and shared across schemas
+    patched_address = patched_company.model_fields["headquarters"].annotation
+    assert patched_address.__name__ == "Address_patched"
+    assert patched_person.model_fields["addresses"].annotation == List[patched_address]
+    assert patched_address.model_fields["moved_in"].annotation == Optional[str]
+
+    # Models without date/time fields are not copied
+    assert patch_response_format(Plain) is Plain
+
+
+def test_patch_response_format_weak_cache():
+    import weakref
+
+    from vlmrun.hub import utils
+
+    model = create_model("Ephemeral", when=(date, ...))
+    patch_response_format(model)
+    assert model in utils._patched_models
+
+    model_ref = weakref.ref(model)
+    del model
+    gc.collect()
+    assert model_ref() is None
+
+
+@pytest.mark.benchmark
+def test_patch_response_format_benchmark():
+    """Benchmark patching every registry schema, cold vs. memoized."""
+    from vlmrun.hub import utils
+
+    registry.load_schemas()
+    models = [registry[name] for name in registry.list_schemas()]
+    utils._patched_models.clear()
+
+    start = perf_counter()
+    patched = [patch_response_format(model) for model in models]
+    cold_ms = (perf_counter() - start) * 1000
+    n_classes = sum(1 for value in utils._patched_models.values() if value is not utils._UNPATCHED)
+
+    start = perf_counter()
+    assert [patch_response_format(model) for model in models] == patched
+    warm_ms = (perf_counter() - start) * 1000
+
+    logger.info(
+        f"patch_response_format over {len(models)} schemas: cold={cold_ms:.2f}ms, warm={warm_ms:.2f}ms, "
+        f"patched classes created={n_classes}"
+    )
+    assert warm_ms < cold_ms
+
+
+class Status(str, Enum):
+    PAID = "paid"
+    DUE = "due"
+
+
+class LineItem(BaseModel):
+    description: str
+    shipped_on: Optional[date] = None
+    amount: float
+
+
+class Vendor(BaseModel):
+    name: str
+
+
+class Invoice(BaseModel):
+    invoice_date: date
+    vendor: Vendor
+    due_at: Optional[datetime] = None
+    status: Status
+    payment_terms: timedelta
+    opening_hours: Dict[str, time] = {}
+    items: List[LineItem] = []
+    notes: Optional[str] = None
+
+
+INVOICE_PAYLOAD = {
+    "invoice_date": "2024-01-31",
+    "vendor": {"name": "ACME"},
+    "due_at": "2024-02-29T12:00:00",
+    "status": "due",
+    "payment_terms": "P30D",
+    "opening_hours": {"mon": "09:00:00"},
+    "items": [
+        {"description": "Widget", "shipped_on": "2024-01-30", "amount": 10.5},
+        {"description": "Shipping", "amount": 2.0},
+    ],
+}
+
+
+def test_response_format_converter():
+    converter = ResponseFormatConverter(Invoice)
+    assert converter.patched_response_format is patch_response_format(Invoice)
+
+    patched = converter.patched_response_format.model_validate(INVOICE_PAYLOAD)
+    expected = Invoice.model_validate(INVOICE_PAYLOAD)
+
+    for value in (patched, patched.model_dump(), patched.model_dump_json(), patched.model_dump_json().encode()):
+        invoice = converter(value)
+        assert type(invoice) is Invoice
+        assert invoice == expected
+        assert type(invoice.items[0]) is LineItem
+        assert invoice.status is Status.DUE
+
+    assert converter.convert_many([patched, INVOICE_PAYLOAD]) == [expected, expected]
+
+    # Nested models that needed no patching are reused as-is
+    assert converter(patched).vendor is patched.vendor
+
+
+class Charge(BaseModel):
+    description: str
+    amount: float
+
+
+class Receipt(BaseModel):
+    issued_on: date
+    vendor: Vendor
+    charges: List[Charge] = []
+
+
+def test_response_format_converter_plan():
+    converter = ResponseFormatConverter(Receipt)
+    payload = {"issued_on": "2024-01-31", "vendor": {"name": "ACME"}, "charges": [{"description": "Tea", "amount": 2}]}
+    patched = converter.patched_response_format.model_validate(payload)
+
+    receipt = converter(patched)
+    assert receipt == Receipt.model_validate(payload)
+    assert receipt.model_fields_set == patched.model_fields_set
+    # Only the patched field is converted, the rest of the tree is reused (not re-validated)
+    assert receipt.issued_on == date(2024, 1, 31)
+    assert receipt.charges is patched.charges and receipt.vendor is patched.vendor
+
+    # Models with validators are validated in full (the patched model does not carry them)
+    class CheckedReceipt(Receipt):
+        @field_validator("charges")
+        @classmethod
+        def check_charges(cls, charges):
+            if not charges:
+                raise ValueError("No charges")
+            return charges
+
+    converter = ResponseFormatConverter(CheckedReceipt)
+    with pytest.raises(ValidationError, match="No charges"):
+        converter(converter.patched_response_format.model_validate(dict(payload, charges=[])))
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize(
+    "response_format, payload",
+    [
+        # Most of the tree needs no patching: it is reused by the converter
+        (
+            Receipt,
+            {
+                "issued_on": "2024-01-31",
+                "vendor": {"name": "ACME"},
+                "charges": [{"description": "Tea", "amount": 2}] * 20,
+            },
+        ),
+        # Worst case: every line item is a patched model, converted one by one
+        (Invoice, dict(INVOICE_PAYLOAD, items=INVOICE_PAYLOAD["items"] * 10)),
+    ],
+    ids=["receipt", "invoice"],
+)
+def test_response_format_converter_benchmark(response_format, payload):
+    """Benchmark the converter against re-validating patched outputs with the original model.
+
+    The garbage collector is disabled while timing (as `timeit` does), so that collections triggered
+    by the objects of earlier timings do not skew later ones.
+    """
+    converter = ResponseFormatConverter(response_format)
+    responses = [json.dumps(payload) for _ in range(2_000)]
+    patched = [converter.patched_response_format.model_validate_json(response) for response in responses]
+    gc.collect()
+    gc.disable()
+    try:
+        _benchmark_response_format_converter(converter, responses, patched)
+    finally:
+        gc.enable()
+
+
+def _benchmark_response_format_converter(converter, responses, patched):
+    response_format = converter.response_format
+
+    start = perf_counter()
+    expected = [response_format.model_validate(instance.model_dump()) for instance in patched]
+    revalidate_ms = (perf_counter() - start) * 1000
+    start = perf_counter()
+    converted = converter.convert_many(patched)
+    convert_ms = (perf_counter() - start) * 1000
+    assert converted == expected
+
+    start = perf_counter()
+    revalidated = [
+        response_format.model_validate(converter.patched_response_format.model_validate_json(response).model_dump())
+        for response in responses
+    ]
+    revalidate_json_ms = (perf_counter() - start) * 1000
+    start = perf_counter()
+    converted = converter.convert_many(responses)
+    convert_json_ms = (perf_counter() - start) * 1000
+    assert converted == revalidated == expected
+
+    logger.info(
+        f"Converting {len(patched)} patched {response_format.__name__} instances: re-validation={revalidate_ms:.1f}ms, "
+        f"converter={convert_ms:.1f}ms; from JSON: re-validation={revalidate_json_ms:.1f}ms, "
+        f"converter={convert_json_ms:.1f}ms"
+    )
+    if response_format is Receipt:
+        assert convert_ms < revalidate_ms / 4
+    else:
+        # Every nested model is rebuilt in Python: about as fast as re-validating in pydantic-core
+        assert convert_ms < revalidate_ms * 1.5
+    assert convert_json_ms < revalidate_json_ms
+
+
+def test_sanitize_json_schema_copy_on_write():
+    schema = {
+        "type": "object",
+        "properties": {
+            "iban": {"type": "string", "pattern": "^(?!0000)[A-Z0-9]+$"},
+            "name": {"type": "string", "pattern": "^[A-Z]"},
+        },
+        "$defs": {"Item": {"anyOf": [{"type": "string", "pattern": "(?<=x)y"}, {"type": "null"}]}},
+        "required": ["iban"],
+    }
+    sanitized = sanitize_json_schema_for_pydantic_core(schema)
+
+    assert "pattern" not in sanitized["properties"]["iban"]
+    assert sanitized["$defs"]["Item"]["anyOf"][0] == {"type": "string"}
+    # The input is untouched, unchanged subtrees are shared
+    assert schema["properties"]["iban"]["pattern"] == "^(?!0000)[A-Z0-9]+$"
+    assert sanitized["properties"]["name"] is schema["properties"]["name"]
+    assert sanitized["required"] is schema["required"]
+    assert sanitized["$defs"]["Item"]["anyOf"][1] is schema["$defs"]["Item"]["anyOf"][1]
+    assert sanitize_json_schema_for_pydantic_core(sanitized) is sanitized
+
+
+def test_schema_transform_rules():
+    transform = SchemaTransform([strip_unsupported_patterns])
+
+    @transform.rule
+    def drop_titles(node):
+        return {key: value for key, value in node.items() if key != "title"} if "title" in node else node
+
+    schema = {"title": "Model", "properties": {"a": {"title": "A", "type": "string", "pattern": "(?=a)"}}}
+    assert transform(schema) == {"properties": {"a": {"type": "string"}}}
+
+    # Name maps and data are not schema nodes: fields named `title` and `default` values are kept
+    schema = {
+        "title": "Book",
+        "type": "object",
+        "properties": {
+            "title": {"title": "Title", "type": "string"},
+            "isbn": {"title": "Isbn", "type": "string"},
+            "publisher": {"$ref": "#/$defs/title"},
+        },
+        "required": ["title"],
+        "$defs": {
+            "title": {"title": "Publisher", "type": "object", "default": {"title": "Penguin"}},
+        },
+    }
+    assert transform(schema) == {
+        "type": "object",
+        "properties": {"title": {"type": "string"}, "isbn": {"type": "string"}, "publisher": {"$ref": "#/$defs/title"}},
+        "required": ["title"],
+        "$defs": {"title": {"type": "object", "default": {"title": "Penguin"}}},
+    }
+
+
+def test_schema_transform_deeply_nested():
+    depth = sys.getrecursionlimit() * 5
+    schema = leaf = {"type": "string", "pattern": "(?=x)"}
+    for _ in range(depth):
+        schema = {"type": "array", "items": schema}
+
+    sanitized = sanitize_json_schema_for_pydantic_core(schema)
+    for _ in range(depth):
+        sanitized = sanitized["items"]
+    assert sanitized == {"type": "string"} and "pattern" in leaf
+
+
+def _recursive_drop(node, keyword, is_schema=True):
+    """A recursive, copy-everything pass dropping a keyword (the previous approach), as a baseline."""
+    if isinstance(node, dict):
+        return {
+            key: _recursive_drop(value, keyword, not is_schema or key not in ("properties", "$defs"))
+            for key, value in node.items()
+            if not (is_schema and key == keyword)
+        }
+    elif isinstance(node, list):
+        return [_recursive_drop(item, keyword) for item in node]
+    return node
+
+
+def _drop_rule(keyword):
+    def rule(node):
+        return {key: value for key, value in node.items() if key != keyword} if keyword in node else node
+
+    return rule
+
+
+@pytest.mark.benchmark
+def test_schema_transform_benchmark():
+    """Benchmark the single-pass transform against one recursive pass per rule, on the largest catalog schemas."""
+    registry.load_schemas()
+    schemas = sorted(
+        (registry.json_schema(name) for name in registry.list_schemas()), key=lambda s: len(json.dumps(s))
+    )[-5:]
+    n_iter = 200
+
+    for keywords in (["pattern"], ["pattern", "title", "format"]):
+        transform = SchemaTransform([_drop_rule(keyword) for keyword in keywords])
+        for schema in schemas:
+            expected = schema
+            for keyword in keywords:
+                expected = _recursive_drop(expected, keyword)
+            assert transform(schema) == expected
+
+        start = perf_counter()
+        for _ in range(n_iter):
+            for schema in schemas:
+                for keyword in keywords:
+                    schema = _recursive_drop(schema, keyword)
+        recursive_ms = (perf_counter() - start) * 1000
+
+        start = perf_counter()
+        for _ in range(n_iter):
+            for schema in schemas:
+                transform(schema)
+        transform_ms = (perf_counter() - start) * 1000
+
+        logger.info(
+            f"Dropping {keywords} from the {len(schemas)} largest schemas x{n_iter}: "
+            f"recursive passes={recursive_ms:.1f}ms, single-pass transform={transform_ms:.1f}ms"
+        )
+
+
 def test_jsonschema_to_model_with_registry_schemas():
     """Test that jsonschema_to_model works with all schemas in the registry."""
     registry.load_schemas()
@@ -74,3 +446,200 @@ def test_jsonschema_to_model_with_registry_schemas():
 
         except Exception as e:
             pytest.fail(f"Failed to process schema for {domain}: {str(e)}")
+
+
+FALLBACK_SCHEMA = {
+    "title": "Fallback",
+    "type": "object",
+    "properties": {"value": {"oneOf": [{"type": "string"}, {"type": "integer"}]}},
+}
+
+
+@pytest.fixture
+def model_cache(monkeypatch, tmp_path):
+    from vlmrun.hub import utils
+
+    cache = utils.ModelCache(maxsize=2, cache_dir=tmp_path / "models")
+    monkeypatch.setattr(utils, "MODEL_CACHE", cache)
+    return cache
+
+
+def test_schema_cache_key_canonical():
+    from vlmrun.hub.utils import schema_cache_key
+
+    a = {"type": "object", "title": "A", "properties": {"x": {"type": "string"}, "y": {"type": "integer"}}}
+    b = {"properties": {"y": {"type": "integer"}, "x": {"type": "string"}}, "title": "A", "type": "object"}
+    assert schema_cache_key(a, "A") == schema_cache_key(b, "A")
+    assert schema_cache_key(a, "A") != schema_cache_key(a, "B")
+
+
+def test_schema_cache_key_versions(monkeypatch):
+    """Test that cached sources generated with other pydantic / datamodel-code-generator versions are not reused"""
+    from vlmrun.hub import utils
+
+    schema = {"type": "object", "title": "A", "properties": {"x": {"type": "string"}}}
+    key = utils.schema_cache_key(schema, "A")
+    monkeypatch.setattr(utils, "_codegen_versions", lambda: "pydantic=0.0,datamodel-code-generator=0.0")
+    assert utils.schema_cache_key(schema, "A") != key
+
+
+def test_model_cache_memory_tier(model_cache):
+    schemas = [
+        {"title": f"Model{i}", "type": "object", "properties": {f"field_{i}": {"type": "string"}}} for i in range(3)
+    ]
+    models = [jsonschema_to_model(schema) for schema in schemas]
+    assert model_cache.stats.memory_misses == 3
+    assert model_cache.stats.memory_evictions == 1
+
+    # Same schema with a different key order hits the cache
+    reordered = {"properties": schemas[2]["properties"], "type": "object", "title": "Model2"}
+    assert jsonschema_to_model(reordered) is models[2]
+    assert model_cache.stats.memory_hits == 1
+
+    # The evicted schema is rebuilt
+    assert jsonschema_to_model(schemas[0]) is not models[0]
+    assert model_cache.stats.memory_misses == 4
+    assert not list(model_cache.cache_dir.glob("*.py")), "Compiled models must not be written to disk"
+
+
+def test_model_cache_disk_tier(model_cache, monkeypatch):
+    from vlmrun.hub import utils
+
+    model = jsonschema_to_model(FALLBACK_SCHEMA)
+    assert model.model_validate({"value": 1}).value == 1
+    assert model_cache.stats.disk_misses == 1
+    assert len(list(model_cache.cache_dir.glob("*.py"))) == 1
+
+    def fail(*args, **kwargs):
+        raise AssertionError("Code generation must not run on a disk cache hit")
+
+    model_cache.clear()
+    monkeypatch.setattr(utils, "codegen_jsonschemastr_to_model", fail)
+    model = jsonschema_to_model(FALLBACK_SCHEMA)
+    assert model.model_validate({"value": "a"}).value == "a"
+    assert model_cache.stats.disk_hits == 1
+
+
+def test_codegen_does_not_leak_modules():
+    """Test that generated modules are not kept in `sys.modules`, and that their models are complete"""
+    import json
+    import sys
+
+    from vlmrun.hub.utils import codegen_jsonschemastr_to_model
+
+    schema = {
+        **FALLBACK_SCHEMA,
+        "title": "Node",
+        "properties": {**FALLBACK_SCHEMA["properties"], "children": {"type": "array", "items": {"$ref": "#"}}},
+    }
+    modules = set(sys.modules)
+    model = codegen_jsonschemastr_to_model(json.dumps(schema), "Node")
+    assert not {name for name in sys.modules if name.startswith("vlmrun_hub_models_")} - modules
+    node = model.model_validate({"value": 1, "children": [{"value": "a", "children": []}]})
+    assert node.children[0].value == "a"
+
+
+def test_model_cache_disk_tier_private(model_cache, monkeypatch):
+    """Test that the disk tier is private, and that sources writable by others are never executed"""
+    import stat
+
+    from vlmrun.hub import utils
+
+    model = jsonschema_to_model(FALLBACK_SCHEMA)
+    assert stat.S_IMODE(model_cache.cache_dir.stat().st_mode) == 0o700
+    (path,) = model_cache.cache_dir.glob("*.py")
+    assert not path.stat().st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+    calls = []
+    codegen = utils.codegen_jsonschemastr_to_model
+
+    def counting_codegen(*args, **kwargs):
+        calls.append(args)
+        return codegen(*args, **kwargs)
+
+    monkeypatch.setattr(utils, "codegen_jsonschemastr_to_model", counting_codegen)
+    path.chmod(0o666)
+    model_cache.clear()
+    assert jsonschema_to_model(FALLBACK_SCHEMA) is not model
+    assert len(calls) == 1 and model_cache.stats.disk_misses == 1
+
+    # A shared cache directory disables the disk tier
+    model_cache.cache_dir.chmod(0o777)
+    model_cache.clear()
+    jsonschema_to_model(FALLBACK_SCHEMA)
+    assert len(calls) == 2 and model_cache.source_path("key") is None
+    model_cache.cache_dir.chmod(0o700)
+
+
+def test_model_cache_disk_eviction(model_cache):
+    model_cache.max_disk_bytes = 0
+    jsonschema_to_model(FALLBACK_SCHEMA)
+    assert model_cache.stats.disk_evictions == 1
+    assert not list(model_cache.cache_dir.glob("*.py"))
+
+
+def test_jsonschemastr_to_model_single_flight(model_cache, monkeypatch):
+    """Test that concurrent callers for the same schema wait on a single code generation"""
+    import json
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    from vlmrun.hub import utils
+
+    calls = []
+    codegen = utils.codegen_jsonschemastr_to_model
+
+    def slow_codegen(*args, **kwargs):
+        calls.append(args)
+        time.sleep(0.1)
+        return codegen(*args, **kwargs)
+
+    monkeypatch.setattr(utils, "codegen_jsonschemastr_to_model", slow_codegen)
+    n_threads = 8
+    barrier = threading.Barrier(n_threads)
+
+    def worker(_):
+        barrier.wait()
+        return utils.jsonschemastr_to_model(json.dumps(FALLBACK_SCHEMA), "Fallback")
+
+    with ThreadPoolExecutor(max_workers=n_threads) as executor:
+        models = list(executor.map(worker, range(n_threads)))
+
+    assert len(calls) == 1
+    assert all(model is models[0] for model in models)
+    assert model_cache.stats.inflight_waits > 0
+
+
+def test_jsonschemastr_to_model_parallel_distinct_schemas(model_cache):
+    """Test that parallel code generation of different schemas never mixes up the generated classes"""
+    import json
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    from vlmrun.hub import utils
+
+    n_threads = 6
+    barrier = threading.Barrier(n_threads)
+
+    def worker(i):
+        schema = {
+            "title": "Fallback",
+            "type": "object",
+            "properties": {
+                f"value_{i}": {"oneOf": [{"type": "string"}, {"type": "integer"}]},
+                "nested": {"$ref": "#/$defs/Nested"},
+            },
+            "$defs": {"Nested": {"type": "object", "properties": {f"inner_{i}": {"type": "string"}}}},
+        }
+        barrier.wait()
+        return i, utils.jsonschemastr_to_model(json.dumps(schema), "Fallback")
+
+    with ThreadPoolExecutor(max_workers=n_threads) as executor:
+        results = list(executor.map(worker, range(n_threads)))
+
+    assert len({model.__module__ for _, model in results}) == n_threads
+    for i, model in results:
+        assert set(model.model_fields) == {f"value_{i}", "nested"}
+        nested = model.model_validate({"nested": {f"inner_{i}": "x"}}).nested
+        assert set(type(nested).model_fields) == {f"inner_{i}"}
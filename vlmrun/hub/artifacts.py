@@ -0,0 +1,264 @@
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+from loguru import logger
+from pydantic import BaseModel
+
+from vlmrun.hub.constants import VLMRUN_HUB_ARTIFACT_CACHE_DIR, VLMRUN_HUB_OFFLINE
+
+try:
+    import fcntl
+except ImportError:  # Windows: updates of the index are not serialized across processes
+    fcntl = None
+
+ARTIFACT_HEADERS = {"User-Agent": "vlmrun-hub"}
+"""Headers sent with every artifact download"""
+
+
+class ArtifactNotCachedError(FileNotFoundError):
+    """Raised in offline mode when an artifact is not in the cache."""
+
+
+class ArtifactRecord(BaseModel):
+    """The cached state of a URL: the content it resolved to, and the validators to revalidate it."""
+
+    sha256: str
+    filename: str
+    size: int
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+class ArtifactCache:
+    """A content-addressed, size-bounded local cache for remote artifacts (sample images and PDFs).
+
+    Contents are stored once per SHA-256 under `objects/`, and `index.json` maps each URL to its
+    current content and the `ETag` / `Last-Modified` validators the server returned. The index is
+    shared by every process using the cache: it is re-read whenever another process replaced it,
+    and updates re-read and merge it under a file lock before replacing it. A cached URL
+    is revalidated with a conditional request at most once per process (and not at all in offline
+    mode, where a cache miss raises `ArtifactNotCachedError`). Objects are evicted least recently
+    used first once the cache exceeds `max_bytes`.
+
+    Examples:
+        >>> cache = ArtifactCache(Path("/tmp/artifacts"))
+        >>> path = cache.fetch("https://example.com/invoice.pdf")
+        >>> path.parent.name, path.suffix
+        ('objects', '.pdf')
+    """
+
+    def __init__(
+        self, cache_dir: Path, max_bytes: int = 1024 * 1024 * 1024, offline: bool = False, pool_size: int = 32
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.pool_size = pool_size
+        self._lock = threading.RLock()
+        self._index: Optional[Dict[str, ArtifactRecord]] = None
+        self._index_version: Optional[Tuple[int, int, int]] = None
+        """The (inode, mtime, size) of the `index.json` that `_index` was read from"""
+        self._validated: Set[str] = set()
+        self._url_locks: Dict[str, threading.Lock] = {}
+        self._session = None
+
+    @property
+    def index_path(self) -> Path:
+        return self.cache_dir / "index.json"
+
+    @property
+    def session(self):
+        """The (lazily created) HTTP session used for downloads, pooling up to `pool_size` connections per host."""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    session = requests.Session()
+                    session.headers.update(ARTIFACT_HEADERS)
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    self._session = session
+        return self._session
+
+    def _index_file_version(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = self.index_path.stat()
+        except FileNotFoundError:
+            return None
+        # The index is only ever replaced (never written in place), so a new version has a new inode
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _load_index(self) -> Dict[str, ArtifactRecord]:
+        """The index, re-read if `index.json` was replaced since it was last read (e.g. by another process)."""
+        version = self._index_file_version()
+        if self._index is None or version != self._index_version:
+            try:
+                data = json.loads(self.index_path.read_text())
+                self._index = {url: ArtifactRecord.model_validate(record) for url, record in data.items()}
+            except FileNotFoundError:
+                self._index = {}
+            except Exception as e:
+                logger.warning(f"Ignoring invalid artifact cache index [path={self.index_path}, e={e}]")
+                self._index = {}
+            self._index_version = version
+        return self._index
+
+    @contextmanager
+    def _index_file_lock(self) -> Iterator[None]:
+        """Hold an exclusive lock on the index across processes, while it is re-read, updated and replaced."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.cache_dir / "index.json.lock", "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield  # Closing the file releases the lock
+
+    def _save_index(self) -> None:
+        """Atomically replace `index.json` (with the file lock held, so that no other update is lost)."""
+        staged = self.index_path.with_name(f"index.json.{os.getpid()}.{threading.get_ident()}")
+        staged.write_text(json.dumps({url: record.model_dump() for url, record in self._index.items()}))
+        os.replace(staged, self.index_path)
+        self._index_version = self._index_file_version()
+
+    def object_path(self, record: ArtifactRecord) -> Path:
+        return self.cache_dir / "objects" / record.filename
+
+    def get(self, url: str) -> Optional[Path]:
+        """Return the cached path for a URL (without revalidating it), or `None`."""
+        with self._lock:
+            record = self._load_index().get(url)
+        if record is None:
+            return None
+        path = self.object_path(record)
+        try:
+            os.utime(path)  # Mark as recently used
+        except FileNotFoundError:
+            return None
+        return path
+
+    def fetch(self, url: str) -> Path:
+        """Return a local path with the content of the URL, downloading or revalidating it as needed.
+
+        Local paths are returned as-is.
+
+        Raises:
+            ArtifactNotCachedError: If the URL is not cached in offline mode
+        """
+        if not url.startswith("http"):
+            return Path(url)
+        path = self.get(url)
+        if path is not None and (self.offline or url in self._validated):
+            return path
+        if self.offline:
+            raise ArtifactNotCachedError(f"Artifact not cached (offline mode) [url={url}]")
+
+        # Concurrent fetches of the same URL wait for a single download / revalidation
+        with self._lock:
+            url_lock = self._url_locks.setdefault(url, threading.Lock())
+        with url_lock:
+            path = self.get(url)
+            if path is not None and url in self._validated:
+                return path
+            return self._download(url, path)
+
+    def _download(self, url: str, path: Optional[Path]) -> Path:
+        """Download a URL, or revalidate its cached content at `path`."""
+        with self._lock:
+            record = self._load_index().get(url) if path is not None else None
+        headers = {}
+        if record is not None:
+            if record.etag:
+                headers["If-None-Match"] = record.etag
+            if record.last_modified:
+                headers["If-Modified-Since"] = record.last_modified
+
+        with self.session.get(url, headers=headers, stream=True, timeout=30) as response:
+            if response.status_code == 304 and path is not None:
+                logger.debug(f"Artifact not modified [url={url}]")
+                self._validated.add(url)
+                return path
+            response.raise_for_status()
+            record = self._store(url, response)
+        self._validated.add(url)
+        return self.object_path(record)
+
+    def _store(self, url: str, response: Any) -> ArtifactRecord:
+        """Stream a response into the object store, and point the URL at its content."""
+        objects_dir = self.cache_dir / "objects"
+        objects_dir.mkdir(parents=True, exist_ok=True)
+        staged = objects_dir / f".download.{os.getpid()}.{threading.get_ident()}"
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with staged.open("wb") as f:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    digest.update(chunk)
+                    size += len(chunk)
+                    f.write(chunk)
+            record = ArtifactRecord(
+                sha256=digest.hexdigest(),
+                filename=digest.hexdigest() + Path(urlparse(url).path).suffix.lower(),
+                size=size,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            )
+            os.replace(staged, self.object_path(record))
+        finally:
+            staged.unlink(missing_ok=True)
+        logger.debug(f"Cached artifact [url={url}, sha256={record.sha256}, size={size}]")
+
+        with self._lock, self._index_file_lock():
+            # Merge with the records other processes saved since the index was read
+            self._load_index()[url] = record
+            self.evict(keep=record.filename)
+            self._save_index()
+        return record
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """Evict the least recently used objects until the cache fits in `max_bytes`."""
+        with self._lock:
+            objects = []
+            for path in (self.cache_dir / "objects").glob("*"):
+                if path.name.startswith("."):
+                    continue
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                objects.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in objects)
+            evicted = set()
+            for _, size, path in sorted(objects, key=lambda item: item[0]):
+                if total <= self.max_bytes:
+                    break
+                if path.name == keep:
+                    continue
+                path.unlink(missing_ok=True)
+                evicted.add(path.name)
+                total -= size
+            if evicted:
+                index = self._load_index()
+                for url in [url for url, record in index.items() if record.filename in evicted]:
+                    del index[url]
+                    self._validated.discard(url)
+                logger.debug(f"Evicted {len(evicted)} artifacts from the cache")
+
+    def clear(self) -> None:
+        """Remove every cached artifact."""
+        with self._lock, self._index_file_lock():
+            for path in (self.cache_dir / "objects").glob("*"):
+                path.unlink(missing_ok=True)
+            self._index, self._index_version = {}, None
+            self._validated.clear()
+            self.index_path.unlink(missing_ok=True)
+
+
+ARTIFACT_CACHE = ArtifactCache(VLMRUN_HUB_ARTIFACT_CACHE_DIR, offline=VLMRUN_HUB_OFFLINE)
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import re
+from typing import Any, Dict, List, Set
+
+DEFS_REF_PREFIX = "#/$defs/"
+
+_SHARED_NAME_SUFFIX = re.compile(r"_[0-9a-f]{8}$")
+
+
+def _rewrite_refs(node: Any, rename: Dict[str, str]) -> Any:
+    """Copy a JSON schema node, renaming its `#/$defs/<name>` references."""
+    if isinstance(node, dict):
+        ref = node.get("$ref")
+        rewritten = {key: _rewrite_refs(value, rename) for key, value in node.items()}
+        if isinstance(ref, str) and ref.startswith(DEFS_REF_PREFIX):
+            rewritten["$ref"] = DEFS_REF_PREFIX + rename[ref[len(DEFS_REF_PREFIX) :]]
+        return rewritten
+    if isinstance(node, list):
+        return [_rewrite_refs(value, rename) for value in node]
+    return node
+
+
+def _refs(node: Any, refs: Set[str]) -> Set[str]:
+    """Collect the names of the `#/$defs/<name>` references of a JSON schema node."""
+    if isinstance(node, dict):
+        ref = node.get("$ref")
+        if isinstance(ref, str) and ref.startswith(DEFS_REF_PREFIX):
+            refs.add(ref[len(DEFS_REF_PREFIX) :])
+        for value in node.values():
+            _refs(value, refs)
+    elif isinstance(node, list):
+        for value in node:
+            _refs(value, refs)
+    return refs
+
+
+def _digest(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True).encode()).hexdigest()
+
+
+def bundle_json_schemas(json_schemas: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Bundle JSON schemas into one document, de-duplicating their definitions into a shared `$defs`.
+
+    Two definitions are merged if they are identical, including all the definitions they
+    (transitively) reference. Merged definitions keep their name, unless different definitions
+    share it (e.g. the various `Address` models), in which case they are suffixed with a short
+    content hash. References are rewritten to point at the shared `$defs`.
+
+    Args:
+        json_schemas: Name (e.g. domain) -> JSON schema, with local `#/$defs/<name>` references
+
+    Returns:
+        `{"schemas": {name: json_schema without $defs}, "$defs": {...}}`; `unbundle_json_schemas`
+        restores the original schemas
+
+    Examples:
+        >>> bundle = bundle_json_schemas({domain: registry.json_schema(domain) for domain in domains})
+        >>> unbundle_json_schemas(bundle)["document.invoice"]["$defs"].keys()
+        dict_keys(['Address', 'LineItem'])
+    """
+    # Identify every definition by (schema name, definition name), and refine the classes of identical
+    # definitions until they are stable: first by their content (with references by local name), then
+    # by their content and the classes of the definitions they reference (which handles cycles).
+    definitions = {
+        (name, def_name): definition
+        for name, json_schema in json_schemas.items()
+        for def_name, definition in json_schema.get("$defs", {}).items()
+    }
+    references = {key: sorted(_refs(definition, set())) for key, definition in definitions.items()}
+    classes = {key: _digest(definition) for key, definition in definitions.items()}
+    n_classes = len(set(classes.values()))
+    while True:
+        classes = {
+            key: _digest([classes[key], [classes[(key[0], ref)] for ref in references[key]]]) for key in definitions
+        }
+        if len(set(classes.values())) == n_classes:
+            break
+        n_classes = len(set(classes.values()))
+
+    # Name the shared definitions: their own name, unless it is shared by different definitions
+    names_by_class: Dict[str, str] = {}
+    classes_by_name: Dict[str, Set[str]] = {}
+    for (_, def_name), digest in classes.items():
+        names_by_class.setdefault(digest, def_name)
+        classes_by_name.setdefault(def_name, set()).add(digest)
+    shared_names = {
+        digest: name if len(classes_by_name[name]) == 1 else f"{name}_{digest[:8]}"
+        for digest, name in names_by_class.items()
+    }
+
+    shared_defs: Dict[str, Any] = {}
+    schemas: Dict[str, Any] = {}
+    for name, json_schema in json_schemas.items():
+        rename = {def_name: shared_names[classes[(name, def_name)]] for def_name in json_schema.get("$defs", {})}
+        for def_name, definition in json_schema.get("$defs", {}).items():
+            if rename[def_name] not in shared_defs:
+                shared_defs[rename[def_name]] = _rewrite_refs(definition, rename)
+        schemas[name] = _rewrite_refs({key: value for key, value in json_schema.items() if key != "$defs"}, rename)
+    return {"schemas": schemas, "$defs": dict(sorted(shared_defs.items()))}
+
+
+def unbundle_json_schemas(bundle: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Split a bundle from `bundle_json_schemas` into standalone JSON schemas, each with the `$defs` it references.
+
+    Definitions renamed in the bundle (with a content hash suffix) get their original name back,
+    so the schemas are identical to the bundled ones.
+    """
+    shared_defs = bundle.get("$defs", {})
+    json_schemas = {}
+    for name, json_schema in bundle["schemas"].items():
+        used: List[str] = []
+        pending = sorted(_refs(json_schema, set()))
+        while pending:
+            def_name = pending.pop()
+            if def_name not in used:
+                used.append(def_name)
+                pending.extend(_refs(shared_defs[def_name], set()))
+        if not used:
+            json_schemas[name] = json_schema
+            continue
+        rename = {def_name: _SHARED_NAME_SUFFIX.sub("", def_name) for def_name in used}
+        if len(set(rename.values())) < len(rename):
+            rename = {def_name: def_name for def_name in used}
+        json_schemas[name] = {
+            **_rewrite_refs(json_schema, rename),
+            "$defs": {rename[def_name]: _rewrite_refs(shared_defs[def_name], rename) for def_name in sorted(used)},
+        }
+    return json_schemas
@@ -0,0 +1,230 @@
+import keyword
+import re
+from datetime import date, datetime, time, timedelta
+from enum import Enum
+from typing import Any, Dict, List, Optional, Set, Tuple, Type, Union
+from uuid import UUID
+
+from pydantic import AnyUrl, BaseModel, ConfigDict, Field, create_model
+from typing_extensions import Annotated
+
+SCALAR_TYPES: Dict[str, Any] = {
+    "string": str,
+    "integer": int,
+    "number": float,
+    "boolean": bool,
+    "null": type(None),
+}
+"""Python types for the scalar JSON schema types"""
+
+FORMAT_TYPES: Dict[str, Any] = {
+    "date": date,
+    "date-time": datetime,
+    "time": time,
+    "duration": timedelta,
+    "uri": AnyUrl,
+    "uuid": UUID,
+}
+"""Python types for the supported string formats"""
+
+CONSTRAINTS: Dict[str, str] = {
+    "minimum": "ge",
+    "maximum": "le",
+    "exclusiveMinimum": "gt",
+    "exclusiveMaximum": "lt",
+    "multipleOf": "multiple_of",
+    "minLength": "min_length",
+    "maxLength": "max_length",
+    "pattern": "pattern",
+    "minItems": "min_length",
+    "maxItems": "max_length",
+}
+"""JSON schema validation keywords and the corresponding pydantic `Field` arguments"""
+
+STRING_CONSTRAINTS: Set[str] = {"pattern"}
+"""Validation keywords taking a string; every other one in `CONSTRAINTS` takes a number"""
+
+ANNOTATION_KEYWORDS: Set[str] = {"title", "description", "default", "examples", "$comment", "readOnly", "writeOnly"}
+"""Keywords that carry no validation semantics"""
+
+SUPPORTED_KEYWORDS: Set[str] = (
+    {"type", "format", "enum", "anyOf", "$ref", "items", "properties", "required", "additionalProperties", "$defs"}
+    | set(CONSTRAINTS)
+    | ANNOTATION_KEYWORDS
+)
+"""All keywords understood by the compiler; anything else falls back to code generation"""
+
+
+class UnsupportedJsonSchemaError(ValueError):
+    """Raised when a JSON schema uses a construct that the compiler does not support."""
+
+
+def _is_valid_field_name(name: str) -> bool:
+    return (
+        name.isidentifier()
+        and not keyword.iskeyword(name)
+        and not name.startswith("_")
+        and not hasattr(BaseModel, name)
+    )
+
+
+def _enum_member_name(value: Any, index: int) -> str:
+    name = re.sub(r"\W", "_", str(value))
+    if not name or not name.isidentifier() or keyword.iskeyword(name) or name.startswith("_"):
+        name = f"value_{index}"
+    return name
+
+
+def _class_name(name: str) -> str:
+    return "".join(part[:1].upper() + part[1:] for part in re.split(r"[^0-9a-zA-Z]+", name) if part) or "Model"
+
+
+class JsonSchemaCompiler:
+    """Compile a JSON schema into pydantic models in memory, using `create_model`.
+
+    Supports objects, `$defs` / `$ref`, enums, arrays, `anyOf` (including nullables), string
+    formats and the common validation keywords, i.e. the schemas pydantic itself generates.
+    Anything else raises `UnsupportedJsonSchemaError` so callers can fall back to code generation.
+
+    Examples:
+        >>> model = JsonSchemaCompiler(Invoice.model_json_schema()).compile("Invoice")
+        >>> model.model_json_schema() == Invoice.model_json_schema()
+        True
+    """
+
+    def __init__(self, schema: Dict[str, Any]):
+        self.schema = schema
+        self.defs: Dict[str, Any] = schema.get("$defs") or {}
+        self._compiled: Dict[str, Any] = {}
+        self._in_progress: Set[str] = set()
+
+    def compile(self, class_name: str) -> Type[BaseModel]:
+        if self.schema.get("type") != "object" or "properties" not in self.schema:
+            raise UnsupportedJsonSchemaError("Root schema must be an object with properties")
+        return self._model(class_name, self.schema)
+
+    def _check_keywords(self, node: Dict[str, Any]) -> None:
+        unsupported = node.keys() - SUPPORTED_KEYWORDS
+        if unsupported:
+            raise UnsupportedJsonSchemaError(f"Unsupported keywords: {sorted(unsupported)}")
+
+    def _ref(self, ref: str) -> Any:
+        if not ref.startswith("#/$defs/"):
+            raise UnsupportedJsonSchemaError(f"Unsupported $ref: {ref}")
+        name = ref[len("#/$defs/") :]
+        if name in self._compiled:
+            return self._compiled[name]
+        if name in self._in_progress:
+            raise UnsupportedJsonSchemaError(f"Recursive $ref: {ref}")
+        if name not in self.defs:
+            raise UnsupportedJsonSchemaError(f"Unresolved $ref: {ref}")
+        node = self.defs[name]
+        self._in_progress.add(name)
+        try:
+            if "enum" in node:
+                compiled = self._enum(node.get("title", name), node)
+                if node.get("description"):
+                    compiled.__doc__ = node["description"]
+            elif node.get("type") == "object" and "properties" in node:
+                compiled = self._model(node.get("title", name), node)
+            else:
+                raise UnsupportedJsonSchemaError(f"Unsupported $defs entry: {name}")
+        finally:
+            self._in_progress.discard(name)
+        self._compiled[name] = compiled
+        return compiled
+
+    def _enum(self, name: str, node: Dict[str, Any]) -> Type[Enum]:
+        self._check_keywords(node)
+        values: List[Any] = node["enum"]
+        members = {}
+        for index, value in enumerate(values):
+            member = _enum_member_name(value, index)
+            if member in members:
+                member = f"{member}_{index}"
+            members[member] = value
+        return Enum(_class_name(name), members)
+
+    def _model(self, name: str, node: Dict[str, Any]) -> Type[BaseModel]:
+        self._check_keywords(node)
+        if node.get("additionalProperties", True) is not True and node["additionalProperties"] is not False:
+            raise UnsupportedJsonSchemaError(f"Unsupported additionalProperties on model {name}")
+        required = set(node.get("required", []))
+        fields: Dict[str, Tuple[Any, Any]] = {}
+        for field_name, field_node in node.get("properties", {}).items():
+            if not _is_valid_field_name(field_name):
+                raise UnsupportedJsonSchemaError(f"Unsupported field name: {field_name}")
+            if not isinstance(field_node, dict):
+                raise UnsupportedJsonSchemaError(f"Unsupported field schema: {field_name}")
+            annotation = self._annotation(field_node, _class_name(field_name))
+            kwargs = {key: field_node[key] for key in ("title", "description", "examples") if key in field_node}
+            if field_name in required:
+                default = field_node.get("default", ...)
+            else:
+                # Optional fields are nullable, as in the models generated by datamodel-code-generator
+                default = field_node.get("default", None)
+                annotation = Optional[annotation]
+            fields[field_name] = (annotation, Field(default, **kwargs))
+
+        config = ConfigDict(extra="forbid") if node.get("additionalProperties") is False else None
+        return create_model(_class_name(name), __config__=config, __doc__=node.get("description"), **fields)
+
+    def _annotation(self, node: Dict[str, Any], name: str) -> Any:
+        """Return the python type annotation for a (field or nested) schema node."""
+        self._check_keywords(node)
+        if "$ref" in node:
+            if node.keys() - ANNOTATION_KEYWORDS - {"$ref"}:
+                raise UnsupportedJsonSchemaError("Unsupported keywords alongside $ref")
+            return self._ref(node["$ref"])
+
+        if "anyOf" in node:
+            members = [self._annotation(member, name) for member in node["anyOf"]]
+            annotation = Union[tuple(members)] if len(members) > 1 else members[0]
+        elif "enum" in node:
+            annotation = self._enum(node.get("title", name), node)
+        else:
+            schema_type = node.get("type")
+            if isinstance(schema_type, list) or schema_type is None:
+                raise UnsupportedJsonSchemaError(f"Unsupported type: {schema_type}")
+            if schema_type == "array":
+                items = node.get("items", True)
+                if not isinstance(items, dict) and items is not True:
+                    # e.g. draft-4 tuple validation (`"items": [...]`), which `List` would silently drop
+                    raise UnsupportedJsonSchemaError(f"Unsupported items: {items!r}")
+                annotation = List[self._annotation(items, name) if isinstance(items, dict) else Any]
+            elif schema_type == "object":
+                if "properties" in node:
+                    annotation = self._model(node.get("title", name), node)
+                else:
+                    values = node.get("additionalProperties", True)
+                    if not isinstance(values, dict) and values is not True:
+                        raise UnsupportedJsonSchemaError(f"Unsupported additionalProperties: {values!r}")
+                    annotation = Dict[str, self._annotation(values, name) if isinstance(values, dict) else Any]
+            elif schema_type == "string" and "format" in node:
+                if node["format"] not in FORMAT_TYPES:
+                    raise UnsupportedJsonSchemaError(f"Unsupported format: {node['format']}")
+                annotation = FORMAT_TYPES[node["format"]]
+            elif schema_type in SCALAR_TYPES:
+                annotation = SCALAR_TYPES[schema_type]
+            else:
+                raise UnsupportedJsonSchemaError(f"Unsupported type: {schema_type}")
+
+        constraints = {CONSTRAINTS[key]: node[key] for key in CONSTRAINTS if key in node}
+        for key in CONSTRAINTS.keys() & node.keys():
+            value = node[key]
+            expected = str if key in STRING_CONSTRAINTS else (int, float)
+            if not isinstance(value, expected) or isinstance(value, bool):
+                # e.g. draft-4 boolean `exclusiveMinimum`, which would become `gt=True`, i.e. `> 1`
+                raise UnsupportedJsonSchemaError(f"Unsupported {key}: {value!r}")
+        if constraints:
+            annotation = Annotated[annotation, Field(**constraints)]
+        return annotation
+
+
+def compile_json_schema(schema: Dict[str, Any], class_name: str) -> Type[BaseModel]:
+    """Compile a JSON schema into a pydantic model without code generation.
+
+    Raises:
+        UnsupportedJsonSchemaError: If the schema uses a construct the compiler does not support
+    """
+    return JsonSchemaCompiler(schema).compile(class_name)
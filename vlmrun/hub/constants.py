@@ -1,5 +1,11 @@
+import os
 from pathlib import Path
 
 VLMRUN_HUB_PATH = Path(__file__).parent
 VLMRUN_HUB_CATALOG_PATH = VLMRUN_HUB_PATH / "catalog.yaml"
 VLMRUN_HUB_CONTRIB_CATALOG_PATH = VLMRUN_HUB_PATH / "schemas" / "contrib" / "catalog.yaml"
+VLMRUN_HUB_CATALOG_SNAPSHOT_PATH = VLMRUN_HUB_PATH / "catalog.snapshot.json"
+VLMRUN_HUB_CACHE_DIR = Path(os.getenv("VLMRUN_HUB_CACHE_DIR", Path.home() / ".vlmrun" / "cache" / "hub"))
+VLMRUN_HUB_MODEL_CACHE_DIR = VLMRUN_HUB_CACHE_DIR / "models"
+VLMRUN_HUB_ARTIFACT_CACHE_DIR = VLMRUN_HUB_CACHE_DIR / "artifacts"
+VLMRUN_HUB_OFFLINE = os.getenv("VLMRUN_HUB_OFFLINE", "0").lower() in ("1", "true", "yes")
@@ -1,18 +1,35 @@
-from dataclasses import dataclass
+import hashlib
+import threading
+import time
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Type, Union
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+)
+from urllib.parse import urlparse
 
-from PIL import Image
+from loguru import logger
 from pydantic import BaseModel
 from typing_extensions import TypeAlias
 
-from vlmrun.common.pdf import pdf_images
-from vlmrun.common.utils import download_artifact, remote_image
-from vlmrun.hub.constants import (
-    VLMRUN_HUB_CATALOG_PATH,
-    VLMRUN_HUB_CONTRIB_CATALOG_PATH,
-)
-from vlmrun.hub.registry import SchemaCatalogYaml
+from vlmrun.hub.artifacts import ARTIFACT_CACHE
+from vlmrun.hub.images import ImagePreprocessor, PagePruner, PruneReport
+from vlmrun.hub.pdf import iter_pdf_pages
+from vlmrun.hub.registry import SchemaCatalogItem, registry
+
+if TYPE_CHECKING:
+    from PIL import Image
 
 ImageType: TypeAlias = Union[str, Path]
 PDFType: TypeAlias = Union[str, Path]
@@ -28,26 +45,50 @@ class HubSample:
     """The prompt to use for the sample"""
     data: str
     """The images or image URLs associated with the sample"""
+    id: Optional[str] = None
+    """A stable identifier of the sample (defaults to `sample_id(domain, data)`)"""
+
+    preprocessor: Optional[ImagePreprocessor] = field(default=None, repr=False, compare=False)
+    """The image preprocessor used by `encoded_images` (defaults to an `ImagePreprocessor` with `autocrop` / `grayscale`)"""
+    autocrop: bool = field(default=False, repr=False, compare=False)
+    """Crop the background margins of the images in `encoded_images` (with the default preprocessor)"""
+    grayscale: bool = field(default=False, repr=False, compare=False)
+    """Convert the images in `encoded_images` to grayscale (with the default preprocessor)"""
+    page_pruner: Optional[PagePruner] = field(default=None, repr=False, compare=False)
+    """Drop blank and near-duplicate PDF pages before they are returned / encoded (requires numpy)"""
+    prune_report: Optional[PruneReport] = field(default=None, init=False, repr=False, compare=False)
+    """The pages kept and dropped the last time the PDF pages were rendered with a `page_pruner`"""
+    _images: Optional[List["Image.Image"]] = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.id is None:
+            self.id = sample_id(self.domain, self.data)
+
+    def _handle_image(self, image: ImageType) -> "Image.Image":
+        from vlmrun.common.utils import remote_image
 
-    def _handle_image(self, image: ImageType) -> Image.Image:
         if isinstance(image, str):
-            if image.startswith("http"):
-                return remote_image(image)
-            return Image.open(image)
+            return remote_image(ARTIFACT_CACHE.fetch(image))
         else:
             raise ValueError(f"Invalid image type: {type(image)}")
 
-    def _handle_pdf(self, url: PDFType) -> List[Image.Image]:
+    def _handle_pdf(self, url: PDFType) -> List["Image.Image"]:
         if url.endswith(".pdf"):
-            if url.startswith("http"):
-                path: Path = download_artifact(url, format="file")
-            else:
-                path: Path = Path(str(url))
-            return [p.image for p in pdf_images(path, dpi=72)]
+            path: Path = ARTIFACT_CACHE.fetch(url)
+            return list(self._iter_pdf_pages(path, dpi=72))
         else:
             raise ValueError(f"Invalid PDF type: {type(url)}")
 
-    def _handle_url(self, url: str) -> List[Image.Image]:
+    def _iter_pdf_pages(
+        self, path: Path, pages: Optional[Sequence[int]] = None, dpi: int = 72
+    ) -> Iterator["Image.Image"]:
+        images = iter_pdf_pages(path, pages=pages, dpi=dpi)
+        if self.page_pruner is None:
+            return images
+        self.prune_report = PruneReport()
+        return self.page_pruner.prune(images, self.prune_report)
+
+    def _handle_url(self, url: str) -> List["Image.Image"]:
         if url.endswith(".pdf"):
             return self._handle_pdf(url)
         elif url.endswith(".jpg") or url.endswith(".jpeg") or url.endswith(".png") or url.endswith(".webp"):
@@ -56,25 +97,198 @@ class HubSample:
             raise ValueError(f"Invalid data extension: {url}")
 
     @property
-    def images(self) -> List[Image.Image]:
-        return self._handle_url(self.data)
+    def images(self) -> List["Image.Image"]:
+        """The decoded sample images, downloaded through the artifact cache and memoized per sample."""
+        if self._images is None:
+            self._images = self._handle_url(self.data)
+        return self._images
 
+    def encoded_images(self) -> List[str]:
+        """The sample images, preprocessed and encoded as base64 data URLs within the preprocessor's byte budget."""
+        preprocessor = self.preprocessor or ImagePreprocessor(autocrop=self.autocrop, grayscale=self.grayscale)
+        return [preprocessor.encode_data_url(image) for image in self.images]
 
-catalog = SchemaCatalogYaml.from_yaml(VLMRUN_HUB_CATALOG_PATH)
-VLMRUN_HUB_DATASET = {
-    schema.domain: HubSample(
-        domain=schema.domain,
-        response_model=schema.schema_class,
-        prompt=schema.prompt,
-        data=schema.sample_data,
-    )
-    for schema in catalog.schemas
-} | {
-    schema.domain: HubSample(
-        domain=schema.domain,
-        response_model=schema.schema_class,
-        prompt=schema.prompt,
-        data=schema.sample_data,
+    def iter_images(self, pages: Optional[Sequence[int]] = None, dpi: int = 72) -> Iterator["Image.Image"]:
+        """Iterate over the sample images without materializing them all.
+
+        PDF pages are rendered one at a time, optionally restricted to the given page indices and
+        at the given resolution (see `iter_pdf_pages`); `pages` and `dpi` do not apply to images.
+        With a `page_pruner`, blank and near-duplicate pages are skipped (see `prune_report`).
+        """
+        if self.data.endswith(".pdf"):
+            yield from self._iter_pdf_pages(ARTIFACT_CACHE.fetch(self.data), pages=pages, dpi=dpi)
+        else:
+            yield from self._handle_url(self.data)
+
+    def iter_image_batches(
+        self, batch_size: int, pages: Optional[Sequence[int]] = None, dpi: int = 72
+    ) -> Iterator[List["Image.Image"]]:
+        """Iterate over the sample images in batches, holding at most `batch_size` rendered pages at a time."""
+        if batch_size < 1:
+            raise ValueError(f"Invalid batch size: {batch_size}")
+        batch: List["Image.Image"] = []
+        for image in self.iter_images(pages=pages, dpi=dpi):
+            batch.append(image)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def sample_id(domain: str, data: str) -> str:
+    """A stable identifier for the sample of a domain at a URL (or path): `<domain>/<url hash>`."""
+    return f"{domain}/{hashlib.sha256(data.encode()).hexdigest()[:12]}"
+
+
+def _has_samples(item: Optional[SchemaCatalogItem]) -> bool:
+    return item is not None and bool(item.sample_data)
+
+
+def _catalog_item(domain: object) -> Optional[SchemaCatalogItem]:
+    try:
+        return registry.catalog_item(domain)
+    except KeyError:
+        return None
+
+
+class HubDataset(Mapping):
+    """A read-only mapping of domain -> `HubSample` over the registry's catalog entries.
+
+    Keys come from the catalog entries already loaded by the registry (no YAML is re-parsed);
+    each sample, and the schema module for its response model, is only loaded on first access.
+
+    A catalog entry may list several (distinct) sample URLs: each one is its own `HubSample` (see `samples`),
+    and the mapping returns the first one. `shard` splits all samples into disjoint, deterministic
+    slices, e.g. for distributed benchmark workers.
+    """
+
+    def __init__(self):
+        self._samples: Dict[str, Tuple[Tuple[SchemaCatalogItem, Type[BaseModel], dict], Tuple[HubSample, ...]]] = {}
+
+    def _items(self) -> Dict[str, SchemaCatalogItem]:
+        return {name: item for name, item in registry.catalog_items().items() if _has_samples(item)}
+
+    def _domain_samples(self, domain: str) -> Tuple[HubSample, ...]:
+        item = _catalog_item(domain)
+        if not _has_samples(item):
+            raise KeyError(domain)
+        # The samples are rebuilt when the domain is re-registered (e.g. its schema is overridden)
+        key = (item, registry[domain], registry.get_domain_info(domain))
+        cached = self._samples.get(domain)
+        if cached is None or cached[0] != key:
+            _, response_model, metadata = key
+            sample_data = item.sample_data
+            samples = tuple(
+                HubSample(
+                    domain=domain,
+                    response_model=response_model,
+                    prompt=item.prompt,
+                    data=data,
+                    autocrop=bool(metadata.get("autocrop")),
+                    grayscale=bool(metadata.get("grayscale")),
+                )
+                # A URL listed twice is one sample (sample ids are derived from the URL, and must be unique)
+                for data in dict.fromkeys([sample_data] if isinstance(sample_data, str) else sample_data)
+            )
+            cached = self._samples[domain] = (key, samples)
+        return cached[1]
+
+    def __getitem__(self, domain: str) -> HubSample:
+        return self._domain_samples(domain)[0]
+
+    def __contains__(self, domain: object) -> bool:
+        return _has_samples(_catalog_item(domain))
+
+    def samples(self, domains: Optional[Iterable[str]] = None) -> List[HubSample]:
+        """All the samples of the given (by default, all) domains, in catalog order."""
+        return [sample for domain in (self if domains is None else domains) for sample in self._domain_samples(domain)]
+
+    def shard(self, index: int, count: int, domains: Optional[Iterable[str]] = None) -> List[HubSample]:
+        """The `index`-th of `count` disjoint slices of the samples of the given (by default, all) domains.
+
+        Samples are ordered by their stable id and dealt round-robin, so the slices are balanced and
+        identical on every worker with the same catalog, regardless of the registration order.
+
+        Examples:
+            >>> samples = VLMRUN_HUB_DATASET.shard(int(os.environ["WORKER_INDEX"]), 8)
+        """
+        if not 0 <= index < count:
+            raise ValueError(f"Invalid shard index {index} for {count} shards")
+        return sorted(self.samples(domains), key=lambda sample: sample.id)[index::count]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._items())
+
+    def __len__(self) -> int:
+        return len(self._items())
+
+
+VLMRUN_HUB_DATASET = HubDataset()
+
+
+@dataclass
+class PrefetchResult:
+    domain: str
+    """The domain of the prefetched sample"""
+    url: str
+    """The sample artifact URL (or path)"""
+    id: Optional[str] = None
+    """The id of the prefetched sample"""
+    download_s: float = 0.0
+    """Time spent downloading (or revalidating) the artifact, including waiting for a per-host slot"""
+    decode_s: float = 0.0
+    """Time spent decoding the images / rendering the PDF pages"""
+    num_images: int = 0
+    """The number of decoded images"""
+    error: Optional[str] = None
+    """The error, if the artifact could not be prefetched"""
+
+
+def prefetch(
+    domains: Optional[Iterable[str]] = None,
+    max_workers: int = 8,
+    max_per_host: int = 4,
+    samples: Optional[Iterable[HubSample]] = None,
+) -> List[PrefetchResult]:
+    """Download and decode the sample artifacts of the given (by default, all) domains in parallel.
+
+    Alternatively, `samples` (e.g. a `HubDataset.shard`) are prefetched instead of those of `domains`.
+
+    Artifacts are downloaded through the artifact cache's connection-pooled session, with at most
+    `max_workers` artifacts in flight overall and `max_per_host` concurrent requests per host;
+    decoding / PDF rendering runs in the same worker pool. The decoded images are memoized on the
+    samples of `VLMRUN_HUB_DATASET`, and failures are reported in the results rather than raised.
+    """
+    samples = VLMRUN_HUB_DATASET.samples(domains) if samples is None else list(samples)
+    host_slots: Dict[str, threading.BoundedSemaphore] = {}
+    host_slots_lock = threading.Lock()
+
+    def _prefetch(sample: HubSample) -> PrefetchResult:
+        result = PrefetchResult(domain=sample.domain, url=sample.data, id=sample.id)
+        try:
+            start = time.perf_counter()
+            if sample.data.startswith("http"):
+                with host_slots_lock:
+                    slot = host_slots.setdefault(urlparse(sample.data).netloc, threading.BoundedSemaphore(max_per_host))
+                with slot:
+                    ARTIFACT_CACHE.fetch(sample.data)
+            result.download_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            result.num_images = len(sample.images)
+            result.decode_s = time.perf_counter() - start
+        except Exception as e:
+            result.error = f"{type(e).__name__}: {e}"
+            logger.warning(f"Failed to prefetch sample [domain={sample.domain}, url={sample.data}, e={e}]")
+        return result
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(_prefetch, samples))
+    logger.info(
+        f"Prefetched {sum(result.error is None for result in results)}/{len(results)} samples "
+        f"[elapsed={time.perf_counter() - start:.2f}s, download={sum(r.download_s for r in results):.2f}s, "
+        f"decode={sum(r.decode_s for r in results):.2f}s]"
     )
-    for schema in SchemaCatalogYaml.from_yaml(VLMRUN_HUB_CONTRIB_CATALOG_PATH).schemas
-}
+    return results
@@ -0,0 +1,305 @@
+import hashlib
+import threading
+from base64 import b64encode
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Literal,
+    Optional,
+    Tuple,
+)
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    import numpy as np
+    from PIL import Image
+
+
+@dataclass(frozen=True)
+class ImagePreprocessor:
+    """Prepare sample images for a request: normalize, downscale and encode them within a byte budget.
+
+    Preprocessing applies the EXIF orientation, optionally crops the background margins around the
+    content (see `crop_to_content`), downscales the image so that its longest side is at most
+    `max_side` and its area at most `max_pixels`, and optionally converts it to grayscale.
+    Encoding then picks the highest quality in `[min_quality, max_quality]` whose payload fits in
+    `max_bytes` (further downscaling the image if even `min_quality` does not fit).
+
+    Encoded payloads are cached by image content hash and preprocessor settings.
+
+    Examples:
+        >>> preprocessor = ImagePreprocessor(max_side=1600, max_bytes=300_000)
+        >>> url = preprocessor.encode_data_url(image)
+        >>> url[:23]
+        'data:image/jpeg;base64,'
+    """
+
+    max_side: Optional[int] = 2048
+    """Maximum length of the longest side, in pixels"""
+    max_pixels: Optional[int] = 4_000_000
+    """Maximum number of pixels"""
+    grayscale: bool = False
+    """Convert to grayscale (8-bit luminance)"""
+    format: Literal["JPEG", "WEBP"] = "JPEG"
+    """Encoding format"""
+    max_bytes: Optional[int] = 500_000
+    """Byte budget for the encoded image (before base64 encoding)"""
+    min_quality: int = 40
+    max_quality: int = 90
+    autocrop: bool = False
+    """Crop the background margins around the content (requires numpy)"""
+    crop_tolerance: int = 32
+    """Gray-level difference from the background above which a pixel is considered content"""
+
+    def preprocess(self, image: "Image.Image") -> "Image.Image":
+        """Apply the EXIF orientation, crop, downscale and convert the image."""
+        from PIL import Image, ImageOps
+
+        image = ImageOps.exif_transpose(image)
+        if self.autocrop:
+            image = crop_to_content(image, tolerance=self.crop_tolerance)
+        image = image.convert("L" if self.grayscale else "RGB")
+        scale = 1.0
+        if self.max_side is not None:
+            scale = min(scale, self.max_side / max(image.size))
+        if self.max_pixels is not None:
+            scale = min(scale, (self.max_pixels / (image.width * image.height)) ** 0.5)
+        if scale < 1.0:
+            size = (max(1, int(image.width * scale)), max(1, int(image.height * scale)))
+            image = image.resize(size, Image.Resampling.LANCZOS)
+        return image
+
+    def _save(self, image: "Image.Image", quality: int) -> bytes:
+        buffer = BytesIO()
+        image.save(buffer, format=self.format, quality=quality)
+        return buffer.getvalue()
+
+    def _encode(self, image: "Image.Image") -> bytes:
+        from PIL import Image
+
+        image = self.preprocess(image)
+        while True:
+            payload = self._save(image, self.max_quality)
+            if self.max_bytes is None or len(payload) <= self.max_bytes:
+                return payload
+            # Binary search for the highest quality within the budget
+            low, high, best = self.min_quality, self.max_quality - 1, None
+            while low <= high:
+                quality = (low + high) // 2
+                candidate = self._save(image, quality)
+                if len(candidate) <= self.max_bytes:
+                    best, low = candidate, quality + 1
+                else:
+                    high = quality - 1
+            if best is not None:
+                return best
+            if min(image.size) <= 64:
+                logger.warning(f"Image does not fit the byte budget [size={len(payload)}, budget={self.max_bytes}]")
+                return payload
+            # Even the lowest quality does not fit: downscale and try again
+            size = (max(1, int(image.width * 0.75)), max(1, int(image.height * 0.75)))
+            image = image.resize(size, Image.Resampling.LANCZOS)
+
+    def encode(self, image: "Image.Image") -> bytes:
+        """Preprocess and encode the image, returning the (cached) encoded bytes."""
+        key = (image_hash(image), self)
+        payload = PAYLOAD_CACHE.get(key)
+        if payload is None:
+            payload = self._encode(image)
+            PAYLOAD_CACHE.put(key, payload)
+        return payload
+
+    def encode_data_url(self, image: "Image.Image") -> str:
+        """Preprocess and encode the image as a base64 data URL, e.g. for an `image_url` message part."""
+        return f"data:image/{self.format.lower()};base64,{b64encode(self.encode(image)).decode()}"
+
+
+def image_hash(image: "Image.Image") -> str:
+    """Hash the decoded content (mode, size and pixels) of an image."""
+    digest = hashlib.blake2b(f"{image.mode}:{image.size}".encode(), digest_size=16)
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+class PayloadCache:
+    """A thread-safe LRU cache of encoded image payloads, bounded by their total size."""
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._payloads: "OrderedDict[Tuple[str, ImagePreprocessor], bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, ImagePreprocessor]) -> Optional[bytes]:
+        with self._lock:
+            payload = self._payloads.get(key)
+            if payload is not None:
+                self._payloads.move_to_end(key)
+            return payload
+
+    def put(self, key: Tuple[str, ImagePreprocessor], payload: bytes) -> None:
+        with self._lock:
+            previous = self._payloads.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._payloads[key] = payload
+            self._size += len(payload)
+            while self._size > self.max_bytes and len(self._payloads) > 1:
+                _, evicted = self._payloads.popitem(last=False)
+                self._size -= len(evicted)
+
+    def __len__(self) -> int:
+        return len(self._payloads)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._payloads.clear()
+            self._size = 0
+
+
+PAYLOAD_CACHE = PayloadCache()
+
+
+def _require_numpy():
+    try:
+        import numpy as np
+    except ImportError as e:
+        raise ImportError("Page pruning and auto-cropping require numpy: `pip install 'vlmrun-hub[extra]'`") from e
+    return np
+
+
+def _grayscale_array(image: "Image.Image", max_side: int) -> Tuple["np.ndarray", int]:
+    """An 8-bit grayscale array of the image, reduced by an integer factor so that its longest side is at most
+    about `max_side`, and the reduction factor."""
+    np = _require_numpy()
+    factor = max(1, max(image.size) // max_side)
+    if factor > 1:
+        if image.mode not in ("L", "RGB"):
+            image = image.convert("RGB")
+        image = image.reduce(factor)
+    return np.asarray(image.convert("L")), factor
+
+
+def content_bbox(
+    image: "Image.Image", tolerance: int = 32, min_fraction: float = 0.005, max_side: int = 1024
+) -> Optional[Tuple[int, int, int, int]]:
+    """The bounding box `(left, upper, right, lower)` of the content of an image, or None if it has none.
+
+    The background level is the median of the image border; content pixels differ from it by more than
+    `tolerance` gray levels, and rows / columns with less than `min_fraction` content pixels (e.g. scan
+    noise or dust) are ignored. The box is computed on an array reduced to about `max_side` pixels and
+    rounded outwards, so it never clips content.
+    """
+    np = _require_numpy()
+    pixels, factor = _grayscale_array(image, max_side)
+    border = np.concatenate([pixels[0], pixels[-1], pixels[:, 0], pixels[:, -1]])
+    content = np.abs(pixels.astype(np.int16) - np.median(border)) > tolerance
+    rows = np.flatnonzero(content.sum(axis=1) > min_fraction * content.shape[1])
+    columns = np.flatnonzero(content.sum(axis=0) > min_fraction * content.shape[0])
+    if rows.size == 0 or columns.size == 0:
+        return None
+    return (
+        int(columns[0]) * factor,
+        int(rows[0]) * factor,
+        min(image.width, (int(columns[-1]) + 1) * factor),
+        min(image.height, (int(rows[-1]) + 1) * factor),
+    )
+
+
+def crop_to_content(image: "Image.Image", tolerance: int = 32, margin: float = 0.02) -> "Image.Image":
+    """Crop the background margins around the content of an image, keeping a `margin` (relative to the
+    content size) around it; images without detectable content are returned as is."""
+    bbox = content_bbox(image, tolerance=tolerance)
+    if bbox is None:
+        return image
+    left, upper, right, lower = bbox
+    pad = int(margin * max(right - left, lower - upper))
+    bbox = (max(0, left - pad), max(0, upper - pad), min(image.width, right + pad), min(image.height, lower + pad))
+    return image if bbox == (0, 0, image.width, image.height) else image.crop(bbox)
+
+
+def ink_fraction(image: "Image.Image", tolerance: int = 48, max_side: int = 512) -> float:
+    """The fraction of pixels that differ from the page background (its median gray level) by more than `tolerance`."""
+    np = _require_numpy()
+    pixels, _ = _grayscale_array(image, max_side)
+    background = np.median(pixels)
+    return float(np.count_nonzero(np.abs(pixels.astype(np.int16) - background) > tolerance)) / pixels.size
+
+
+def perceptual_hash(image: "Image.Image", hash_size: int = 16) -> int:
+    """A difference hash (dHash) of the image, comparing adjacent cells of a `hash_size` x `hash_size` grid."""
+    from PIL import Image
+
+    np = _require_numpy()
+    pixels = np.asarray(image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.BOX), dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+@dataclass
+class PruneReport:
+    """The pages kept and dropped by `PagePruner.prune`, by position in the pruned sequence."""
+
+    kept: List[int] = field(default_factory=list)
+    """Indices of the kept pages"""
+    blank: List[int] = field(default_factory=list)
+    """Indices of the pages dropped as blank"""
+    duplicates: Dict[int, int] = field(default_factory=dict)
+    """Indices of the pages dropped as near-duplicates, mapped to the index of the kept page they duplicate"""
+
+    @property
+    def dropped(self) -> int:
+        return len(self.blank) + len(self.duplicates)
+
+
+@dataclass(frozen=True)
+class PagePruner:
+    """Drop near-blank and near-duplicate pages from a (streamed) sequence of document pages.
+
+    A page is blank if less than `max_ink` of its pixels differ from the page background by more
+    than `tolerance` gray levels; it is a duplicate if its perceptual hash is within
+    `max_hash_distance` bits of the hash of a page already kept. Both are computed on downsampled
+    grayscale NumPy arrays (NumPy is an optional dependency).
+
+    Examples:
+        >>> report = PruneReport()
+        >>> pages = list(PagePruner().prune(iter_pdf_pages("packet.pdf"), report))
+        >>> report.blank, report.duplicates
+        ([3], {5: 1})
+    """
+
+    tolerance: int = 48
+    max_ink: float = 0.001
+    hash_size: int = 16
+    max_hash_distance: int = 8
+
+    def prune(self, pages: Iterable["Image.Image"], report: Optional[PruneReport] = None) -> Iterator["Image.Image"]:
+        """Yield the pages to keep, recording the decisions in `report`."""
+        report = report if report is not None else PruneReport()
+        hashes: List[Tuple[int, int]] = []
+        for index, page in enumerate(pages):
+            if ink_fraction(page, tolerance=self.tolerance) < self.max_ink:
+                report.blank.append(index)
+                continue
+            page_hash = perceptual_hash(page, hash_size=self.hash_size)
+            duplicate_of = next(
+                (kept for kept, kept_hash in hashes if bin(page_hash ^ kept_hash).count("1") <= self.max_hash_distance),
+                None,
+            )
+            if duplicate_of is not None:
+                report.duplicates[index] = duplicate_of
+                continue
+            hashes.append((index, page_hash))
+            report.kept.append(index)
+            yield page
+        if report.dropped:
+            logger.debug(
+                f"Pruned {report.dropped} pages [blank={len(report.blank)}, duplicates={len(report.duplicates)}]"
+            )
@@ -0,0 +1,52 @@
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator, Optional, Sequence, Union
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+def pdf_page_count(path: Union[str, Path]) -> int:
+    """Return the number of pages of a PDF, without rendering any."""
+    import pypdfium2 as pdfium
+
+    doc = pdfium.PdfDocument(str(path))
+    try:
+        return len(doc)
+    finally:
+        doc.close()
+
+
+def iter_pdf_pages(
+    path: Union[str, Path], pages: Optional[Sequence[int]] = None, dpi: int = 72
+) -> Iterator["Image.Image"]:
+    """Render the pages of a PDF one at a time.
+
+    Each page is rendered only when the iterator is advanced, and the renderer keeps no reference
+    to the pages it yielded, so memory use is bounded by the pages the caller holds on to. The
+    document is closed once the iterator is exhausted or closed.
+
+    Args:
+        path: Path to the PDF file
+        pages: Page indices (0-based, negative indices count from the end) to render, e.g.
+            `range(10, 20)`; defaults to all pages
+        dpi: Resolution to render the pages at
+
+    Raises:
+        IndexError: If a page index is out of range
+    """
+    import pypdfium2 as pdfium
+
+    doc = pdfium.PdfDocument(str(path))
+    try:
+        n_pages = len(doc)
+        for index in range(n_pages) if pages is None else pages:
+            if not -n_pages <= index < n_pages:
+                raise IndexError(f"Page index {index} out of range for a {n_pages}-page PDF [path={path}]")
+            page = doc[index % n_pages]
+            try:
+                image = page.render(scale=dpi / 72).to_pil()
+            finally:
+                page.close()
+            yield image
+    finally:
+        doc.close()
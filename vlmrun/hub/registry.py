@@ -1,114 +1,526 @@
+import bisect
 import hashlib
 import importlib
+import importlib.util
 import json
+import os
+import threading
+from collections.abc import Mapping
 from functools import cached_property
 from pathlib import Path
-from typing import Dict, List, Literal, Optional, Tuple, Type, Union
+from types import MappingProxyType
+from typing import (
+    TYPE_CHECKING,
+    AbstractSet,
+    Any,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+    Union,
+)
 
 from loguru import logger
-from pydantic import BaseModel, Field, model_validator
-from pydantic_yaml import parse_yaml_raw_as
+from pydantic import VERSION as PYDANTIC_VERSION
+from pydantic import BaseModel, Field, PrivateAttr, model_validator
+
+if TYPE_CHECKING:
+    from vlmrun.hub.search import SearchIndex
+
+
+def canonical_json_bytes(json_schema: Dict[str, Any]) -> bytes:
+    """Serialize a JSON schema canonically (sorted keys), as used for hashing and serving schemas."""
+    return json.dumps(json_schema, sort_keys=True).encode()
+
+
+def compute_schema_hash(json_schema_bytes: bytes) -> str:
+    """Compute the schema hash (first 8 characters of the sha256) of a canonically serialized JSON schema."""
+    return hashlib.sha256(json_schema_bytes).hexdigest()[:8]
+
+
+class SchemaEntry:
+    """A registered schema: either a resolved schema class or a catalog entry imported on first access.
+
+    The JSON schema, its canonical serialization and its hash are computed once per entry and
+    cached; `Registry.register()` replaces the entry, which invalidates them.
+    """
+
+    __slots__ = ("item", "schema", "metadata", "_json_schema", "_json_schema_bytes", "_schema_hash")
+
+    def __init__(
+        self,
+        schema: Optional[Type[BaseModel]] = None,
+        item: Optional["SchemaCatalogItem"] = None,
+        metadata: Optional[dict] = None,
+        json_schema: Optional[Dict[str, Any]] = None,
+        schema_hash: Optional[str] = None,
+    ):
+        self.schema = schema
+        self.item = item
+        self.metadata = metadata
+        self._json_schema = json_schema
+        self._json_schema_bytes: Optional[bytes] = None
+        self._schema_hash = schema_hash
+
+    @property
+    def class_name(self) -> str:
+        return self.schema.__name__ if self.schema is not None else self.item.class_name
+
+    def resolve(self, name: str) -> Type[BaseModel]:
+        """Return the schema class, importing the schema module on first access.
+
+        Resolution is idempotent, so concurrent callers may race here without locking.
+        """
+        if self.schema is None:
+            schema = self.item.schema_class
+            if not issubclass(schema, BaseModel):
+                raise ValueError(f"Schema {name} is not a subclass of BaseModel, type={type(schema)}")
+            self.schema = schema
+        return self.schema
+
+    def metadata_values(self, key: str) -> List[str]:
+        """Return the list stored under a metadata key (e.g. tags), or an empty list."""
+        return (self.metadata or {}).get(key) or []
+
+    def json_schema(self, name: str) -> Dict[str, Any]:
+        if self._json_schema is None:
+            self._json_schema = self.resolve(name).model_json_schema()
+        return self._json_schema
+
+    def json_schema_bytes(self, name: str) -> bytes:
+        if self._json_schema_bytes is None:
+            self._json_schema_bytes = canonical_json_bytes(self.json_schema(name))
+        return self._json_schema_bytes
+
+    def schema_hash(self, name: str) -> str:
+        if self._schema_hash is None:
+            self._schema_hash = compute_schema_hash(self.json_schema_bytes(name))
+        return self._schema_hash
+
+
+class LazySchemaMapping(Mapping):
+    """A read-only mapping of domain -> schema class that imports schema modules on first access.
+
+    Membership, length and iteration only consult the registered entries; the schema module
+    for a domain is imported the first time its value is requested.
+    """
+
+    def __init__(self, entries: Mapping[str, SchemaEntry]):
+        self._entries = entries
+
+    def __getitem__(self, name: str) -> Type[BaseModel]:
+        return self._entries[name].resolve(name)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RegistryState:
+    """An immutable view of the registered entries and the lookup indexes derived from them.
+
+    Besides the entries, the state holds the sorted domain names and inverted indexes from
+    tags and supported inputs to domains. `update()` returns a new state, copying only the
+    index postings touched by the update, so the registry can swap states in atomically.
+    """
+
+    __slots__ = ("entries", "names", "tags", "supported_inputs")
+
+    def __init__(
+        self,
+        entries: Optional[Mapping[str, SchemaEntry]] = None,
+        names: Tuple[str, ...] = (),
+        tags: Optional[Dict[str, FrozenSet[str]]] = None,
+        supported_inputs: Optional[Dict[str, FrozenSet[str]]] = None,
+    ):
+        self.entries: Mapping[str, SchemaEntry] = entries if entries is not None else MappingProxyType({})
+        self.names: Tuple[str, ...] = names
+        self.tags: Dict[str, FrozenSet[str]] = tags if tags is not None else {}
+        self.supported_inputs: Dict[str, FrozenSet[str]] = supported_inputs if supported_inputs is not None else {}
+
+    @staticmethod
+    def _update_index(
+        index: Dict[str, FrozenSet[str]], removed: Dict[str, Iterable[str]], added: Dict[str, Iterable[str]]
+    ) -> Dict[str, FrozenSet[str]]:
+        """Return a copy of the index with the (domain -> keys) postings removed and added."""
+        touched: Dict[str, Set[str]] = {}
+        for postings, add in ((removed, False), (added, True)):
+            for name, keys in postings.items():
+                for key in keys:
+                    if key not in touched:
+                        touched[key] = set(index.get(key, ()))
+                    if add:
+                        touched[key].add(name)
+                    else:
+                        touched[key].discard(name)
+        index = dict(index)
+        for key, members in touched.items():
+            if members:
+                index[key] = frozenset(members)
+            else:
+                index.pop(key, None)
+        return index
+
+    def update(self, updates: Dict[str, SchemaEntry]) -> "RegistryState":
+        entries = dict(self.entries)
+        new_names = [name for name in updates if name not in entries]
+        removed_tags, removed_inputs, added_tags, added_inputs = {}, {}, {}, {}
+        for name, entry in updates.items():
+            previous = entries.get(name)
+            if previous is not None:
+                if entry.metadata is None:
+                    entry.metadata = previous.metadata
+                if entry.item is None:
+                    # A schema overriding a catalog domain keeps its catalog item (prompt, sample data, ...)
+                    entry.item = previous.item
+                removed_tags[name] = previous.metadata_values("tags")
+                removed_inputs[name] = previous.metadata_values("supported_inputs")
+            added_tags[name] = entry.metadata_values("tags")
+            added_inputs[name] = entry.metadata_values("supported_inputs")
+            entries[name] = entry
+        return RegistryState(
+            entries=MappingProxyType(entries),
+            names=tuple(sorted([*self.names, *new_names])) if new_names else self.names,
+            tags=self._update_index(self.tags, removed_tags, added_tags),
+            supported_inputs=self._update_index(self.supported_inputs, removed_inputs, added_inputs),
+        )
+
+    def category(self, category: str) -> Tuple[str, ...]:
+        """Return the domains under a category prefix, using a binary search over the sorted names."""
+        lo = bisect.bisect_left(self.names, f"{category}.")
+        hi = bisect.bisect_left(self.names, f"{category}/", lo)  # "/" sorts right after "."
+        return self.names[lo:hi]
 
 
 class Registry:
     """A singleton registry for schemas.
 
+    Schemas loaded from a catalog are registered lazily: only the catalog metadata is
+    read at load time, and the schema module for a domain is imported the first time
+    it is accessed via `registry[domain]` or `registry.schemas[domain]`.
+
+    The registry is safe to use from multiple threads. Initialization and registration
+    are serialized by a lock, and concurrent callers wait on a single in-flight load.
+    Registered entries and their lookup indexes are published as an immutable
+    `RegistryState` that is swapped in atomically, so reads never take the lock.
+
     Examples:
         >>> from vlmrun.hub.registry import registry
         >>> schema = registry["document.invoice"]
         >>> registry.list_schemas()
-        ['document.invoice', 'document.receipt', ...]
+        ('document.invoice', 'document.receipt', ...)
+        >>> registry.find(tags=["finance"], supported_inputs=["document"], category="document")
+        ['document.bank-check', 'document.bank-statement', 'document.invoice', 'document.receipt']
     """
 
     _instance = None
+    _lock = threading.RLock()
 
     def __new__(cls):
         if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance._schemas = {}
-            cls._instance._initialized = False
-            cls._instance._schema_metadata = {}  # Store metadata when registering schemas
+            with cls._lock:
+                if cls._instance is None:
+                    instance = super().__new__(cls)
+                    instance._state = RegistryState()
+                    instance._search_index = None  # (state, index) built lazily on first search
+                    instance._hash_index = None  # (state, {schema hash: domain}) built lazily on first lookup
+                    instance._initialized = False
+                    cls._instance = instance
         return cls._instance
 
     @property
-    def schemas(self) -> Dict[str, Type[BaseModel]]:
+    def schemas(self) -> Mapping[str, Type[BaseModel]]:
         """Lazily load schemas when first accessed."""
+        return LazySchemaMapping(self._loaded_state().entries)
+
+    def _loaded_state(self) -> RegistryState:
+        """Return the published state, loading the default catalogs on first access."""
         if not self._initialized:
             self.load_schemas()
-        return self._schemas
+        return self._state
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the default catalogs are loaded: until then, the first access loads them (under a lock)."""
+        return self._initialized
+
+    @property
+    def state(self) -> RegistryState:
+        """The current (immutable) state: every registration publishes a new one, e.g. to invalidate derived caches."""
+        return self._loaded_state()
 
     def _extract_metadata(self, schema) -> dict:
         return {
             "description": schema.description,
             "supported_inputs": schema.metadata.supported_inputs if schema.metadata else None,
             "tags": schema.metadata.tags if schema.metadata else None,
+            "autocrop": schema.metadata.autocrop if schema.metadata else None,
+            "grayscale": schema.metadata.grayscale if schema.metadata else None,
             "sample_data": ([schema.sample_data] if isinstance(schema.sample_data, str) else schema.sample_data),
         }
 
+    def _publish(self, updates: Dict[str, SchemaEntry]) -> None:
+        """Publish a new immutable state with the given updates applied."""
+        with self._lock:
+            self._state = self._state.update(updates)
+
+    def _register_catalog_items(
+        self,
+        items: Sequence["SchemaCatalogItem"],
+        json_schemas: Optional[Dict[str, Dict[str, Any]]] = None,
+        schema_hashes: Optional[Dict[str, str]] = None,
+    ) -> None:
+        json_schemas, schema_hashes = json_schemas or {}, schema_hashes or {}
+        self._publish(
+            {
+                item.domain: SchemaEntry(
+                    item=item,
+                    metadata=self._extract_metadata(item),
+                    json_schema=json_schemas.get(item.domain),
+                    schema_hash=schema_hashes.get(item.domain),
+                )
+                for item in items
+            }
+        )
+
     def _load_catalog(self, path: Path) -> None:
         catalog = SchemaCatalogYaml.from_yaml(path)
         for schema in catalog.schemas:
-            metadata = self._extract_metadata(schema)
-            self.register(schema.domain, schema.schema_class, metadata)
+            schema.validate_schema_path()
+        self._register_catalog_items(catalog.schemas)
         logger.debug(f"Loaded schemas from {path}")
 
+    def _load_snapshot(self, path: Path) -> bool:
+        """Register the schemas from a precompiled catalog snapshot, if it exists and is fresh."""
+        snapshot = SchemaCatalogSnapshot.load(path)
+        if snapshot is None:
+            return False
+        # JSON schemas (and their hashes) are only reused if they were generated by the same pydantic version
+        if snapshot.pydantic_version == PYDANTIC_VERSION:
+            self._register_catalog_items(snapshot.schemas, snapshot.json_schemas, snapshot.schema_hashes)
+        else:
+            self._register_catalog_items(snapshot.schemas)
+        logger.debug(f"Loaded schemas from snapshot {path}")
+        return True
+
     def register(self, name: str, schema: Type[BaseModel], metadata: Optional[dict] = None) -> None:
         """Register a schema with the registry."""
         if not issubclass(schema, BaseModel):
             raise ValueError(f"Schema {name} is not a subclass of BaseModel, type={type(schema)}")
-        self._schemas[name] = schema
-        if metadata:
-            self._schema_metadata[name] = metadata
+        self._publish({name: SchemaEntry(schema=schema, metadata=metadata or None)})
+
+    def register_lazy(self, item: "SchemaCatalogItem", metadata: Optional[dict] = None) -> None:
+        """Register a catalog entry whose schema module is imported on first access."""
+        self._publish({item.domain: SchemaEntry(item=item, metadata=metadata or None)})
 
     def load_schemas(self, catalog_paths: Optional[Tuple[Union[str, Path]]] = None) -> None:
-        from vlmrun.hub.constants import VLMRUN_HUB_CATALOG_PATH, VLMRUN_HUB_PATH
+        from vlmrun.hub.constants import (
+            VLMRUN_HUB_CATALOG_PATH,
+            VLMRUN_HUB_CATALOG_SNAPSHOT_PATH,
+            VLMRUN_HUB_PATH,
+        )
+
+        with self._lock:
+            if not self._initialized and self._load_snapshot(VLMRUN_HUB_CATALOG_SNAPSHOT_PATH):
+                self._initialized = True
 
-        if not self._initialized:
-            try:
-                # Load default catalog
-                self._load_catalog(VLMRUN_HUB_CATALOG_PATH)
-
-                # Load contrib catalog if exists
-                contrib_path = VLMRUN_HUB_PATH / "schemas/contrib/catalog.yaml"
-                if contrib_path.exists():
-                    try:
-                        self._load_catalog(contrib_path)
-                    except Exception as e:
-                        logger.error(f"Failed to load contrib schemas: {e}")
+            if not self._initialized:
+                try:
+                    # Load default catalog
+                    self._load_catalog(VLMRUN_HUB_CATALOG_PATH)
+
+                    # Load contrib catalog if exists
+                    contrib_path = VLMRUN_HUB_PATH / "schemas/contrib/catalog.yaml"
+                    if contrib_path.exists():
+                        try:
+                            self._load_catalog(contrib_path)
+                        except Exception as e:
+                            logger.error(f"Failed to load contrib schemas: {e}")
+
+                    self._initialized = True
+                except Exception as e:
+                    logger.error(f"Failed to load default schemas: {e}")
+                    raise
+
+            # Load additional catalogs if provided
+            if catalog_paths is not None:
+                for path in catalog_paths:
+                    path = Path(path)
+                    if not path.exists():
+                        raise FileNotFoundError(f"Catalog file not found: {path}")
+                    self._load_catalog(path)
+
+    def _entry(self, name: str) -> SchemaEntry:
+        try:
+            return self._loaded_state().entries[name]
+        except KeyError:
+            raise KeyError(f"Schema '{name}' not found. Available schemas: {', '.join(self.list_schemas())}")
 
-                self._initialized = True
-            except Exception as e:
-                logger.error(f"Failed to load default schemas: {e}")
-                raise
-
-        # Load additional catalogs if provided
-        if catalog_paths is not None:
-            for path in catalog_paths:
-                path = Path(path)
-                if not path.exists():
-                    raise FileNotFoundError(f"Catalog file not found: {path}")
-                self._load_catalog(path)
+    def json_schema(self, domain: str) -> Dict[str, Any]:
+        """Get the JSON schema for a domain, computed once and cached.
+
+        The returned dict is shared across callers and must not be mutated.
+        """
+        return self._entry(domain).json_schema(domain)
+
+    def json_schema_bytes(self, domain: str) -> bytes:
+        """Get the canonical (sorted-keys) JSON serialization of the schema for a domain."""
+        return self._entry(domain).json_schema_bytes(domain)
+
+    def schema_hash(self, domain: str) -> str:
+        """Get the first 8 characters of the sha256 of the canonical JSON schema for a domain."""
+        return self._entry(domain).schema_hash(domain)
+
+    def domain_for_hash(self, schema_hash: str) -> str:
+        """Get the domain whose canonical JSON schema has the given hash.
+
+        The hash -> domain index is built on the first lookup (and again after the registry changes).
+
+        Raises:
+            KeyError: If no registered schema has the hash
+        """
+        state = self._loaded_state()
+        cached = self._hash_index
+        if cached is None or cached[0] is not state:
+            with self._lock:
+                state = self._state
+                cached = self._hash_index
+                if cached is None or cached[0] is not state:
+                    index: Dict[str, str] = {}
+                    for name in state.names:
+                        try:
+                            index.setdefault(state.entries[name].schema_hash(name), name)
+                        except Exception as e:
+                            logger.warning(f"Failed to compute the schema hash [domain={name}, e={e}]")
+                    cached = self._hash_index = (state, index)
+        try:
+            return cached[1][schema_hash]
+        except KeyError:
+            raise KeyError(f"No schema with hash '{schema_hash}'")
 
     def get_domain_info(self, domain: str) -> dict:
         """Get metadata for a domain."""
-        return self._schema_metadata.get(domain, {})
-
-    def list_schemas(self) -> List[str]:
-        return sorted(self.schemas.keys())
+        entry = self._loaded_state().entries.get(domain)
+        return (entry.metadata or {}) if entry is not None else {}
+
+    def catalog_item(self, domain: str) -> Optional["SchemaCatalogItem"]:
+        """Get the catalog item (prompt, sample data, ...) of a domain, or None if it is not from a catalog.
+
+        Overriding a catalog domain with `register()` keeps its catalog item.
+
+        Raises:
+            KeyError: If the domain is not registered
+        """
+        return self._entry(domain).item
+
+    def catalog_items(self) -> Dict[str, "SchemaCatalogItem"]:
+        """Get the catalog items of the domains from a catalog, in registration (catalog) order."""
+        return {name: entry.item for name, entry in self._loaded_state().entries.items() if entry.item is not None}
+
+    def list_schemas(self) -> Tuple[str, ...]:
+        """List the registered domains in sorted order.
+
+        The (immutable) tuple is maintained incrementally on registration and shared across callers.
+        """
+        return self._loaded_state().names
+
+    def find(
+        self,
+        tags: Optional[Union[str, Iterable[str]]] = None,
+        supported_inputs: Optional[Union[str, Iterable[str]]] = None,
+        category: Optional[str] = None,
+    ) -> List[str]:
+        """Find the domains matching all of the given tags, supported inputs and category.
+
+        Args:
+            tags: Tag(s) the domain must have, e.g. "finance"
+            supported_inputs: Input type(s) the domain must support, e.g. "document"
+            category: Category prefix of the domain, e.g. "document" or "healthcare"
+
+        Returns:
+            The matching domains in sorted order
+        """
+        state = self._loaded_state()
+        candidates: List[AbstractSet[str]] = []
+        for index, keys in ((state.tags, tags), (state.supported_inputs, supported_inputs)):
+            if keys is None:
+                continue
+            for key in [keys] if isinstance(keys, str) else keys:
+                candidates.append(index.get(key, frozenset()))
+        if category is not None:
+            names = state.category(category)
+            if not candidates:
+                return list(names)
+            candidates.append(set(names))
+        if not candidates:
+            return list(state.names)
+
+        candidates.sort(key=len)
+        result = set(candidates[0])
+        for members in candidates[1:]:
+            result.intersection_update(members)
+        return sorted(result)
+
+    def _get_search_index(self) -> "SearchIndex":
+        """Return the search index for the current state, building it on first use after a change."""
+        from vlmrun.hub.search import SearchIndex, json_schema_text
+
+        state = self._loaded_state()
+        cached = self._search_index
+        if cached is not None and cached[0] is state:
+            return cached[1]
+        with self._lock:
+            state = self._state
+            cached = self._search_index
+            if cached is not None and cached[0] is state:
+                return cached[1]
+            documents = []
+            for name in state.names:
+                entry = state.entries[name]
+                texts = [name, (entry.metadata or {}).get("description") or ""]
+                if entry.item is not None:
+                    texts.append(entry.item.prompt)
+                texts.extend(json_schema_text(entry.json_schema(name)))
+                documents.append((name, texts))
+            index = SearchIndex.from_texts(documents)
+            self._search_index = (state, index)
+            logger.debug(f"Built search index [n_docs={index.n_docs}, n_terms={len(index.postings)}]")
+            return index
+
+    def search(self, query: str, k: int = 10) -> List[str]:
+        """Rank domains by BM25 relevance of the query against their descriptions, prompts and field descriptions.
+
+        The index is built on the first search (and again after the registry changes), then reused.
+
+        Examples:
+            >>> registry.search("iban swift", k=3)
+            ['document.invoice', ...]
+        """
+        return [domain for domain, _ in self._get_search_index().search(query, k)]
 
     def __contains__(self, name: str) -> bool:
         return name in self.schemas
 
     def __getitem__(self, name: str) -> Type[BaseModel]:
-        try:
-            return self.schemas[name]
-        except KeyError:
-            raise KeyError(f"Schema '{name}' not found. Available schemas: {', '.join(self.list_schemas())}")
+        return self._entry(name).resolve(name)
 
     def __repr__(self) -> str:
-        repr_str = f"Registry [schemas={len(self.schemas)}]"
-        for name, schema in sorted(self.schemas.items()):
-            repr_str += f"\n  {name} :: {schema.__name__}"
+        state = self._loaded_state()
+        repr_str = f"Registry [schemas={len(state.names)}]"
+        for name in state.names:
+            repr_str += f"\n  {name} :: {state.entries[name].class_name}"
         return repr_str
 
 
@@ -122,6 +534,12 @@ class SchemaCatalogMetadata(BaseModel):
         None, description="List of supported input types"
     )
     tags: Optional[List[str]] = Field(None, description="List of tags")
+    autocrop: Optional[bool] = Field(
+        None, description="Whether to crop the background margins of input images (e.g. scans of cards or receipts)"
+    )
+    grayscale: Optional[bool] = Field(
+        None, description="Whether to send input images in grayscale (e.g. black and white document scans)"
+    )
 
 
 class SchemaCatalogItem(BaseModel):
@@ -158,6 +576,15 @@ class SchemaCatalogItem(BaseModel):
     def class_name(self) -> str:
         return self.schema_path.rsplit(".", 1)[1]
 
+    def validate_schema_path(self) -> None:
+        """Check that the schema module can be located, without importing it."""
+        try:
+            spec = importlib.util.find_spec(self.module_name)
+        except (ImportError, ValueError) as e:
+            raise ValueError(f"Unable to import {self.schema_path}: {e}")
+        if spec is None:
+            raise ValueError(f"Unable to import {self.schema_path}: No module named '{self.module_name}'")
+
     @cached_property
     def schema_class(self) -> type[BaseModel]:
         try:
@@ -169,10 +596,8 @@ class SchemaCatalogItem(BaseModel):
 
     @cached_property
     def schema_hash(self) -> str:
-        """Compute a hash of the schema JSON."""
-        schema_json: dict = self.schema_class.model_json_schema()
-        schema_hash: str = hashlib.sha256(json.dumps(schema_json).encode()).hexdigest()[:8]
-        return schema_hash
+        """Compute a hash of the canonical schema JSON."""
+        return compute_schema_hash(canonical_json_bytes(self.schema_class.model_json_schema()))
 
 
 class SchemaCatalogYaml(BaseModel):
@@ -182,11 +607,21 @@ class SchemaCatalogYaml(BaseModel):
     catalogs: Union[List[str], None] = Field(None, description="List of catalog files to include as references")
     schemas: List[SchemaCatalogItem] = Field(default_factory=list, description="List of schema entries")
 
+    _sources: List[Path] = PrivateAttr(default_factory=list)
+
+    @property
+    def sources(self) -> List[Path]:
+        """Catalog files this catalog was loaded from, including referenced sub-catalogs."""
+        return self._sources
+
     @classmethod
     def from_yaml(cls, yaml_path: Path) -> "SchemaCatalogYaml":
         if not yaml_path.exists():
             raise FileNotFoundError(f"Catalog file not found: {yaml_path}")
+        from pydantic_yaml import parse_yaml_raw_as
+
         catalog: SchemaCatalogYaml = parse_yaml_raw_as(cls, yaml_path.read_text())
+        catalog._sources = [yaml_path]
         catalog = catalog.load_catalogs(yaml_path.parent)
         return catalog
 
@@ -200,6 +635,95 @@ class SchemaCatalogYaml(BaseModel):
                 catalog_yaml = SchemaCatalogYaml.from_yaml(catalog_path)
                 n_schemas = len(catalog_yaml.schemas)
                 self.schemas.extend(catalog_yaml.schemas)
+                self._sources.extend(catalog_yaml.sources)
                 logger.debug(f"Loaded sub-catalog [catalog={catalog}, n_schemas={n_schemas}]")
             logger.debug(f"Loaded full catalog [n_catalogs={len(self.catalogs)}, n_schemas={len(self.schemas)}]")
         return self
+
+
+class SchemaCatalogSnapshot(BaseModel):
+    """A precompiled snapshot of the merged catalog.
+
+    The snapshot is built ahead of time (see `make catalog-snapshot`) so that short-lived
+    processes can skip YAML parsing at startup. It is keyed by a content hash of the source
+    catalog files and schema modules, and is only used while that hash still matches.
+    """
+
+    apiVersion: str = Field(..., description="API version of the catalog format")
+    source_hash: str = Field(..., description="sha256 of the source catalog files and schema modules")
+    sources: List[str] = Field(..., description="Source files covered by the hash, relative to the hub package")
+    pydantic_version: str = Field(..., description="Version of pydantic used to generate the JSON schemas")
+    schemas: List[SchemaCatalogItem] = Field(default_factory=list, description="List of schema entries")
+    json_schemas: Dict[str, Dict[str, Any]] = Field(default_factory=dict, description="JSON schema per domain")
+    schema_hashes: Dict[str, str] = Field(default_factory=dict, description="Schema hash per domain")
+
+    @staticmethod
+    def compute_source_hash(sources: Sequence[str], root: Optional[Path] = None) -> str:
+        """Compute the content hash of the given source files."""
+        from vlmrun.hub.constants import VLMRUN_HUB_PATH
+
+        root = root or VLMRUN_HUB_PATH
+        digest = hashlib.sha256()
+        for source in sources:
+            digest.update(source.encode())
+            digest.update(b"\0")
+            digest.update((root / source).read_bytes())
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    @classmethod
+    def build(cls, catalog_paths: Sequence[Path], root: Optional[Path] = None) -> "SchemaCatalogSnapshot":
+        """Build a snapshot from the given catalogs, importing every schema to precompute its JSON schema."""
+        from vlmrun.hub.constants import VLMRUN_HUB_PATH
+
+        root = root or VLMRUN_HUB_PATH
+        schemas: Dict[str, SchemaCatalogItem] = {}
+        sources: List[str] = []
+        for path in catalog_paths:
+            catalog = SchemaCatalogYaml.from_yaml(Path(path))
+            sources.extend(os.path.relpath(source, root) for source in catalog.sources)
+            schemas.update({schema.domain: schema for schema in catalog.schemas})
+
+        json_schemas, schema_hashes = {}, {}
+        for domain, schema in schemas.items():
+            origin = importlib.util.find_spec(schema.module_name).origin
+            sources.append(os.path.relpath(origin, root))
+            json_schemas[domain] = schema.schema_class.model_json_schema()
+            schema_hashes[domain] = compute_schema_hash(canonical_json_bytes(json_schemas[domain]))
+
+        sources = list(dict.fromkeys(sources))
+        return cls(
+            apiVersion="v1",
+            source_hash=cls.compute_source_hash(sources, root),
+            sources=sources,
+            pydantic_version=PYDANTIC_VERSION,
+            schemas=list(schemas.values()),
+            json_schemas=json_schemas,
+            schema_hashes=schema_hashes,
+        )
+
+    def is_fresh(self, root: Optional[Path] = None) -> bool:
+        """Check whether the source files still match the hash the snapshot was built from."""
+        try:
+            return self.compute_source_hash(self.sources, root) == self.source_hash
+        except OSError:
+            return False
+
+    def save(self, path: Path) -> None:
+        Path(path).write_text(self.model_dump_json(by_alias=True))
+
+    @classmethod
+    def load(cls, path: Path, root: Optional[Path] = None) -> Optional["SchemaCatalogSnapshot"]:
+        """Load a snapshot, returning None if it does not exist or is stale."""
+        path = Path(path)
+        if not path.exists():
+            return None
+        try:
+            snapshot = cls.model_validate_json(path.read_bytes())
+        except ValueError as e:
+            logger.warning(f"Ignoring invalid catalog snapshot [path={path}, error={e}]")
+            return None
+        if not snapshot.is_fresh(root):
+            logger.debug(f"Ignoring stale catalog snapshot [path={path}]")
+            return None
+        return snapshot
@@ -0,0 +1,128 @@
+import bisect
+import heapq
+import math
+import operator
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Mapping, Tuple
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case and split text into alphanumeric tokens (e.g. `swift_bic` -> `swift`, `bic`)."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def json_schema_text(json_schema: Dict[str, Any]) -> List[str]:
+    """Collect the property names and descriptions of a JSON schema, including nested `$defs`."""
+    texts: List[str] = []
+    stack: List[Any] = [json_schema]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            description = node.get("description")
+            if isinstance(description, str):
+                texts.append(description)
+            properties = node.get("properties")
+            if isinstance(properties, dict):
+                texts.extend(properties.keys())
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return texts
+
+
+class SearchIndex:
+    """An in-memory BM25 index over a set of text documents.
+
+    The BM25 weight of every (term, document) pair is precomputed when the index is built, and each
+    term's postings are also kept in decreasing weight order (impact order). Queries on rare terms
+    only sum their postings; other queries are answered with max-score pruning: the exact scores of
+    the best documents of each term give a lower bound of the k-th best score, which bounds the
+    weight a document must have in a term to make the top-k. Only the documents above those bounds
+    are scored, so most postings of the common terms (which cover most documents, with little
+    weight) are skipped. The results are exact.
+
+    Examples:
+        >>> index = SearchIndex({"document.invoice": "invoice iban swift", "document.receipt": "receipt"})
+        >>> index.search("iban")
+        [('document.invoice', 0.56...)]
+    """
+
+    EXHAUSTIVE_POSTINGS = 2048
+    """Queries with at most this many postings (for all their terms) are scored without pruning"""
+
+    def __init__(self, documents: Mapping[str, str], k1: float = 1.5, b: float = 0.75):
+        doc_terms = {doc_id: Counter(tokenize(text)) for doc_id, text in documents.items()}
+        n_docs = len(doc_terms)
+        avg_length = (sum(sum(terms.values()) for terms in doc_terms.values()) / n_docs) if n_docs else 0.0
+
+        postings: Dict[str, Dict[str, float]] = {}
+        for doc_id, terms in doc_terms.items():
+            length_norm = k1 * (1 - b + b * sum(terms.values()) / avg_length) if avg_length else k1
+            for term, tf in terms.items():
+                postings.setdefault(term, {})[doc_id] = tf * (k1 + 1) / (tf + length_norm)
+
+        self.postings: Dict[str, Dict[str, float]] = {}
+        self._impacts: Dict[str, Tuple[List[str], List[float]]] = {}
+        """Term -> (documents, negated weights), by decreasing weight (negated for `bisect`)"""
+        for term, weights in postings.items():
+            idf = math.log(1 + (n_docs - len(weights) + 0.5) / (len(weights) + 0.5))
+            self.postings[term] = {doc_id: idf * weight for doc_id, weight in weights.items()}
+            ranked = sorted(self.postings[term].items(), key=lambda item: item[1], reverse=True)
+            self._impacts[term] = ([doc_id for doc_id, _ in ranked], [-weight for _, weight in ranked])
+        self.n_docs = n_docs
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Return the top-k (document, score) pairs for the query, best first."""
+        terms = [term for term in dict.fromkeys(tokenize(query)) if term in self.postings]
+        if not terms or k <= 0:
+            return []
+        if len(terms) == 1:
+            doc_ids, weights = self._impacts[terms[0]]
+            return [(doc_id, -weight) for doc_id, weight in zip(doc_ids[:k], weights[:k])]
+        if sum(len(self.postings[term]) for term in terms) <= self.EXHAUSTIVE_POSTINGS:
+            # Rare terms: summing their postings is cheaper than pruning them
+            postings = sorted((self.postings[term] for term in terms), key=len, reverse=True)
+            scores = dict(postings[0])
+            for weights in postings[1:]:
+                for doc_id, weight in weights.items():
+                    scores[doc_id] = scores.get(doc_id, 0.0) + weight
+            return [(doc_id, scores[doc_id]) for doc_id in heapq.nlargest(k, scores, key=scores.__getitem__)]
+        max_weights = {term: -self._impacts[term][1][0] for term in terms}
+
+        def score(doc_id: str) -> float:
+            return sum(self.postings[term].get(doc_id, 0.0) for term in terms)
+
+        # The exact scores of the k best documents of each term: a lower bound of the k-th best score
+        scores = {doc_id: score(doc_id) for term in terms for doc_id in self._impacts[term][0][:k]}
+        threshold = heapq.nlargest(k, scores.values())[-1] if len(scores) >= k else 0.0
+        # Slack for the rounding of the sums, so that documents tied with the threshold are kept
+        threshold -= 1e-9
+
+        # Terms are processed by decreasing maximum weight. `rest` bounds what the terms after the
+        # current one add to a score: a document first seen in a term needs at least `threshold - rest`
+        # in it (the document is either not in the previous terms, or could not make the top-k there),
+        # and a document seen before is dropped once its score plus that bound is below the threshold.
+        terms.sort(key=max_weights.__getitem__, reverse=True)
+        rest = sum(max_weights.values())
+        candidates: Dict[str, float] = {}
+        for term in terms:
+            rest -= max_weights[term]
+            weights = self.postings[term]
+            bound = threshold - max_weights[term] - rest
+            get = weights.get
+            candidates = {doc_id: total + get(doc_id, 0.0) for doc_id, total in candidates.items() if total >= bound}
+            doc_ids, negated = self._impacts[term]
+            end = bisect.bisect_right(negated, rest - threshold)
+            if end:
+                candidates = {**dict(zip(doc_ids[:end], map(operator.neg, negated[:end]))), **candidates}
+        # The scores of the documents that can make the top-k are exact
+        candidates.update(scores)
+        return [(doc_id, candidates[doc_id]) for doc_id in heapq.nlargest(k, candidates, key=candidates.__getitem__)]
+
+    @classmethod
+    def from_texts(cls, documents: Iterable[Tuple[str, Iterable[str]]], **kwargs) -> "SearchIndex":
+        """Build an index from (document id, texts) pairs."""
+        return cls({doc_id: "\n".join(texts) for doc_id, texts in documents}, **kwargs)
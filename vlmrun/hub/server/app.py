@@ -1,13 +1,37 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from loguru import logger
+from starlette.concurrency import run_in_threadpool
 
-from vlmrun.hub.server.routes import router
+from vlmrun.hub.server.dynamic import DYNAMIC_SCHEMAS
+from vlmrun.hub.server.routes import router, warmup
 from vlmrun.hub.version import __version__
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up in the background: the server accepts requests right away, and `/ready` flips once it is done."""
+
+    async def _warmup():
+        try:
+            await run_in_threadpool(warmup)
+        except Exception as e:
+            logger.error(f"Failed to warm up the hub server [e={e}]")
+
+    task = asyncio.create_task(_warmup())
+    yield
+    task.cancel()
+    DYNAMIC_SCHEMAS.shutdown()
+
+
 app = FastAPI(
     title="VLM Run Hub",
     description="API server for VLM Run Hub schema registry",
     version=__version__,
     docs_url="/docs",
+    lifespan=lifespan,
 )
 
 app.include_router(router, prefix="")
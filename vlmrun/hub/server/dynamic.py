@@ -0,0 +1,153 @@
+import hashlib
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional, Tuple, Type
+
+from loguru import logger
+from pydantic import BaseModel
+
+from vlmrun.hub import utils
+from vlmrun.hub.registry import canonical_json_bytes
+
+
+class CompilationCapacityError(RuntimeError):
+    """Raised when too many schemas are being compiled to accept another one."""
+
+
+def dynamic_schema_hash(json_schema: Dict[str, Any]) -> str:
+    """The hash of an ad-hoc JSON schema: the (full) sha256 of its canonical serialization.
+
+    Unlike the 8-character hashes of the catalog schemas, ad-hoc schemas are sent by clients, so the
+    full digest is used to make collisions (accidental or crafted) impractical.
+    """
+    return hashlib.sha256(canonical_json_bytes(json_schema)).hexdigest()
+
+
+class DynamicSchemaStore:
+    """The models compiled from ad-hoc JSON schemas, by `dynamic_schema_hash`.
+
+    Models are built with `jsonschema_to_model` (so they share `MODEL_CACHE` and its disk tier), with
+    the `datamodel_code_generator` fallback running in a pool of worker processes: generating code is
+    slow and not thread-safe, and would otherwise hold up the server.
+
+    The store is bounded, as its schemas come from clients:
+
+    - It keeps the models of the `maxsize` most recently used schemas. An evicted schema is also
+      dropped from `MODEL_CACHE` (both tiers), so that its model is released, and has to be
+      compiled again.
+    - At most `max_pending` new schemas are compiled at a time; beyond that, `compile` raises
+      `CompilationCapacityError` (schemas already in the store are always accepted).
+    - A compilation running longer than `timeout` seconds is killed, by recycling the worker pool.
+
+    Examples:
+        >>> schema_hash = DYNAMIC_SCHEMAS.compile(json_schema)  # blocking: call it from a thread
+        >>> DYNAMIC_SCHEMAS.get(schema_hash).model_validate(document)
+    """
+
+    def __init__(self, maxsize: int = 1024, max_workers: int = 2, max_pending: int = 16, timeout: float = 30.0) -> None:
+        self.maxsize = maxsize
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._models: "OrderedDict[str, Tuple[Type[BaseModel], str]]" = OrderedDict()
+        """Schema hash -> (model, `MODEL_CACHE` key)"""
+        self._pending = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Workers are spawned rather than forked: the server process runs threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def _recycle(self, pool: ProcessPoolExecutor) -> None:
+        """Replace a broken or stuck pool: its workers are killed, and the next compilation starts a new pool."""
+        with self._lock:
+            if self._executor is pool:
+                self._executor = None
+        # `shutdown()` waits for the running tasks: the (stuck) workers are terminated first
+        for process in list((getattr(pool, "_processes", None) or {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _generate_source(self, json_schema: str, class_name: str) -> str:
+        pool = self._pool()
+        try:
+            return pool.submit(utils.codegen_jsonschemastr_to_source, json_schema, class_name).result(self.timeout)
+        except (BrokenProcessPool, FuturesTimeoutError):
+            # A worker died (e.g. out of memory) or is stuck on a pathological schema
+            self._recycle(pool)
+            raise
+
+    def get(self, schema_hash: str) -> Type[BaseModel]:
+        """The model compiled for a schema hash (cheap enough to call on the event loop).
+
+        Raises:
+            KeyError: If no schema with this hash was compiled (or it was evicted)
+        """
+        with self._lock:
+            model, _ = self._models[schema_hash]
+            self._models.move_to_end(schema_hash)
+            return model
+
+    def compile(self, json_schema: Dict[str, Any]) -> str:
+        """Compile a JSON schema (if not already compiled) and return its hash.
+
+        Blocks until the model is built; concurrent compilations of the same schema share one build.
+
+        Raises:
+            CompilationCapacityError: If `max_pending` new schemas are already being compiled
+        """
+        schema_hash = dynamic_schema_hash(json_schema)
+        with self._lock:
+            if schema_hash in self._models:
+                self._models.move_to_end(schema_hash)
+                return schema_hash
+            if self._pending >= self.max_pending:
+                raise CompilationCapacityError(f"Too many schemas being compiled [max_pending={self.max_pending}]")
+            self._pending += 1
+        try:
+            model = utils.jsonschema_to_model(json_schema, generate_source=self._generate_source)
+        finally:
+            with self._lock:
+                self._pending -= 1
+        key, evicted = utils.jsonschema_cache_key(json_schema), []
+        with self._lock:
+            self._models[schema_hash] = (model, key)
+            self._models.move_to_end(schema_hash)
+            while len(self._models) > self.maxsize:
+                evicted.append(self._models.popitem(last=False)[1][1])
+        for key in evicted:
+            utils.MODEL_CACHE.discard(key)
+        logger.debug(f"Compiled dynamic schema [schema_hash={schema_hash}, class_name={model.__name__}]")
+        return schema_hash
+
+    def __contains__(self, schema_hash: str) -> bool:
+        return schema_hash in self._models
+
+    def __len__(self) -> int:
+        return len(self._models)
+
+    def clear(self) -> None:
+        with self._lock:
+            evicted, self._models = list(self._models.values()), OrderedDict()
+        for _, key in evicted:
+            utils.MODEL_CACHE.discard(key)
+
+    def shutdown(self) -> None:
+        """Stop the worker processes (a new pool is started on the next compilation)."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+DYNAMIC_SCHEMAS = DynamicSchemaStore()
@@ -0,0 +1,154 @@
+import gzip
+import hashlib
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+from fastapi import Request, Response
+
+from vlmrun.hub.registry import RegistryState, registry
+
+MIN_COMPRESS_BYTES = 1024
+"""Responses smaller than this are not worth compressing"""
+
+
+CODING_ETAG_SUFFIXES = {"br": "-br", "gzip": "-gz"}
+"""Content coding -> suffix of the ETag of the representation in that coding"""
+
+
+def coding_etag(etag: str, coding: Optional[str]) -> str:
+    """The ETag of a representation in a content coding (e.g. `"beca6190-gz"`).
+
+    Strong validators must differ between the content codings of a resource (RFC 9110), otherwise a
+    cache could revalidate (and serve) the bytes of one coding for another.
+    """
+    return etag if coding is None else f'{etag[:-1]}{CODING_ETAG_SUFFIXES[coding]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an `If-None-Match` header against an ETag, in any content coding (with the weak comparison of RFC 9110)."""
+    if if_none_match is None:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    etags = {coding_etag(etag, coding).removeprefix("W/") for coding in (None, *CODING_ETAG_SUFFIXES)}
+    return "*" in tags or not tags.isdisjoint(etags)
+
+
+def _brotli_compress(content: bytes) -> Optional[bytes]:
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli.compress(content, quality=11)
+
+
+def _gzip_compress(content: bytes) -> bytes:
+    return gzip.compress(content, compresslevel=9, mtime=0)
+
+
+def _accepted_encodings(accept_encoding: Optional[str]) -> Tuple[str, ...]:
+    """The content codings accepted by the client (ignoring the ones with `q=0`)."""
+    encodings = []
+    for token in (accept_encoding or "").split(","):
+        coding, _, params = token.partition(";")
+        if not coding.strip():
+            continue
+        name, _, value = params.partition("=")
+        try:
+            quality = float(value) if name.strip() == "q" else 1.0
+        except ValueError:
+            quality = 1.0
+        if quality > 0:
+            encodings.append(coding.strip().lower())
+    return tuple(encodings)
+
+
+@dataclass(frozen=True)
+class PrecomputedResponse:
+    """A serialized JSON response body, its ETag, and its pre-compressed (brotli / gzip) encodings."""
+
+    content: bytes
+    etag: str
+    encoded: Dict[str, bytes] = field(default_factory=dict)
+    """Content coding (in order of preference) -> compressed body"""
+
+    @classmethod
+    def build(cls, content: bytes, etag: Optional[str] = None, compress: bool = True) -> "PrecomputedResponse":
+        """Precompute a response; the ETag defaults to a hash of the content."""
+        etag = etag or f'"{hashlib.sha256(content).hexdigest()[:16]}"'
+        encoded: Dict[str, bytes] = {}
+        if compress and len(content) >= MIN_COMPRESS_BYTES:
+            for coding, compress_fn in (("br", _brotli_compress), ("gzip", _gzip_compress)):
+                compressed = compress_fn(content)
+                if compressed is not None and len(compressed) < len(content):
+                    encoded[coding] = compressed
+        return cls(content=content, etag=etag, encoded=encoded)
+
+    def respond(
+        self,
+        request: Request,
+        cache_control: Optional[str] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Response:
+        """Respond with the body in the best encoding accepted by the client.
+
+        With a `cache_control`, the response also carries the ETag of the selected encoding (see
+        `coding_etag`), and an `If-None-Match` matching any encoding is answered with an empty 304.
+        """
+        headers = dict(headers or {})
+        coding = None
+        if self.encoded:
+            headers["Vary"] = "Accept-Encoding"
+            accepted = _accepted_encodings(request.headers.get("accept-encoding"))
+            coding = next((coding for coding in self.encoded if coding in accepted or "*" in accepted), None)
+        if cache_control is not None:
+            headers.update({"ETag": coding_etag(self.etag, coding), "Cache-Control": cache_control})
+            if etag_matches(request.headers.get("if-none-match"), self.etag):
+                return Response(status_code=304, headers=headers)
+        if coding is not None:
+            headers["Content-Encoding"] = coding
+            return Response(content=self.encoded[coding], media_type="application/json", headers=headers)
+        return Response(content=self.content, media_type="application/json", headers=headers)
+
+
+class ResponseStore:
+    """A memo of the precomputed responses of the server, for the current registry state.
+
+    Responses are built on first use, or all at once by a warmup at startup (after which `ready`
+    is set), and are dropped when the registry changes (e.g. on `registry.register()`).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state: Optional[RegistryState] = None
+        self._responses: Dict[Hashable, PrecomputedResponse] = {}
+        self.ready = False
+
+    def _current(self) -> Dict[Hashable, PrecomputedResponse]:
+        state = registry.state
+        if self._state is not state:
+            with self._lock:
+                if self._state is not state:
+                    self._state, self._responses = state, {}
+        return self._responses
+
+    def peek(self, key: Hashable) -> Optional[PrecomputedResponse]:
+        """The precomputed response for the key, if any (cheap enough to call on the event loop).
+
+        Returns None until the registry is loaded: loading it would block the event loop, possibly
+        waiting for the startup warmup that is loading it.
+        """
+        if not registry.loaded:
+            return None
+        return self._current().get(key)
+
+    def get(self, key: Hashable, build: Callable[[], PrecomputedResponse]) -> PrecomputedResponse:
+        """The precomputed response for the key, building it if needed."""
+        responses = self._current()
+        response = responses.get(key)
+        if response is None:
+            response = responses[key] = build()
+        return response
+
+
+RESPONSES = ResponseStore()
@@ -1,15 +1,37 @@
-import hashlib
 import json
-from typing import List, Optional
+import time
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict, Hashable, List, Optional, Tuple
 
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel, Field
+from fastapi import APIRouter, HTTPException, Request, Response
+from loguru import logger
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
+from pydantic_core import SchemaValidator
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
 
+from vlmrun.hub.bundle import bundle_json_schemas
 from vlmrun.hub.registry import registry
+from vlmrun.hub.server.dynamic import DYNAMIC_SCHEMAS, CompilationCapacityError
+from vlmrun.hub.server.responses import RESPONSES, PrecomputedResponse
 from vlmrun.hub.version import __version__
 
 router = APIRouter()
 
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+"""Cacheable, but revalidated with the ETag on every use (the content of a domain may change)"""
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+"""Cacheable forever (hash-addressed content never changes)"""
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines")
+"""Request content types validated as a stream of newline-delimited JSON documents"""
+MAX_DOCUMENT_BYTES = 16 * 1024 * 1024
+"""Maximum size of a document (line) in a validation stream"""
+MAX_DYNAMIC_SCHEMA_BYTES = 1024 * 1024
+"""Maximum size of an ad-hoc JSON schema"""
+
 
 class HubInfoResponse(BaseModel):
     version: str = Field(..., description="The version of the hub")
@@ -21,6 +43,7 @@ class HubDomainInfo(BaseModel):
     supported_inputs: Optional[List[str]] = Field(None, description="List of supported input types")
     tags: Optional[List[str]] = Field(None, description="List of tags for the schema")
     sample_data: Optional[List[str]] = Field(None, description="URLs to sample data")
+    schema_hash: Optional[str] = Field(None, description="The hash of the domain's schema (see `/schema/by-hash`)")
 
 
 class HubSchemaRequest(BaseModel):
@@ -33,16 +56,143 @@ class HubSchemaResponse(BaseModel):
     schema_hash: str = Field(..., description="The first 8 characters of the sha256 hash")
 
 
+class HubSchemaBatchRequest(BaseModel):
+    domains: Optional[List[str]] = Field(None, description="The domains to get the schemas for")
+    tags: Optional[List[str]] = Field(None, description="Also get the schemas of the domains with any of these tags")
+
+
+class HubSchemaBatchResponse(BaseModel):
+    schema_version: str = Field(..., description="The specific version of the schemas")
+    schema_hashes: Dict[str, str] = Field(..., description="The schema hash of each domain")
+    schemas: Dict[str, dict] = Field(..., description="The JSON schema of each domain, referencing the shared $defs")
+    defs: dict = Field(..., alias="$defs", description="The definitions shared by the schemas")
+
+
+class HubValidationError(BaseModel):
+    loc: List[Any] = Field(..., description="The path of the invalid value in the document")
+    msg: str = Field(..., description="The error message")
+    type: str = Field(..., description="The error type")
+
+
+class HubValidationResult(BaseModel):
+    line: Optional[int] = Field(None, description="The (1-based) line of the document in an NDJSON stream")
+    valid: bool = Field(..., description="Whether the document is valid")
+    errors: List[HubValidationError] = Field(default_factory=list, description="The validation errors")
+
+
+class HubDynamicSchemaResponse(BaseModel):
+    schema_hash: str = Field(..., description="The sha256 of the canonical JSON schema (see `/dynamic/validate`)")
+
+
+class HubReadyResponse(BaseModel):
+    ready: bool = Field(..., description="Whether the server is warmed up")
+
+
+def _schema_hash_or_none(domain: str) -> Optional[str]:
+    try:
+        return registry.schema_hash(domain)
+    except Exception:
+        return None
+
+
+_DOMAINS_ADAPTER = TypeAdapter(List[HubDomainInfo])
+
+
+def build_domains_response() -> PrecomputedResponse:
+    domains = [
+        HubDomainInfo(domain=domain, **registry.get_domain_info(domain), schema_hash=_schema_hash_or_none(domain))
+        for domain in registry.list_schemas()
+    ]
+    return PrecomputedResponse.build(_DOMAINS_ADAPTER.dump_json(domains))
+
+
+def build_schema_post_response(domain: str) -> PrecomputedResponse:
+    # The cached JSON schema bytes are spliced in directly to avoid re-encoding the schema
+    schema_hash = registry.schema_hash(domain)
+    content = b'{"json_schema":%s,"schema_version":%s,"schema_hash":%s}' % (
+        registry.json_schema_bytes(domain),
+        json.dumps(__version__).encode(),
+        json.dumps(schema_hash).encode(),
+    )
+    return PrecomputedResponse.build(content)
+
+
+def build_schema_response(domain: str) -> PrecomputedResponse:
+    return PrecomputedResponse.build(registry.json_schema_bytes(domain), etag=f'"{registry.schema_hash(domain)}"')
+
+
+def build_schema_bundle_response(domains: Tuple[str, ...]) -> PrecomputedResponse:
+    bundle = bundle_json_schemas({domain: registry.json_schema(domain) for domain in domains})
+    content = json.dumps(
+        {
+            "schema_version": __version__,
+            "schema_hashes": {domain: registry.schema_hash(domain) for domain in domains},
+            **bundle,
+        },
+        separators=(",", ":"),
+    ).encode()
+    return PrecomputedResponse.build(content)
+
+
+async def _precomputed(key: Hashable, build: Callable[[], PrecomputedResponse]) -> PrecomputedResponse:
+    """The precomputed response for the key; a response that is not built yet is built off the event loop."""
+    response = RESPONSES.peek(key)
+    if response is None:
+        response = await run_in_threadpool(RESPONSES.get, key, build)
+    return response
+
+
+def warmup() -> None:
+    """Precompute the responses of `/domains` and of `/schema` for every domain, then mark the server as ready.
+
+    Domains whose schema cannot be built are skipped (and answered with an error when requested).
+    """
+    start = time.perf_counter()
+    RESPONSES.get("domains", build_domains_response)
+    n_failed = 0
+    for domain in registry.list_schemas():
+        try:
+            schema = RESPONSES.get(("schema", domain), partial(build_schema_response, domain))
+            RESPONSES.get(("schema-post", domain), partial(build_schema_post_response, domain))
+            RESPONSES.get(("schema-by-hash", schema.etag.strip('"')), lambda schema=schema: schema)
+        except Exception as e:
+            n_failed += 1
+            logger.warning(f"Failed to precompute the schema response [domain={domain}, e={e}]")
+    try:
+        RESPONSES.get(
+            ("schemas", tuple(registry.list_schemas())),
+            partial(build_schema_bundle_response, tuple(registry.list_schemas())),
+        )
+    except Exception as e:
+        logger.warning(f"Failed to precompute the schema bundle [e={e}]")
+    RESPONSES.ready = True
+    logger.info(
+        f"Warmed up the hub server [domains={len(registry.list_schemas())}, failed={n_failed}, "
+        f"elapsed={time.perf_counter() - start:.2f}s]"
+    )
+
+
 @router.get("/info", response_model=HubInfoResponse)
 def info() -> HubInfoResponse:
     """Get hub version information."""
     return HubInfoResponse(version=__version__)
 
 
+@router.get("/ready", response_model=HubReadyResponse, responses={503: {"model": HubReadyResponse}})
+async def ready() -> Response:
+    """Check whether the server has precomputed its responses (503 until the startup warmup is done)."""
+    return Response(
+        content=HubReadyResponse(ready=RESPONSES.ready).model_dump_json(),
+        status_code=200 if RESPONSES.ready else 503,
+        media_type="application/json",
+    )
+
+
 @router.get("/domains", response_model=List[HubDomainInfo])
-def list_domains() -> List[HubDomainInfo]:
-    """List available domains."""
-    return [HubDomainInfo(domain=domain, **registry.get_domain_info(domain)) for domain in registry.list_schemas()]
+async def list_domains(request: Request) -> Response:
+    """List available domains, with the hash of their schema."""
+    response = await _precomputed("domains", build_domains_response)
+    return response.respond(request, REVALIDATE_CACHE_CONTROL)
 
 
 @router.get("/domains/{domain}", response_model=bool)
@@ -52,19 +202,234 @@ def has_domain(domain: str) -> bool:
 
 
 @router.post("/schema", response_model=HubSchemaResponse)
-async def get_domain_schema(request: HubSchemaRequest) -> HubSchemaResponse:
+async def get_domain_schema(schema_request: HubSchemaRequest, request: Request) -> Response:
     """Get schema for domain."""
+    domain = schema_request.domain
     try:
-        schema_class = registry[request.domain]
-        json_schema = schema_class.model_json_schema()
-        schema_hash = hashlib.sha256(json.dumps(json_schema, sort_keys=True).encode()).hexdigest()[:8]
-
-        return HubSchemaResponse(
-            json_schema=json_schema,
-            schema_version=__version__,
-            schema_hash=schema_hash,
+        response = await _precomputed(("schema-post", domain), partial(build_schema_post_response, domain))
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Schema '{domain}' not found")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return response.respond(request)
+
+
+@router.get("/schema/by-hash/{schema_hash}", response_model=dict)
+async def get_schema_by_hash(schema_hash: str, request: Request) -> Response:
+    """Get the JSON schema with the given hash; the response is immutable and can be cached forever."""
+    try:
+        response = await _precomputed(
+            ("schema-by-hash", schema_hash), lambda: build_schema_response(registry.domain_for_hash(schema_hash))
         )
     except KeyError:
-        raise HTTPException(status_code=404, detail=f"Schema '{request.domain}' not found")
+        raise HTTPException(status_code=404, detail=f"Schema with hash '{schema_hash}' not found")
+    return response.respond(request, IMMUTABLE_CACHE_CONTROL, headers={"X-Schema-Hash": schema_hash})
+
+
+@router.get("/schema/{domain}", response_model=dict)
+async def get_schema(domain: str, request: Request) -> Response:
+    """Get the JSON schema for a domain, with its hash as a strong ETag (answering `If-None-Match` with a 304)."""
+    try:
+        response = await _precomputed(("schema", domain), partial(build_schema_response, domain))
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Schema '{domain}' not found")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    schema_hash = response.etag.strip('"')
+    return response.respond(
+        request,
+        REVALIDATE_CACHE_CONTROL,
+        headers={"X-Schema-Hash": schema_hash, "Content-Location": f"/schema/by-hash/{schema_hash}"},
+    )
+
+
+def _select_domains(batch_request: HubSchemaBatchRequest) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """The domains selected by a batch request, and all the domains (404 if a requested domain is missing)."""
+    selected = set(batch_request.domains or [])
+    missing = sorted(domain for domain in selected if domain not in registry)
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Schemas not found: {missing}")
+    for tag in batch_request.tags or []:
+        selected.update(registry.find(tags=tag))
+    all_domains = tuple(registry.list_schemas())
+    if batch_request.domains is None and batch_request.tags is None:
+        return all_domains, all_domains
+    return tuple(sorted(selected)), all_domains
+
+
+@router.post("/schemas", response_model=HubSchemaBatchResponse)
+async def get_domain_schemas(batch_request: HubSchemaBatchRequest, request: Request) -> Response:
+    """Get the schemas of several domains (by default, all of them) in one bundle.
+
+    Definitions shared by the schemas are de-duplicated into one `$defs` section (see
+    `vlmrun.hub.bundle.unbundle_json_schemas` to split the bundle into standalone schemas),
+    and the bundle is compressed if the client accepts it (`Accept-Encoding: br, gzip`).
+    """
+    select = partial(_select_domains, batch_request)
+    # Until the registry is loaded, accessing it would block the event loop
+    domains, all_domains = select() if registry.loaded else await run_in_threadpool(select)
+    try:
+        if domains == all_domains:
+            response = await _precomputed(("schemas", domains), partial(build_schema_bundle_response, domains))
+        else:
+            response = await run_in_threadpool(build_schema_bundle_response, domains)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return response.respond(request)
+
+
+def _validate_document(validator: SchemaValidator, document: Optional[bytes], line: Optional[int] = None) -> bytes:
+    """Validate a raw JSON document (None if it is too large), returning the serialized `HubValidationResult`."""
+    result: Dict[str, Any] = {"valid": True, "errors": []}
+    if document is None or len(document) > MAX_DOCUMENT_BYTES:
+        result = {"valid": False, "errors": [{"loc": [], "msg": "Document too large", "type": "too_large"}]}
+    else:
+        try:
+            validator.validate_json(document)
+        except ValidationError as e:
+            errors = e.errors(include_url=False, include_context=False, include_input=False)
+            result = {
+                "valid": False,
+                "errors": [{key: error[key] for key in ("loc", "msg", "type")} for error in errors],
+            }
+    if line is not None:
+        result = {"line": line, **result}
+    return json.dumps(result, separators=(",", ":")).encode()
+
+
+def _validate_lines(validator: SchemaValidator, lines: List[Optional[bytes]], first_line: int) -> bytes:
+    """Validate NDJSON lines (skipping blank ones), returning the NDJSON results."""
+    return b"".join(
+        _validate_document(validator, line, first_line + index) + b"\n"
+        for index, line in enumerate(lines)
+        if line is None or line.strip()
+    )
+
+
+class RequestStreamingResponse(StreamingResponse):
+    """A streaming response whose content is produced while the request body is being read.
+
+    `StreamingResponse` listens for the client disconnecting by receiving from the client, which
+    would consume the request body; here, only the content iterator receives (and a disconnect
+    ends the request stream instead).
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def _validate_stream(validator: SchemaValidator, request: Request) -> AsyncIterator[bytes]:
+    """Validate an NDJSON request body as it is received, holding at most one chunk and one partial line.
+
+    The content of a line longer than `MAX_DOCUMENT_BYTES` is dropped as it is received, and the
+    line is reported as too large.
+    """
+    # The chunks of the partial line are only joined once it is complete (a long line arriving in many
+    # chunks is copied once), and dropped as soon as they exceed the maximum size
+    partial: List[bytes] = []
+    partial_size, line, oversized = 0, 1, False
+    async for chunk in request.stream():
+        if b"\n" not in chunk:
+            if not oversized:
+                partial.append(chunk)
+                partial_size += len(chunk)
+        else:
+            lines: List[Optional[bytes]] = chunk.split(b"\n")
+            tail = lines.pop()
+            lines[0] = None if oversized else b"".join([*partial, lines[0]])
+            partial, partial_size, oversized = [tail], len(tail), False
+            yield await run_in_threadpool(_validate_lines, validator, lines, line)
+            line += len(lines)
+        if partial_size > MAX_DOCUMENT_BYTES:
+            partial, partial_size, oversized = [], 0, True
+    last = None if oversized else b"".join(partial)
+    if last is None or last.strip():
+        yield await run_in_threadpool(_validate_lines, validator, [last], line)
+
+
+@router.post("/validate/{domain}", response_model=HubValidationResult)
+async def validate(domain: str, request: Request) -> Response:
+    """Validate a JSON document against the schema of a domain.
+
+    With an NDJSON content type (e.g. `application/x-ndjson`), the body is a stream of documents,
+    one per line, validated as they are received: the results are streamed back as NDJSON, one
+    `HubValidationResult` (with its line number) per non-blank line.
+    """
+    try:
+        validator = (await run_in_threadpool(registry.__getitem__, domain)).__pydantic_validator__
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Schema '{domain}' not found")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return await _validation_response(validator, request)
+
+
+@router.post("/dynamic/schema", response_model=HubDynamicSchemaResponse)
+async def compile_dynamic_schema(request: Request) -> HubDynamicSchemaResponse:
+    """Compile an ad-hoc JSON schema (the request body), returning its hash for `/dynamic/validate`.
+
+    Compiled models are cached by hash: posting the same (canonically equal) schema again returns
+    right away. Schemas that need code generation are compiled in worker processes; when too many
+    new schemas are being compiled, the request is answered with a 429 (retry after a second).
+    """
+    body = await _read_body(request, MAX_DYNAMIC_SCHEMA_BYTES)
+    try:
+        json_schema = json.loads(body)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid JSON: {e}")
+    if not isinstance(json_schema, dict):
+        raise HTTPException(status_code=422, detail="The JSON schema must be an object")
+    try:
+        schema_hash = await run_in_threadpool(DYNAMIC_SCHEMAS.compile, json_schema)
+    except CompilationCapacityError:
+        raise HTTPException(status_code=429, detail="Too many schemas being compiled", headers={"Retry-After": "1"})
+    except FuturesTimeoutError:
+        raise HTTPException(status_code=422, detail="Invalid JSON schema: compilation timed out")
+    except BrokenProcessPool as e:
+        # Also raised for the compilations that shared a pool with a timed out one
+        logger.error(f"Failed to compile a dynamic schema [e={e!r}]")
+        raise HTTPException(status_code=503, detail="Schema compilation failed, please retry")
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"Invalid JSON schema: {e}")
+    return HubDynamicSchemaResponse(schema_hash=schema_hash)
+
+
+@router.post("/dynamic/validate/{schema_hash}", response_model=HubValidationResult)
+async def validate_dynamic(schema_hash: str, request: Request) -> Response:
+    """Validate a JSON document (or an NDJSON stream, see `/validate`) against a schema compiled with `/dynamic/schema`.
+
+    Unknown (or evicted) schema hashes are answered with a 404: compile the schema again.
+    """
+    try:
+        validator = DYNAMIC_SCHEMAS.get(schema_hash).__pydantic_validator__
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Dynamic schema '{schema_hash}' not found")
+    return await _validation_response(validator, request)
+
+
+async def _read_body(request: Request, max_bytes: int) -> bytes:
+    """Read the request body, answering with a 413 as soon as it is known to exceed `max_bytes`."""
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Request body too large (max {max_bytes} bytes)")
+    chunks: List[bytes] = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Request body too large (max {max_bytes} bytes)")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+async def _validation_response(validator: SchemaValidator, request: Request) -> Response:
+    """Validate the request body: one JSON document, or a stream of them with an NDJSON content type."""
+    media_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if media_type in NDJSON_MEDIA_TYPES:
+        return RequestStreamingResponse(_validate_stream(validator, request), media_type="application/x-ndjson")
+    document = await _read_body(request, MAX_DOCUMENT_BYTES)
+    return Response(
+        content=await run_in_threadpool(_validate_document, validator, document), media_type="application/json"
+    )
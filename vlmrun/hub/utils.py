@@ -1,15 +1,42 @@
+import functools
+import hashlib
 import importlib
+import importlib.metadata
+import importlib.util
+import itertools
 import json
+import os
+import stat
 import sys
-from functools import lru_cache
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
 from pathlib import Path
 from tempfile import TemporaryDirectory
-from typing import Any, Dict, List, Tuple, Type, Union, get_args, get_origin
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+    get_args,
+    get_origin,
+)
 
-from datamodel_code_generator import DataModelType, InputFileType, generate
-from pydantic import BaseModel, create_model
+from loguru import logger
+from pydantic import BaseModel, TypeAdapter, create_model
 from typing_extensions import TypeAlias
 
+from vlmrun.hub.compiler import UnsupportedJsonSchemaError, compile_json_schema
+from vlmrun.hub.constants import VLMRUN_HUB_MODEL_CACHE_DIR
+
 ResponseFormat: TypeAlias = Type[BaseModel]
 AnnotationType: TypeAlias = Union[Type, Any]
 
@@ -17,29 +44,212 @@ AnnotationType: TypeAlias = Union[Type, Any]
 UNSUPPORTED_LOOKAROUND_TOKENS = ("(?=", "(?!", "(?<=", "(?<!")
 
 
-def _strip_unsupported_patterns(node: Any) -> Any:
-    """Recursively strip regex patterns with unsupported look-around constructs from JSON schema."""
-    if isinstance(node, dict):
-        pattern = node.get("pattern")
-        if isinstance(pattern, str) and any(tok in pattern for tok in UNSUPPORTED_LOOKAROUND_TOKENS):
-            node = dict(node)  # copy so we don't mutate callers' dicts
-            node.pop("pattern", None)
-        for key, value in list(node.items()):
-            node[key] = _strip_unsupported_patterns(value)
+SourceGenerator: TypeAlias = Callable[[str, str], str]
+"""Generates the source of a model from a JSON schema string and a class name (see `codegen_jsonschemastr_to_source`)"""
+
+SchemaRule: TypeAlias = Callable[[Dict[str, Any]], Dict[str, Any]]
+"""A schema transform rule: returns the node unchanged, or a (shallow) copy with its changes applied"""
+
+SUBSCHEMA_KEYWORDS = frozenset(
+    {
+        "items",
+        "additionalItems",
+        "unevaluatedItems",
+        "contains",
+        "additionalProperties",
+        "unevaluatedProperties",
+        "propertyNames",
+        "not",
+        "if",
+        "then",
+        "else",
+        "contentSchema",
+    }
+)
+"""Keywords whose value is a schema"""
+
+SUBSCHEMA_LIST_KEYWORDS = frozenset({"anyOf", "allOf", "oneOf", "prefixItems", "items"})
+"""Keywords whose value is a list of schemas"""
+
+SUBSCHEMA_MAP_KEYWORDS = frozenset({"properties", "patternProperties", "dependentSchemas", "$defs", "definitions"})
+"""Keywords whose value maps names (e.g. field names) to schemas"""
+
+
+class SchemaTransform:
+    """A JSON schema transform pipeline that applies a set of rules in a single pass.
+
+    Rules are visitors: each one is called with every schema node (the root and its subschemas) and
+    returns either the node itself, or a shallow copy with its changes applied. The rules never
+    mutate their input. Only schema positions are visited: the name maps of `properties` / `$defs`
+    are walked without being visited (a rule dropping `title` keywords does not drop a field named
+    `title`), and data such as `default`, `examples` or `enum` values is left as-is.
+
+    The schema is traversed iteratively (deeply nested schemas cannot hit the recursion limit) and
+    copy-on-write: only the nodes along the paths that change are copied, every unchanged subtree
+    is shared with the input schema.
+
+    Examples:
+        >>> transform = SchemaTransform()
+        >>> @transform.rule
+        ... def drop_examples(node):
+        ...     return {k: v for k, v in node.items() if k != "examples"} if "examples" in node else node
+        >>> transform({"type": "string", "examples": ["a"]})
+        {'type': 'string'}
+    """
+
+    def __init__(self, rules: Iterable[SchemaRule] = ()):
+        self.rules: List[SchemaRule] = list(rules)
+
+    def rule(self, rule: SchemaRule) -> SchemaRule:
+        """Register a rule (usable as a decorator)."""
+        self.rules.append(rule)
+        return rule
+
+    def _visit(self, node: Dict[str, Any]) -> Dict[str, Any]:
+        for rule in self.rules:
+            node = rule(node)
         return node
-    elif isinstance(node, list):
-        return [_strip_unsupported_patterns(item) for item in node]
+
+    def __call__(self, schema: Any) -> Any:
+        visit = self.rules[0] if len(self.rules) == 1 else self._visit
+        root = visit(schema) if isinstance(schema, dict) else schema
+        if not isinstance(root, (dict, list)):
+            return root
+
+        # Visit every container breadth-first (children always come after their parent), recording
+        # where each one sits in its parent and the value it replaces there. Containers are either
+        # schemas, or the lists / name maps of schemas found under their keywords.
+        nodes: List[Any] = [root]
+        originals: List[Any] = [schema]
+        parents: List[int] = [-1]
+        keys: List[Any] = [None]
+        is_schema: List[bool] = [isinstance(root, dict)]
+        changed = root is not schema
+        index = 0
+        while index < len(nodes):
+            node = nodes[index]
+            if is_schema[index]:
+                for key, value in node.items():
+                    if isinstance(value, dict):
+                        if key in SUBSCHEMA_KEYWORDS:
+                            child = visit(value)
+                            changed = changed or child is not value
+                            child_is_schema = True
+                        elif key in SUBSCHEMA_MAP_KEYWORDS:
+                            child, child_is_schema = value, False
+                        else:
+                            continue
+                    elif isinstance(value, list) and key in SUBSCHEMA_LIST_KEYWORDS:
+                        child, child_is_schema = value, False
+                    else:
+                        continue
+                    nodes.append(child)
+                    originals.append(value)
+                    parents.append(index)
+                    keys.append(key)
+                    is_schema.append(child_is_schema)
+            else:
+                for key, value in node.items() if isinstance(node, dict) else enumerate(node):
+                    if not isinstance(value, dict):
+                        continue
+                    child = visit(value)
+                    changed = changed or child is not value
+                    nodes.append(child)
+                    originals.append(value)
+                    parents.append(index)
+                    keys.append(key)
+                    is_schema.append(True)
+            index += 1
+        if not changed:
+            return schema
+
+        # Rebuild bottom-up, copying only the containers with a changed descendant
+        updates: Dict[int, Dict[Any, Any]] = {}
+        for index in range(len(nodes) - 1, -1, -1):
+            node = nodes[index]
+            node_updates = updates.pop(index, None)
+            if node_updates:
+                node = {**node, **node_updates} if isinstance(node, dict) else _updated_list(node, node_updates)
+            if index == 0:
+                return node
+            if node is not originals[index]:
+                updates.setdefault(parents[index], {})[keys[index]] = node
+
+
+def _updated_list(node: List[Any], updates: Dict[int, Any]) -> List[Any]:
+    node = list(node)
+    for index, value in updates.items():
+        node[index] = value
     return node
 
 
+def strip_unsupported_patterns(node: Dict[str, Any]) -> Dict[str, Any]:
+    """Schema rule: drop regex patterns with look-around constructs unsupported by pydantic-core."""
+    pattern = node.get("pattern")
+    if isinstance(pattern, str) and any(tok in pattern for tok in UNSUPPORTED_LOOKAROUND_TOKENS):
+        return {key: value for key, value in node.items() if key != "pattern"}
+    return node
+
+
+PYDANTIC_CORE_SCHEMA_TRANSFORM = SchemaTransform([strip_unsupported_patterns])
+"""Rules making JSON schemas loadable by pydantic-core, see `sanitize_json_schema_for_pydantic_core`"""
+
+
 def sanitize_json_schema_for_pydantic_core(schema: Dict[str, Any]) -> Dict[str, Any]:
     """Sanitize JSON schema by removing regex patterns unsupported by pydantic-core.
 
     pydantic-core uses a Rust regex engine that doesn't support look-around constructs
     (look-ahead and look-behind). This function removes such patterns to allow model
-    generation to succeed.
+    generation to succeed. The input schema is not modified; unchanged subtrees are shared.
     """
-    return _strip_unsupported_patterns(schema)
+    return PYDANTIC_CORE_SCHEMA_TRANSFORM(schema)
+
+
+PATCHED_TYPES = (date, datetime, time, timedelta)
+"""Field types not supported by OpenAI structured outputs, patched to `str` by `patch_response_format`"""
+
+_UNPATCHED = object()  # Marks models that need no patching (stored instead of the model to keep keys weak)
+_patched_models: "weakref.WeakKeyDictionary[Type[BaseModel], Any]" = weakref.WeakKeyDictionary()
+_patched_models_lock = threading.RLock()
+
+
+def _patch_annotation(annotation: AnnotationType) -> AnnotationType:
+    """Patch a field annotation, returning the annotation itself if nothing in it needs patching."""
+    if annotation in PATCHED_TYPES:
+        return str
+    origin = get_origin(annotation)
+    if origin is Union:
+        args = get_args(annotation)
+        patched_args = tuple(_patch_annotation(a) for a in args)
+        if all(p is a for p, a in zip(patched_args, args)):
+            return annotation
+        return Union[patched_args]
+    elif origin in (list, List):
+        (item,) = get_args(annotation) or (Any,)
+        patched_item = _patch_annotation(item)
+        return annotation if patched_item is item else List[patched_item]
+    elif isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return _patch_model(annotation)
+    return annotation
+
+
+def _patch_model(model: Type[BaseModel]) -> Type[BaseModel]:
+    """Patch a model once; the result is memoized (weakly) and shared wherever the model appears."""
+    with _patched_models_lock:
+        patched = _patched_models.get(model)
+        if patched is None:
+            # Copy the fields from the base class
+            new_fields: Dict[str, Tuple[AnnotationType, Any]] = {
+                field_name: (_patch_annotation(field.annotation), field)
+                for field_name, field in model.model_fields.items()
+            }
+            if all(annotation is model.model_fields[name].annotation for name, (annotation, _) in new_fields.items()):
+                patched = _UNPATCHED
+            else:
+                # Create a new model with the patched fields
+                patched = create_model(f"{model.__name__}_patched", __base__=BaseModel, **new_fields)
+            _patched_models[model] = patched
+        return model if patched is _UNPATCHED else patched
 
 
 def patch_response_format(response_format: ResponseFormat) -> ResponseFormat:
@@ -52,40 +262,159 @@ def patch_response_format(response_format: ResponseFormat) -> ResponseFormat:
     - timedelta
 
     This function patches the response format to handle these fields. We convert them to strings and
-    then convert them back to the original type.
+    then convert them back to the original type (see `ResponseFormatConverter`).
+
+    Patched models are memoized per source model (held weakly, so dynamically generated models can
+    still be garbage collected). Each nested model is patched once and the patched class is shared
+    across every schema it appears in; models without any such fields are returned as-is.
     """
-    from datetime import date, datetime, time, timedelta
-
-    def patch_pydantic_field_annotation(annotation: AnnotationType) -> AnnotationType:
-        if annotation in [date, datetime, time, timedelta]:
-            return str
-        elif get_origin(annotation) is Union:
-            return Union[tuple([patch_pydantic_field_annotation(a) for a in get_args(annotation)])]
-        elif get_origin(annotation) is List:
-            return List[patch_pydantic_field_annotation(get_args(annotation)[0])]
-        elif isinstance(annotation, type) and issubclass(annotation, BaseModel):
-            return patch_pydantic_model(annotation)
-        else:
-            return annotation
+    return _patch_model(response_format)
+
+
+_object_setattr = object.__setattr__
+
+ValueConverter: TypeAlias = Callable[[Any], Any]
+"""Converts a value of a patched field back to the type of the original field"""
 
-    def patch_pydantic_model(model: Type[BaseModel]) -> Type[BaseModel]:
-        # Copy the fields from the base class
-        fields = model.model_fields.copy()
-        new_fields: Dict[str, Tuple[AnnotationType, Any]] = {
-            field_name: (patch_pydantic_field_annotation(field.annotation), field)
-            for field_name, field in fields.items()
+
+def _value_converter(
+    annotation: AnnotationType, plans: Dict[Type[BaseModel], ValueConverter]
+) -> Optional[ValueConverter]:
+    """The conversion of values patched by `_patch_annotation` back to `annotation` (None if they are reused as-is)."""
+    if _patch_annotation(annotation) is annotation:
+        return None
+    if annotation in PATCHED_TYPES:
+        return TypeAdapter(annotation).validator.validate_python
+    origin = get_origin(annotation)
+    if origin is Union:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            convert_optional = _value_converter(args[0], plans)
+            return lambda value: value if value is None else convert_optional(value)
+        # Patched nested models are converted with their plan, patched `str` values (and lists) are parsed
+        # with the original union; any other value was not patched
+        union_plans = {
+            _patch_model(arg): _model_converter(arg, plans)
+            for arg in get_args(annotation)
+            if isinstance(arg, type) and issubclass(arg, BaseModel) and _patch_model(arg) is not arg
         }
-        # Create a new model with the subset of fields
-        return create_model(f"{model.__name__}_patched", __base__=BaseModel, **new_fields)
+        validate = TypeAdapter(annotation).validator.validate_python
+
+        def convert_union(value: Any) -> Any:
+            plan = union_plans.get(type(value))
+            if plan is not None:
+                return plan(value)
+            if isinstance(value, (str, list, BaseModel)):
+                return validate(value, from_attributes=True)
+            return value
+
+        return convert_union
+    elif origin in (list, List):
+        (item,) = get_args(annotation)
+        convert_item = _value_converter(item, plans)
+        return lambda values: [convert_item(value) for value in values]
+    return _model_converter(annotation, plans)
+
+
+def _model_converter(model: Type[BaseModel], plans: Dict[Type[BaseModel], ValueConverter]) -> ValueConverter:
+    """The conversion of instances of the patched `model` back to `model`, built once per model.
+
+    The plan lists the patched fields only: their values are converted, every other value (including
+    nested models that needed no patching) is reused as-is, and the instance is built without being
+    validated again. Models with validators or a validation config (which the patched model does not
+    carry) are validated in full instead.
+    """
+    plan = plans.get(model)
+    if plan is not None:
+        return plan
+    patched = _patch_model(model)
+    validate = model.__pydantic_validator__.validate_python
+    decorators = model.__pydantic_decorators__
+    if (
+        decorators.validators
+        or decorators.field_validators
+        or decorators.root_validators
+        or decorators.model_validators
+        or set(model.model_config) - {"title", "json_schema_extra"}
+    ):
+        plan = plans[model] = functools.partial(validate, from_attributes=True)
+        return plan
 
-    return patch_pydantic_model(response_format)
+    converters: List[Tuple[str, ValueConverter]] = []
+    for name, field in model.model_fields.items():
+        converter = _value_converter(field.annotation, plans)
+        if converter is not None:
+            converters.append((name, converter))
+    # `model_construct()` handles aliases, defaults and private attributes, none of which apply here
+    construct = model.__pydantic_post_init__ is None and not model.__private_attributes__
+    new = object.__new__
 
+    def convert(instance: Any) -> Any:
+        if instance.__class__ is not patched:
+            return validate(instance, from_attributes=True)
+        values = instance.__dict__.copy()
+        for name, converter in converters:
+            values[name] = converter(values[name])
+        if not construct:
+            return model.model_construct(_fields_set=instance.model_fields_set, **values)
+        result = new(model)
+        _object_setattr(result, "__dict__", values)
+        _object_setattr(result, "__pydantic_fields_set__", instance.__pydantic_fields_set__.copy())
+        _object_setattr(result, "__pydantic_extra__", None)
+        _object_setattr(result, "__pydantic_private__", None)
+        return result
 
-def jsonschema_to_model(schema: Dict) -> Type[BaseModel]:
+    plan = plans[model] = convert
+    return plan
+
+
+class ResponseFormatConverter:
+    """Convert outputs of a patched response format back to instances of the original model.
+
+    Rather than validating the patched output and then re-validating its dump with the original
+    model:
+
+    - JSON responses (and dicts) are validated directly against the original model, in a single
+      pass: the patched model is only needed for the schema sent to the API.
+    - Patched instances are converted with a plan built once per model: only the values of the
+      patched fields are parsed back to `date` / `datetime` / `time` / `timedelta`, every other
+      value (including nested models that needed no patching) is reused without being validated
+      again. When most of the tree is patched (e.g. a long list of models with a date each), this is
+      about as fast as re-validating it.
+
+    Examples:
+        >>> converter = ResponseFormatConverter(Invoice)
+        >>> response = client.beta.chat.completions.parse(..., response_format=converter.patched_response_format)
+        >>> invoice = converter(response.choices[0].message.parsed)
+        >>> isinstance(invoice.invoice_date, date)
+        True
+    """
+
+    def __init__(self, response_format: ResponseFormat):
+        self.response_format = response_format
+        self.patched_response_format = patch_response_format(response_format)
+        self._validator = response_format.__pydantic_validator__
+        self._convert_instance = _model_converter(response_format, {})
+
+    def __call__(self, value: Union[BaseModel, Dict[str, Any], str, bytes]) -> BaseModel:
+        """Convert a patched instance, dict or JSON document to an instance of the original model."""
+        if isinstance(value, (str, bytes, bytearray)):
+            return self._validator.validate_json(value)
+        if isinstance(value, BaseModel):
+            return value if type(value) is self.response_format else self._convert_instance(value)
+        return self._validator.validate_python(value)
+
+    def convert_many(self, values: Iterable[Union[BaseModel, Dict[str, Any], str, bytes]]) -> List[BaseModel]:
+        """Convert a batch of patched instances, dicts or JSON documents."""
+        return [self(value) for value in values]
+
+
+def jsonschema_to_model(schema: Dict, generate_source: Optional[SourceGenerator] = None) -> Type[BaseModel]:
     """Generate a Pydantic Model from a json schema.
 
     Args:
     schema: Source json schema to create Pydantic model from
+    generate_source: Optional replacement for `codegen_jsonschemastr_to_source` (see `jsonschemastr_to_model`)
 
     Returns:
     The newly created and loaded Pydantic class
@@ -94,37 +423,338 @@ def jsonschema_to_model(schema: Dict) -> Type[BaseModel]:
     # Sanitize the schema to remove regex patterns unsupported by pydantic-core
     sanitized_schema = sanitize_json_schema_for_pydantic_core(schema)
     json_schema = json.dumps(sanitized_schema)
-    model = jsonschemastr_to_model(json_schema, class_name)
+    model = jsonschemastr_to_model(json_schema, class_name, generate_source=generate_source)
     return model
 
 
-@lru_cache(maxsize=16)
-def jsonschemastr_to_model(json_schema: str, class_name: str) -> Type[BaseModel]:
+@dataclass
+class ModelCacheStats:
+    """Hit / miss / eviction counters of a `ModelCache`."""
+
+    memory_hits: int = 0
+    memory_misses: int = 0
+    memory_evictions: int = 0
+    disk_hits: int = 0
+    disk_misses: int = 0
+    disk_evictions: int = 0
+    inflight_waits: int = 0
+
+
+def _is_private(path: Path) -> bool:
+    """Whether a path is owned by the current user and not writable by group / others (always true on Windows)."""
+    if not hasattr(os, "getuid"):
+        return True
+    st = path.stat()
+    return st.st_uid == os.getuid() and not st.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+class ModelCache:
+    """A two-tier cache of the models generated from JSON schemas.
+
+    Entries are keyed by `schema_cache_key`, a hash of the canonical (sorted-keys) schema, so
+    semantically equal schemas with a different key order share an entry.
+
+    - The memory tier is an LRU of up to `maxsize` model classes.
+    - The disk tier stores the source generated by `datamodel_code_generator` under `cache_dir`,
+      evicting the least recently used files beyond `max_disk_bytes`. Schemas handled by the
+      in-memory compiler are cheap to rebuild and are not written to disk.
+
+    Set `cache_dir=None` to disable the disk tier.
+
+    `get_or_create` is single-flight: concurrent callers for the same key wait on one build.
+    """
+
+    def __init__(self, maxsize: int = 128, cache_dir: Optional[Path] = None, max_disk_bytes: int = 64 * 1024 * 1024):
+        self.maxsize = maxsize
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.stats = ModelCacheStats()
+        self._models: "OrderedDict[str, Type[BaseModel]]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Type[BaseModel]]:
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                self.stats.memory_misses += 1
+                return None
+            self._models.move_to_end(key)
+            self.stats.memory_hits += 1
+            return model
+
+    def put(self, key: str, model: Type[BaseModel]) -> None:
+        with self._lock:
+            self._models[key] = model
+            self._models.move_to_end(key)
+            while len(self._models) > self.maxsize:
+                self._models.popitem(last=False)
+                self.stats.memory_evictions += 1
+
+    def get_or_create(self, key: str, factory: Callable[[], Type[BaseModel]]) -> Type[BaseModel]:
+        """Return the cached model for a key, building it with `factory` at most once across threads."""
+        model = self.get(key)
+        if model is not None:
+            return model
+        with self._lock:
+            flight = self._inflight.get(key)
+            owner = flight is None
+            if owner:
+                # Another caller may have finished the build between `get()` and taking the lock
+                model = self._models.get(key)
+                if model is not None:
+                    return model
+                flight = self._inflight[key] = Future()
+            else:
+                self.stats.inflight_waits += 1
+        if not owner:
+            return flight.result()
+
+        try:
+            model = factory()
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        else:
+            self.put(key, model)
+            flight.set_result(model)
+            return model
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def source_path(self, key: str) -> Optional[Path]:
+        """Return the path of the cached model source for a key.
+
+        Returns None if the disk tier is disabled, or if its directory is not private to the current
+        user: the cached sources are executed, so they must not be writable by anyone else. The
+        directory is created with 0700 permissions.
+        """
+        if self.cache_dir is None:
+            return None
+        try:
+            self.cache_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+            private = _is_private(self.cache_dir)
+        except OSError:
+            private = False
+        if not private:
+            logger.warning(
+                f"Model cache directory is not private to the current user, skipping [path={self.cache_dir}]"
+            )
+            return None
+        return self.cache_dir / f"{key}.py"
+
+    def get_source_path(self, key: str) -> Optional[Path]:
+        """Return the path of the cached model source if present (and private), marking it as recently used."""
+        path = self.source_path(key)
+        if path is not None:
+            try:
+                if _is_private(path):
+                    os.utime(path)
+                else:
+                    logger.warning(f"Ignoring model source not private to the current user [path={path}]")
+                    path = None
+            except OSError:
+                path = None
+        with self._lock:
+            if path is None:
+                self.stats.disk_misses += 1
+            else:
+                self.stats.disk_hits += 1
+        return path
+
+    def evict_sources(self) -> None:
+        """Delete the least recently used model sources until the disk tier fits in `max_disk_bytes`."""
+        if self.cache_dir is None or not self.cache_dir.exists():
+            return
+        files = []
+        for path in self.cache_dir.glob("*.py"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files, key=lambda f: f[0]):
+            if total <= self.max_disk_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            with self._lock:
+                self.stats.disk_evictions += 1
+
+    def discard(self, key: str) -> None:
+        """Drop the model for a key from both tiers (e.g. once it is known not to be used again)."""
+        with self._lock:
+            self._models.pop(key, None)
+        path = self.source_path(key) if self.cache_dir is not None and self.cache_dir.exists() else None
+        if path is not None:
+            path.unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        """Clear the memory tier and reset the counters."""
+        with self._lock:
+            self._models.clear()
+            self.stats = ModelCacheStats()
+
+
+MODEL_CACHE = ModelCache(cache_dir=VLMRUN_HUB_MODEL_CACHE_DIR)
+"""The cache used by `jsonschema_to_model`; tune `maxsize` / `max_disk_bytes` or read `stats` as needed"""
+
+
+@functools.lru_cache(maxsize=None)
+def _codegen_versions() -> str:
+    """The versions of the packages the generated model sources depend on."""
+    import pydantic
+
+    try:
+        codegen_version = importlib.metadata.version("datamodel-code-generator")
+    except importlib.metadata.PackageNotFoundError:
+        codegen_version = None
+    return f"pydantic={pydantic.VERSION},datamodel-code-generator={codegen_version}"
+
+
+def schema_cache_key(schema: Dict[str, Any], class_name: str) -> str:
+    """Compute the cache key of a model: the sha256 of its class name and canonical (sorted-keys) schema.
+
+    The key also covers the pydantic and datamodel-code-generator versions, so that upgrading either
+    never loads a source generated by an older version from the disk tier.
+    """
+    canonical = json.dumps(schema, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{_codegen_versions()}\0{class_name}\0{canonical}".encode()).hexdigest()
+
+
+def jsonschema_cache_key(schema: Dict[str, Any]) -> str:
+    """The `MODEL_CACHE` key of the model that `jsonschema_to_model` generates for a schema."""
+    return schema_cache_key(sanitize_json_schema_for_pydantic_core(schema), schema.get("title", "Model"))
+
+
+def jsonschemastr_to_model(
+    json_schema: str, class_name: str, generate_source: Optional[SourceGenerator] = None
+) -> Type[BaseModel]:
     """Generate a Pydantic Model from a json schema string.
 
     Note (spillai): We use this to cache the generated models to avoid recompiling them.
 
+    The schema is compiled in memory with `compile_json_schema`; schemas using constructs the
+    compiler does not support fall back to `datamodel_code_generator`. Models are cached in
+    `MODEL_CACHE`, keyed by the canonical schema.
+
     Args:
     schema: Source json schema to create Pydantic model from
+    generate_source: Optional replacement for `codegen_jsonschemastr_to_source`, e.g. to run the code
+        generation in a worker process
 
     Returns:
     The newly created and loaded Pydantic class
     """
-    # Ref: https://github.com/koxudaxi/datamodel-code-generator/issues/278
-    with TemporaryDirectory() as tmp_dirname:
-        tmp_dir = Path(tmp_dirname)
-        tmp_path = Path(tmp_dir / "tempmodel.py")
-        generate(
-            json_schema,
-            input_file_type=InputFileType.JsonSchema,
-            class_name=class_name,
-            output=tmp_path,
-            output_model_type=DataModelType.PydanticV2BaseModel,
-        )
-        spec = importlib.util.spec_from_file_location("models", str(tmp_path))
-        if spec and spec.loader:
-            module = importlib.util.module_from_spec(spec)
-            sys.modules[spec.name] = module
+    schema = json.loads(json_schema)
+    key = schema_cache_key(schema, class_name)
+    return MODEL_CACHE.get_or_create(
+        key, lambda: _build_model(schema, json_schema, class_name, key, generate_source=generate_source)
+    )
+
+
+def _build_model(
+    schema: Dict[str, Any],
+    json_schema: str,
+    class_name: str,
+    key: str,
+    generate_source: Optional[SourceGenerator] = None,
+) -> Type[BaseModel]:
+    try:
+        return compile_json_schema(schema, class_name)
+    except UnsupportedJsonSchemaError as e:
+        logger.debug(f"Falling back to code generation [class_name={class_name}, reason={e}]")
+
+    path = MODEL_CACHE.get_source_path(key)
+    if path is not None:
+        try:
+            return _load_model_source(path, class_name)
+        except Exception as e:
+            logger.warning(f"Discarding unloadable cached model source [path={path}, error={e}]")
+            path.unlink(missing_ok=True)
+    model = codegen_jsonschemastr_to_model(
+        json_schema, class_name, output=MODEL_CACHE.source_path(key), generate_source=generate_source
+    )
+    MODEL_CACHE.evict_sources()
+    return model
+
+
+_MODULE_COUNTER = itertools.count()
+# `datamodel_code_generator.generate` changes the process-wide working directory, so it is not thread-safe
+_CODEGEN_LOCK = threading.Lock()
+
+
+def _load_model_source(path: Path, class_name: str) -> Type[BaseModel]:
+    # Every generated module gets a unique name: pydantic resolves deferred annotations through
+    # `sys.modules[cls.__module__]`, so a shared name would let parallel generations mix up classes
+    module_name = f"vlmrun_hub_models_{next(_MODULE_COUNTER)}"
+    spec = importlib.util.spec_from_file_location(module_name, str(path))
+    if spec and spec.loader:
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[spec.name] = module
+        try:
             spec.loader.exec_module(module)
+            # Complete the models (resolving their forward references) while the module is importable
+            for value in vars(module).values():
+                if isinstance(value, type) and issubclass(value, BaseModel) and value.__module__ == module_name:
+                    value.model_rebuild()
             return getattr(module, class_name)
-        raise ImportError("Failed to import generated model")  # pragma: no cover
+        finally:
+            # The built models do not need the module to stay importable: unregister it, so that it is
+            # released with its models instead of leaking one module per generated model
+            sys.modules.pop(spec.name, None)
+    raise ImportError("Failed to import generated model")  # pragma: no cover
+
+
+def codegen_jsonschemastr_to_source(json_schema: str, class_name: str) -> str:
+    """Generate the source of a Pydantic Model from a json schema string with `datamodel_code_generator`.
+
+    Only the source is generated (nothing is imported), so this can run in a worker process.
+    """
+    from datamodel_code_generator import DataModelType, InputFileType, generate
+
+    # Ref: https://github.com/koxudaxi/datamodel-code-generator/issues/278
+    with TemporaryDirectory() as tmp_dirname:
+        tmp_path = Path(tmp_dirname) / "tempmodel.py"
+        with _CODEGEN_LOCK:
+            generate(
+                json_schema,
+                input_file_type=InputFileType.JsonSchema,
+                class_name=class_name,
+                output=tmp_path,
+                output_model_type=DataModelType.PydanticV2BaseModel,
+            )
+        return tmp_path.read_text()
+
+
+def codegen_jsonschemastr_to_model(
+    json_schema: str,
+    class_name: str,
+    output: Optional[Path] = None,
+    generate_source: Optional[SourceGenerator] = None,
+) -> Type[BaseModel]:
+    """Generate a Pydantic Model from a json schema string with `datamodel_code_generator`.
+
+    Args:
+    schema: Source json schema to create Pydantic model from
+    output: Optional path to keep the generated source at; a temporary file is used otherwise
+    generate_source: Optional replacement for `codegen_jsonschemastr_to_source`
+
+    Returns:
+    The newly created and loaded Pydantic class
+    """
+    source = (generate_source or codegen_jsonschemastr_to_source)(json_schema, class_name)
+    if output is None:
+        with TemporaryDirectory() as tmp_dirname:
+            tmp_path = Path(tmp_dirname) / "tempmodel.py"
+            tmp_path.write_text(source)
+            return _load_model_source(tmp_path, class_name)
+    # Write the source atomically, so concurrent readers never see a partial file
+    output.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    staged = output.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    staged.touch(mode=0o600)
+    staged.write_text(source)
+    os.replace(staged, output)
+    return _load_model_source(output, class_name)